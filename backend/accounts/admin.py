@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, CustomerProfile, ShopkeeperProfile
+from .models import User, CustomerProfile, ShopkeeperProfile, AdminAuditLog
 
 @admin.register(User)
 class UserAdmin(BaseUserAdmin):
@@ -35,6 +35,15 @@ class ShopkeeperProfileAdmin(admin.ModelAdmin):
     
     def approve_shopkeepers(self, request, queryset):
         from django.utils import timezone
+        from shops.context import invalidate_shopkeeper_context
         queryset.update(verification_status='approved', approved_at=timezone.now())
+        invalidate_shopkeeper_context(*queryset.values_list('user_id', flat=True))
         self.message_user(request, f'{queryset.count()} shopkeepers approved successfully.')
-    approve_shopkeepers.short_description = "Approve selected shopkeepers"
\ No newline at end of file
+    approve_shopkeepers.short_description = "Approve selected shopkeepers"
+
+@admin.register(AdminAuditLog)
+class AdminAuditLogAdmin(admin.ModelAdmin):
+    list_display = ('resource', 'action', 'affected_count', 'actor', 'created_at')
+    list_filter = ('resource', 'action', 'created_at')
+    search_fields = ('actor__username',)
+    readonly_fields = ('actor', 'resource', 'action', 'object_ids', 'filters', 'affected_count', 'created_at')
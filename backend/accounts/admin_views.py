@@ -2,112 +2,86 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Count, Sum, Avg
-from django.db.models.functions import TruncDate, TruncMonth
-from django.utils import timezone
-from datetime import timedelta
-from accounts.models import User, CustomerProfile, ShopkeeperProfile
+from django.db import transaction
+from django.http import FileResponse
+from accounts.models import User, CustomerProfile, ShopkeeperProfile, AdminAuditLog
 from shops.models import Shop, Product, Category, Review
+from orders import leaderboard
 from orders.models import Order, OrderItem
+from orders.state import InvalidTransition, transition
+from . import reports, bulk_actions, dashboard, directory
 
 def is_admin(user):
     return user.user_type == 'admin'
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def admin_dashboard(request):
+    """Every dashboard widget in one response, or only ?widgets=stats,recent_orders,..."""
+    if not is_admin(request.user):
+        return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
+    names = [name for name in request.GET.get('widgets', '').split(',') if name] or list(dashboard.WIDGETS)
+    unknown = [name for name in names if name not in dashboard.WIDGETS]
+    if unknown:
+        return Response({'error': f"Unknown widgets: {', '.join(unknown)}"}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(dashboard.widgets(names))
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def admin_dashboard_stats(request):
     if not is_admin(request.user):
         return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
-    
-    total_users = User.objects.count()
-    total_customers = User.objects.filter(user_type='customer').count()
-    total_shopkeepers = User.objects.filter(user_type='shopkeeper').count()
-    total_shops = Shop.objects.count()
-    active_shops = Shop.objects.filter(status='active').count()
-    pending_shopkeepers = ShopkeeperProfile.objects.filter(verification_status='pending').count()
-    total_products = Product.objects.count()
-    available_products = Product.objects.filter(status='available').count()
-    out_of_stock = Product.objects.filter(status='out_of_stock').count()
-    total_orders = Order.objects.count()
-    pending_orders = Order.objects.filter(status='pending').count()
-    completed_orders = Order.objects.filter(status='delivered').count()
-    cancelled_orders = Order.objects.filter(status='cancelled').count()
-    total_revenue = Order.objects.filter(payment_status='paid').aggregate(total=Sum('total_amount'))['total'] or 0
-    today = timezone.now().date()
-    today_revenue = Order.objects.filter(payment_status='paid', created_at__date=today).aggregate(total=Sum('total_amount'))['total'] or 0
-    month_start = today.replace(day=1)
-    monthly_revenue = Order.objects.filter(payment_status='paid', created_at__date__gte=month_start).aggregate(total=Sum('total_amount'))['total'] or 0
-    monthly_orders = Order.objects.filter(created_at__date__gte=month_start).count()
-    total_categories = Category.objects.filter(is_active=True).count()
-    total_reviews = Review.objects.count()
-    avg_rating = Review.objects.aggregate(avg=Avg('rating'))['avg'] or 0
-    
-    return Response({
-        'users': {'total': total_users, 'customers': total_customers, 'shopkeepers': total_shopkeepers},
-        'shops': {'total': total_shops, 'active': active_shops, 'pending_verification': pending_shopkeepers},
-        'products': {'total': total_products, 'available': available_products, 'out_of_stock': out_of_stock},
-        'orders': {'total': total_orders, 'pending': pending_orders, 'completed': completed_orders, 'cancelled': cancelled_orders},
-        'revenue': {'total': float(total_revenue), 'today': float(today_revenue), 'monthly': float(monthly_revenue)},
-        'categories': total_categories,
-        'reviews': {'total': total_reviews, 'average_rating': round(float(avg_rating), 2)},
-        'monthly_orders': monthly_orders,
-    })
+    return Response(dashboard.widgets(['stats'])['stats'])
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def admin_recent_orders(request):
     if not is_admin(request.user):
         return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
-    orders = Order.objects.select_related('customer', 'shop').order_by('-created_at')[:10]
-    data = [{'id': o.id, 'order_number': o.order_number, 'customer': o.customer.username, 'customer_name': f"{o.customer.first_name} {o.customer.last_name}", 'shop': o.shop.name, 'total_amount': float(o.total_amount), 'status': o.status, 'payment_status': o.payment_status, 'created_at': o.created_at.isoformat()} for o in orders]
-    return Response(data)
+    return Response(dashboard.widgets(['recent_orders'])['recent_orders'])
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def admin_recent_users(request):
     if not is_admin(request.user):
         return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
-    users = User.objects.order_by('-created_at')[:10]
-    data = [{'id': u.id, 'username': u.username, 'email': u.email, 'full_name': f"{u.first_name} {u.last_name}", 'user_type': u.user_type, 'is_verified': u.is_verified, 'created_at': u.created_at.isoformat()} for u in users]
-    return Response(data)
+    return Response(dashboard.widgets(['recent_users'])['recent_users'])
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def admin_pending_shopkeepers(request):
     if not is_admin(request.user):
         return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
-    pending = ShopkeeperProfile.objects.filter(verification_status='pending').select_related('user')
-    data = [{'id': p.id, 'user_id': p.user.id, 'username': p.user.username, 'email': p.user.email, 'business_name': p.business_name, 'business_phone': p.business_phone, 'business_address': p.business_address, 'business_license': p.business_license, 'created_at': p.user.created_at.isoformat()} for p in pending]
-    return Response(data)
+    return Response(dashboard.widgets(['pending_shopkeepers'])['pending_shopkeepers'])
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def admin_revenue_chart(request):
     if not is_admin(request.user):
         return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
-    end_date = timezone.now().date()
-    start_date = end_date - timedelta(days=30)
-    daily_revenue = Order.objects.filter(payment_status='paid', created_at__date__gte=start_date, created_at__date__lte=end_date).annotate(date=TruncDate('created_at')).values('date').annotate(revenue=Sum('total_amount'), orders=Count('id')).order_by('date')
-    data = [{'date': item['date'].isoformat(), 'revenue': float(item['revenue'] or 0), 'orders': item['orders']} for item in daily_revenue]
-    return Response(data)
+    return Response(dashboard.widgets(['revenue_chart'])['revenue_chart'])
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def admin_top_shops(request):
     if not is_admin(request.user):
         return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
-    shops = Shop.objects.annotate(total_orders=Count('orders'), total_revenue=Sum('orders__total_amount')).order_by('-total_revenue')[:5]
-    data = [{'id': s.id, 'name': s.name, 'owner': s.owner.username, 'total_orders': s.total_orders, 'total_revenue': float(s.total_revenue or 0), 'average_rating': float(s.average_rating), 'status': s.status} for s in shops]
-    return Response(data)
+    # ?window=today|7d|30d|all (default all), read from the daily sales rollups
+    window = request.query_params.get('window', 'all')
+    if window not in leaderboard.WINDOWS:
+        return Response({'error': f"window must be one of {', '.join(leaderboard.WINDOWS)}"}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(leaderboard.top_shops(window))
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def admin_top_products(request):
     if not is_admin(request.user):
         return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
-    products = Product.objects.annotate(total_sold=Sum('orderitem__quantity'), total_revenue=Sum('orderitem__subtotal')).filter(total_sold__isnull=False).order_by('-total_sold')[:5]
-    data = [{'id': p.id, 'name': p.name, 'shop': p.shop.name, 'price': float(p.price), 'total_sold': p.total_sold or 0, 'total_revenue': float(p.total_revenue or 0), 'stock': p.stock_quantity} for p in products]
-    return Response(data)
+    # ?window=today|7d|30d|all (default all), read from the daily sales rollups
+    window = request.query_params.get('window', 'all')
+    if window not in leaderboard.WINDOWS:
+        return Response({'error': f"window must be one of {', '.join(leaderboard.WINDOWS)}"}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(leaderboard.top_products(window))
 
 
 # ============ CRUD OPERATIONS ============
@@ -119,12 +93,18 @@ def admin_users(request):
         return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
     
     if request.method == 'GET':
-        user_type = request.GET.get('type', None)
-        users = User.objects.all().order_by('-created_at')
-        if user_type:
-            users = users.filter(user_type=user_type)
-        data = [{'id': u.id, 'username': u.username, 'email': u.email, 'first_name': u.first_name, 'last_name': u.last_name, 'full_name': f"{u.first_name} {u.last_name}", 'user_type': u.user_type, 'phone_number': u.phone_number, 'address': u.address, 'is_active': u.is_active, 'is_verified': u.is_verified, 'created_at': u.created_at.isoformat()} for u in users[:100]]
-        return Response(data)
+        # ?type=&is_active=&is_verified=&q=<prefix>&limit=&cursor=; the next page's cursor is in X-Next-Cursor
+        try:
+            data, next_cursor = directory.user_directory(request.GET)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        response = Response(data)
+        if next_cursor:
+            params = request.GET.copy()
+            params['cursor'] = next_cursor
+            response['X-Next-Cursor'] = next_cursor
+            response['Link'] = f'<{request.build_absolute_uri(request.path)}?{params.urlencode()}>; rel="next"'
+        return response
     
     elif request.method == 'POST':
         data = request.data
@@ -243,12 +223,19 @@ def admin_order_detail(request, order_id):
         return Response({'id': order.id, 'order_number': order.order_number, 'customer': order.customer.username, 'shop': order.shop.name, 'total_amount': float(order.total_amount), 'status': order.status, 'payment_status': order.payment_status, 'delivery_address': order.delivery_address, 'items': items})
     elif request.method == 'PUT':
         data = request.data
-        order.status = data.get('status', order.status)
+        if data.get('status') and data['status'] != order.status:
+            # Admins may correct any status; the change is still logged
+            try:
+                transition(order, data['status'], actor=request.user, message='Status changed by admin', force=True)
+            except InvalidTransition as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         order.payment_status = data.get('payment_status', order.payment_status)
-        order.save()
+        order.save(update_fields=['payment_status', 'updated_at'])
         return Response({'message': 'Order updated successfully'})
     elif request.method == 'DELETE':
-        order.delete()
+        with transaction.atomic():
+            leaderboard.forget_orders(Order.objects.filter(pk=order.pk))
+            order.delete()
         return Response({'message': 'Order deleted successfully'})
 
 @api_view(['GET', 'POST'])
@@ -424,3 +411,97 @@ def admin_review_detail(request, review_id):
     elif request.method == 'DELETE':
         review.delete()
         return Response({'message': 'Review deleted successfully'})
+
+
+# ============ REPORT EXPORTS ============
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def admin_export_report(request, report):
+    if not is_admin(request.user):
+        return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
+    if report not in reports.REPORTS:
+        return Response({'error': 'Unknown report'}, status=status.HTTP_404_NOT_FOUND)
+    
+    try:
+        filters = reports.parse_filters(report, request.GET)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    excel = request.GET.get('output') == 'excel'
+    run_async = request.GET.get('async', '').lower() in reports.TRUE_VALUES
+    if run_async or reports.is_large_export(report, filters):
+        job_id = reports.start_export_job(report, filters, excel)
+        return Response({
+            'job_id': job_id,
+            'status': 'running',
+            'status_url': f'/api/auth/admin/reports/jobs/{job_id}/',
+        }, status=status.HTTP_202_ACCEPTED)
+    
+    return reports.streaming_response(report, filters, excel)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def admin_export_job(request, job_id):
+    if not is_admin(request.user):
+        return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
+    job_status = reports.job_status(str(job_id))
+    if job_status is None:
+        return Response({'error': 'Export job not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    data = {'job_id': str(job_id), 'status': job_status}
+    if job_status == 'completed':
+        data['download_url'] = f'/api/auth/admin/reports/jobs/{job_id}/download/'
+    elif job_status == 'failed':
+        data['error'] = reports.job_path(str(job_id), '.error').read_text()
+    return Response(data)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def admin_export_download(request, job_id):
+    if not is_admin(request.user):
+        return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
+    if reports.job_status(str(job_id)) != 'completed':
+        return Response({'error': 'Export is not ready'}, status=status.HTTP_404_NOT_FOUND)
+    return FileResponse(open(reports.job_path(str(job_id)), 'rb'), as_attachment=True, filename=f'{job_id}.csv', content_type='text/csv')
+
+
+# ============ BULK ACTIONS ============
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def admin_bulk_action(request, resource):
+    if not is_admin(request.user):
+        return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
+    
+    data = request.data
+    try:
+        audit = bulk_actions.apply_bulk_action(
+            request.user,
+            resource,
+            data.get('action'),
+            ids=data.get('ids'),
+            filters=data.get('filters'),
+        )
+    except bulk_actions.BulkActionError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({
+        'message': f'{audit.action} applied to {audit.affected_count} {resource}',
+        'action': audit.action,
+        'affected': audit.affected_count,
+        'ids': audit.object_ids,
+        'audit_id': audit.id,
+    })
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def admin_audit_log(request):
+    if not is_admin(request.user):
+        return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
+    logs = AdminAuditLog.objects.select_related('actor').order_by('-created_at')
+    resource = request.GET.get('resource')
+    if resource:
+        logs = logs.filter(resource=resource)
+    data = [{'id': log.id, 'actor': log.actor.username if log.actor else None, 'resource': log.resource, 'action': log.action, 'affected_count': log.affected_count, 'object_ids': log.object_ids, 'filters': log.filters, 'created_at': log.created_at.isoformat()} for log in logs[:100]]
+    return Response(data)
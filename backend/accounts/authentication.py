@@ -0,0 +1,142 @@
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from .models import User
+from .tokens import StoredRefreshToken
+
+# User fields carried in the token, in addition to the user id
+USER_CLAIMS = ('username', 'user_type', 'is_active')
+CLAIMS_CHANGED_TTL = int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds())
+LOCAL_CHECK_TTL = getattr(settings, 'AUTH_CLAIMS_CHECK_TTL', 5)
+# Caches that live inside one process: a change marked in one worker would
+# never reach the others, so the claims cannot be trusted with them
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+FAST_PATH = getattr(settings, 'AUTH_CLAIMS_FAST_PATH', None)
+if FAST_PATH is None:
+    FAST_PATH = settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES
+
+
+def owned_shop_id(user):
+    if user.user_type != 'shopkeeper':
+        return None
+    from shops.models import Shop
+    return Shop.objects.filter(owner=user).values_list('id', flat=True).first()
+
+
+def set_claims(token, user, shop_id):
+    for field in USER_CLAIMS:
+        token[field] = getattr(user, field)
+    token['shop_id'] = shop_id
+
+
+def tokens_for_user(user):
+    """Refresh token (and through it the access token) carrying the user's claims"""
+    refresh = StoredRefreshToken.for_user(user)
+    set_claims(refresh, user, owned_shop_id(user))
+    return refresh
+
+
+class ClaimsChanges:
+    """
+    When each user's claims last changed (role, activation, shop), kept in
+    the shared cache for one access-token lifetime. Lookups are memoised in
+    the process for LOCAL_CHECK_TTL seconds, so most requests make no cache
+    round trip; a change is seen everywhere within that window.
+    """
+
+    def __init__(self):
+        self.local = {}
+        self.lock = threading.Lock()
+
+    def key(self, user_id):
+        return f'auth_claims_changed:{user_id}'
+
+    def mark(self, *user_ids):
+        user_ids = [str(user_id) for user_id in user_ids]  # tokens carry the id as a string
+        changed_at = time.time()
+        cache.set_many({self.key(user_id): changed_at for user_id in user_ids}, CLAIMS_CHANGED_TTL)
+        with self.lock:
+            for user_id in user_ids:
+                self.local[user_id] = (changed_at, time.monotonic())
+
+    def changed_at(self, user_id):
+        user_id = str(user_id)
+        now = time.monotonic()
+        entry = self.local.get(user_id)
+        if entry is not None and now - entry[1] < LOCAL_CHECK_TTL:
+            return entry[0]
+        changed_at = cache.get(self.key(user_id))
+        with self.lock:
+            if len(self.local) > 10000:
+                self.local.clear()
+            self.local[user_id] = (changed_at, now)
+        return changed_at
+
+
+claims_changes = ClaimsChanges()
+
+
+def full_user(user):
+    """
+    The whole row for a request user. One built from token claims only has
+    the claimed fields loaded, and every other field read would cost its
+    own query; views that serialize the user or check its password load
+    it once here instead.
+    """
+    if user.get_deferred_fields():
+        return User.objects.get(pk=user.pk)
+    return user
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    Builds request.user from the token's claims instead of loading the user
+    row. The instance only has the claimed fields; anything else is loaded
+    on first access and save() writes only the loaded fields. Tokens issued
+    before the user's claims changed, and every token when FAST_PATH is off,
+    fall back to the database lookup.
+    """
+
+    def get_user(self, validated_token):
+        if not FAST_PATH or 'user_type' not in validated_token:
+            return super().get_user(validated_token)
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        changed_at = claims_changes.changed_at(user_id)
+        if changed_at is not None and validated_token.get('iat', 0) <= changed_at:
+            return super().get_user(validated_token)
+
+        if not validated_token['is_active']:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+        values = {'id': User._meta.pk.to_python(user_id), **{field: validated_token[field] for field in USER_CLAIMS}}
+        names = [f.attname for f in User._meta.concrete_fields if f.attname in values]
+        user = User.from_db('default', names, [values[name] for name in names])
+        user.token_shop_id = validated_token.get('shop_id')
+        return user
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refreshing re-reads the user so new tokens carry current claims"""
+    token_class = StoredRefreshToken
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        access = self.token_class.access_token_class(data['access'])
+        user = User.objects.filter(id=access[api_settings.USER_ID_CLAIM]).first()
+        if user is None or not user.is_active:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+        shop_id = owned_shop_id(user)
+        set_claims(access, user, shop_id)
+        data['access'] = str(access)
+        if 'refresh' in data:
+            refresh = self.token_class(data['refresh'])
+            set_claims(refresh, user, shop_id)
+            data['refresh'] = str(refresh)
+        return data
@@ -0,0 +1,177 @@
+from functools import partial
+from django.db import transaction
+from django.utils import timezone
+from accounts import dashboard
+from accounts.authentication import claims_changes
+from accounts.models import User, ShopkeeperProfile, AdminAuditLog
+from shops.context import invalidate_shopkeeper_context
+from orders.leaderboard import forget_orders, keeping_totals
+from orders.models import Order
+from shops.models import Shop, Product, Review
+
+
+class BulkActionError(Exception):
+    pass
+
+
+def _parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value).lower() in ('1', 'true', 'yes')
+
+
+# Each resource declares the filter expressions it accepts (field -> parser)
+# and its actions. An action is either a dict of field changes applied with
+# QuerySet.update, 'delete', or a callable taking (queryset, now).
+def _approve_shopkeepers(queryset, now):
+    invalidate_shopkeeper_context(*queryset.values_list('user_id', flat=True))
+    transaction.on_commit(partial(dashboard.invalidate, 'pending_shopkeepers', 'stats'))
+    User.objects.filter(id__in=queryset.values('user_id')).update(is_verified=True, updated_at=now)
+    return queryset.update(verification_status='approved', approved_at=now)
+
+
+def _reject_shopkeepers(queryset, now):
+    invalidate_shopkeeper_context(*queryset.values_list('user_id', flat=True))
+    transaction.on_commit(partial(dashboard.invalidate, 'pending_shopkeepers', 'stats'))
+    return queryset.update(verification_status='rejected')
+
+
+RESOURCES = {
+    'users': {
+        'model': User,
+        'filters': {'user_type': str, 'is_active': _parse_bool, 'is_verified': _parse_bool},
+        'actions': {
+            'activate': {'is_active': True},
+            'deactivate': {'is_active': False},
+            'verify': {'is_verified': True},
+            'unverify': {'is_verified': False},
+            'delete': 'delete',
+        },
+        'timestamped': True,
+    },
+    'shops': {
+        'model': Shop,
+        'filters': {'status': str, 'owner_id': int, 'offers_delivery': _parse_bool},
+        'actions': {
+            'activate': {'status': 'active'},
+            'deactivate': {'status': 'inactive'},
+            'suspend': {'status': 'suspended'},
+            'delete': 'delete',
+        },
+        'timestamped': True,
+    },
+    'products': {
+        'model': Product,
+        'filters': {'status': str, 'shop_id': int, 'category_id': int, 'is_featured': _parse_bool},
+        'actions': {
+            'mark_available': {'status': 'available'},
+            'mark_out_of_stock': {'status': 'out_of_stock'},
+            'discontinue': {'status': 'discontinued'},
+            'feature': {'is_featured': True},
+            'unfeature': {'is_featured': False},
+            'delete': 'delete',
+        },
+        'timestamped': True,
+    },
+    'reviews': {
+        'model': Review,
+        'filters': {'rating': int, 'is_approved': _parse_bool, 'is_verified': _parse_bool,
+                    'product_id': int, 'shop_id': int, 'customer_id': int},
+        'actions': {
+            'approve': {'is_approved': True},
+            'unapprove': {'is_approved': False},
+            'verify': {'is_verified': True},
+            'delete': 'delete',
+        },
+        'timestamped': True,
+    },
+    'shopkeepers': {
+        'model': ShopkeeperProfile,
+        'filters': {'verification_status': str, 'user_id': int},
+        'actions': {
+            'approve': _approve_shopkeepers,
+            'reject': _reject_shopkeepers,
+        },
+        'timestamped': False,
+    },
+}
+
+
+def _build_queryset(resource, ids, filters):
+    definition = RESOURCES[resource]
+    if not ids and not filters:
+        raise BulkActionError('Provide ids or filters to select the rows to change')
+
+    queryset = definition['model'].objects.all()
+    if ids:
+        if not isinstance(ids, list):
+            raise BulkActionError('ids must be a list')
+        try:
+            queryset = queryset.filter(id__in=[int(i) for i in ids])
+        except (TypeError, ValueError):
+            raise BulkActionError('ids must be integers')
+    if filters:
+        if not isinstance(filters, dict):
+            raise BulkActionError('filters must be an object')
+        lookups = {}
+        for field, value in filters.items():
+            parser = definition['filters'].get(field)
+            if parser is None:
+                raise BulkActionError(f"Unsupported filter '{field}' for {resource}")
+            try:
+                lookups[field] = parser(value)
+            except (TypeError, ValueError):
+                raise BulkActionError(f"Invalid value for filter '{field}'")
+        queryset = queryset.filter(**lookups)
+    return queryset
+
+
+def apply_bulk_action(actor, resource, action, ids=None, filters=None):
+    """Apply one action to every selected row in a single transaction and audit it"""
+    if resource not in RESOURCES:
+        raise BulkActionError(f"Unknown resource '{resource}'")
+    definition = RESOURCES[resource]
+    operation = definition['actions'].get(action)
+    if operation is None:
+        raise BulkActionError(f"Unsupported action '{action}' for {resource}")
+
+    queryset = _build_queryset(resource, ids, filters)
+    if resource == 'users':
+        # Admin accounts are managed individually, and admins cannot lock themselves out
+        queryset = queryset.exclude(user_type='admin').exclude(id=actor.id)
+
+    now = timezone.now()
+    with transaction.atomic():
+        object_ids = list(queryset.select_for_update().order_by('id').values_list('id', flat=True))
+        queryset = definition['model'].objects.filter(id__in=object_ids)
+        if resource == 'users':
+            # update() sends no post_save, so tokens still claiming the old
+            # is_active or user_type have to be told directly
+            transaction.on_commit(partial(claims_changes.mark, *object_ids))
+        if operation == 'delete':
+            if resource == 'users':
+                # Take all their orders out of the rankings at once rather
+                # than per user from the pre_delete receiver
+                forget_orders(Order.objects.filter(customer_id__in=object_ids))
+                with keeping_totals():
+                    queryset.delete()
+            else:
+                queryset.delete()
+            affected = len(object_ids)
+        elif callable(operation):
+            affected = operation(queryset, now)
+        else:
+            changes = dict(operation)
+            if definition['timestamped']:
+                changes['updated_at'] = now
+            affected = queryset.update(**changes)
+
+        audit = AdminAuditLog.objects.create(
+            actor=actor,
+            resource=resource,
+            action=action,
+            object_ids=object_ids,
+            filters=filters or {},
+            affected_count=affected,
+        )
+    return audit
@@ -0,0 +1,138 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.db.models import Avg, Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from accounts.models import User, ShopkeeperProfile
+from shops.models import Shop, Product, Category, Review
+from orders import leaderboard
+from orders.models import Order
+
+WORKERS = getattr(settings, 'DASHBOARD_WORKERS', 4)
+
+
+def stats():
+    # One conditional aggregate per table instead of a query per figure
+    today = timezone.now().date()
+    month_start = today.replace(day=1)
+    users = User.objects.aggregate(total=Count('id'), customers=Count('id', filter=Q(user_type='customer')),
+                                   shopkeepers=Count('id', filter=Q(user_type='shopkeeper')))
+    shops = Shop.objects.aggregate(total=Count('id'), active=Count('id', filter=Q(status='active')))
+    pending_shopkeepers = ShopkeeperProfile.objects.filter(verification_status='pending').count()
+    products = Product.objects.aggregate(total=Count('id'), available=Count('id', filter=Q(status='available')),
+                                         out_of_stock=Count('id', filter=Q(status='out_of_stock')))
+    paid = Q(payment_status='paid')
+    orders = Order.objects.aggregate(
+        total=Count('id'),
+        pending=Count('id', filter=Q(status='pending')),
+        completed=Count('id', filter=Q(status='delivered')),
+        cancelled=Count('id', filter=Q(status='cancelled')),
+        monthly=Count('id', filter=Q(created_at__date__gte=month_start)),
+        revenue_total=Sum('total_amount', filter=paid),
+        revenue_today=Sum('total_amount', filter=paid & Q(created_at__date=today)),
+        revenue_monthly=Sum('total_amount', filter=paid & Q(created_at__date__gte=month_start)),
+    )
+    total_categories = Category.objects.filter(is_active=True).count()
+    reviews = Review.objects.aggregate(total=Count('id'), avg=Avg('rating'))
+
+    return {
+        'users': users,
+        'shops': {'total': shops['total'], 'active': shops['active'], 'pending_verification': pending_shopkeepers},
+        'products': products,
+        'orders': {'total': orders['total'], 'pending': orders['pending'], 'completed': orders['completed'], 'cancelled': orders['cancelled']},
+        'revenue': {'total': float(orders['revenue_total'] or 0), 'today': float(orders['revenue_today'] or 0), 'monthly': float(orders['revenue_monthly'] or 0)},
+        'categories': total_categories,
+        'reviews': {'total': reviews['total'], 'average_rating': round(float(reviews['avg'] or 0), 2)},
+        'monthly_orders': orders['monthly'],
+    }
+
+
+def recent_orders():
+    orders = Order.objects.select_related('customer', 'shop').order_by('-created_at')[:10]
+    return [{'id': o.id, 'order_number': o.order_number, 'customer': o.customer.username, 'customer_name': f"{o.customer.first_name} {o.customer.last_name}", 'shop': o.shop.name, 'total_amount': float(o.total_amount), 'status': o.status, 'payment_status': o.payment_status, 'created_at': o.created_at.isoformat()} for o in orders]
+
+
+def recent_users():
+    users = User.objects.order_by('-created_at')[:10]
+    return [{'id': u.id, 'username': u.username, 'email': u.email, 'full_name': f"{u.first_name} {u.last_name}", 'user_type': u.user_type, 'is_verified': u.is_verified, 'created_at': u.created_at.isoformat()} for u in users]
+
+
+def pending_shopkeepers():
+    pending = ShopkeeperProfile.objects.filter(verification_status='pending').select_related('user')
+    return [{'id': p.id, 'user_id': p.user.id, 'username': p.user.username, 'email': p.user.email, 'business_name': p.business_name, 'business_phone': p.business_phone, 'business_address': p.business_address, 'business_license': p.business_license, 'created_at': p.user.created_at.isoformat()} for p in pending]
+
+
+def revenue_chart():
+    end_date = timezone.now().date()
+    start_date = end_date - timedelta(days=30)
+    daily_revenue = Order.objects.filter(payment_status='paid', created_at__date__gte=start_date, created_at__date__lte=end_date).annotate(date=TruncDate('created_at')).values('date').annotate(revenue=Sum('total_amount'), orders=Count('id')).order_by('date')
+    return [{'date': item['date'].isoformat(), 'revenue': float(item['revenue'] or 0), 'orders': item['orders']} for item in daily_revenue]
+
+
+def top_shops():
+    return leaderboard.top_shops()
+
+
+def top_products():
+    return leaderboard.top_products()
+
+
+# Widget name -> (function, seconds its result stays cached)
+WIDGETS = {
+    'stats': (stats, 30),
+    'recent_orders': (recent_orders, 15),
+    'recent_users': (recent_users, 30),
+    'pending_shopkeepers': (pending_shopkeepers, 15),
+    'revenue_chart': (revenue_chart, 300),
+    # The rankings keep their own short cache in orders.leaderboard
+    'top_shops': (top_shops, 60),
+    'top_products': (top_products, 60),
+}
+TTLS = {name: ttl for name, (_, ttl) in WIDGETS.items()}
+TTLS.update(getattr(settings, 'DASHBOARD_WIDGET_TTLS', {}))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _cache_key(name):
+    return f'admin_dashboard:{name}'
+
+
+def _compute(name):
+    close_old_connections()
+    try:
+        return WIDGETS[name][0]()
+    finally:
+        close_old_connections()
+
+
+def widgets(names):
+    """
+    {name: data} for the given widgets. Cached ones come from one get_many;
+    the rest are computed at the same time on a small thread pool (each
+    thread with its own database connection) and cached for their TTL.
+    """
+    global _executor
+    found = cache.get_many([_cache_key(name) for name in names])
+    data = {name: found[_cache_key(name)] for name in names if _cache_key(name) in found}
+    missing = [name for name in names if name not in data]
+    if len(missing) == 1:
+        data[missing[0]] = WIDGETS[missing[0]][0]()
+    elif missing:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='dashboard')
+        futures = {name: _executor.submit(_compute, name) for name in missing}
+        data.update((name, future.result()) for name, future in futures.items())
+    for name in missing:
+        cache.set(_cache_key(name), data[name], TTLS[name])
+    return {name: data[name] for name in names}
+
+
+def invalidate(*names):
+    cache.delete_many([_cache_key(name) for name in names])
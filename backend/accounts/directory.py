@@ -0,0 +1,78 @@
+import base64
+import json
+from django.db.models import Q, Value
+from django.db.models.functions import Concat, Lower
+from django.utils.dateparse import parse_datetime
+from accounts.models import User
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+TRUE_VALUES = ('1', 'true', 'yes')
+FIELDS = ('id', 'username', 'email', 'first_name', 'last_name', 'full_name', 'user_type',
+          'phone_number', 'address', 'is_active', 'is_verified', 'created_at')
+# Upper bound for a prefix range: every string starting with the prefix sorts below prefix + this
+PREFIX_END = '\U0010ffff'
+
+
+def _prefix(expression, prefix):
+    """
+    Prefix match written as a range, so the database can answer it from a
+    plain (or expression) b-tree index; LIKE 'x%' often cannot use one.
+    """
+    return Q(**{f'{expression}__gte': prefix, f'{expression}__lt': prefix + PREFIX_END})
+
+
+def encode_cursor(row):
+    raw = json.dumps([row['created_at'].isoformat(), row['id']]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, user_id = json.loads(raw)
+        created_at = parse_datetime(created_at)
+        if created_at is None:
+            raise ValueError
+        return created_at, int(user_id)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+
+def user_directory(params):
+    """
+    One page of users, newest first, as plain dicts from values(), and the
+    cursor for the next page (None on the last). Filters (type, is_active,
+    is_verified) and the prefix search q over username, email and phone all
+    have matching indexes, and keyset pagination on (created_at, id) never
+    counts or skips rows, so a page costs the same at any depth. Raises
+    ValueError for bad parameters.
+    """
+    try:
+        limit = min(max(int(params.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+    except ValueError:
+        raise ValueError('limit must be a number')
+
+    users = User.objects.all()
+    if params.get('type'):
+        users = users.filter(user_type=params['type'])
+    for flag in ('is_active', 'is_verified'):
+        if params.get(flag):
+            users = users.filter(**{flag: params[flag].lower() in TRUE_VALUES})
+
+    search = (params.get('q') or '').strip()
+    if search:
+        users = users.annotate(username_lower=Lower('username'), email_lower=Lower('email')).filter(
+            _prefix('username_lower', search.lower())
+            | _prefix('email_lower', search.lower())
+            | _prefix('phone_number', search)
+        )
+
+    if params.get('cursor'):
+        created_at, user_id = decode_cursor(params['cursor'])
+        users = users.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=user_id))
+
+    rows = list(users.annotate(full_name=Concat('first_name', Value(' '), 'last_name'))
+                .order_by('-created_at', '-id').values(*FIELDS)[:limit + 1])
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, PBKDF2PasswordHasher
+
+ARGON2 = {'time_cost': 2, 'memory_cost': 19456, 'parallelism': 1, **getattr(settings, 'PASSWORD_ARGON2', {})}
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """
+    Argon2id with the costs in settings.PASSWORD_ARGON2 (memory_cost in KiB).
+    Hashes made with other costs, or by another hasher, are rewritten with
+    these on the user's next successful login.
+    """
+    time_cost = ARGON2['time_cost']
+    memory_cost = ARGON2['memory_cost']
+    parallelism = ARGON2['parallelism']
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2-SHA256 with settings.PASSWORD_PBKDF2_ITERATIONS, used when argon2-cffi is not installed"""
+    iterations = getattr(settings, 'PASSWORD_PBKDF2_ITERATIONS', PBKDF2PasswordHasher.iterations)
@@ -0,0 +1,44 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+
+class Command(BaseCommand):
+    help = ('Delete expired outstanding and blacklisted refresh tokens in small batches. '
+            'Run it daily (for example from cron).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='rows examined per batch')
+        parser.add_argument('--pause', type=float, default=0.05, help='seconds to sleep between batches that deleted rows')
+        parser.add_argument('--dry-run', action='store_true', help='only report how many rows would be deleted')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        now = timezone.now()
+        if options['dry_run']:
+            expired = OutstandingToken.objects.filter(expires_at__lte=now)
+            blacklisted = BlacklistedToken.objects.filter(token__expires_at__lte=now).count()
+            self.stdout.write(f'{expired.count()} expired token(s), {blacklisted} of them blacklisted, would be deleted')
+            return
+
+        # Walk the table in primary-key order so each batch is a short range
+        # read and a short transaction, rather than one long delete
+        last_id, deleted = 0, 0
+        while True:
+            batch = list(OutstandingToken.objects.filter(id__gt=last_id).order_by('id')
+                         .values_list('id', 'expires_at')[:options['batch_size']])
+            if not batch:
+                break
+            last_id = batch[-1][0]
+            expired = [token_id for token_id, expires_at in batch if expires_at <= now]
+            if not expired:
+                continue
+            with transaction.atomic():
+                BlacklistedToken.objects.filter(token_id__in=expired).delete()
+                OutstandingToken.objects.filter(id__in=expired).delete()
+            deleted += len(expired)
+            time.sleep(options['pause'])
+
+        self.stdout.write(f'Deleted {deleted} expired token(s) in {time.perf_counter() - started:.1f}s')
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.functions import Lower
 from django.core.validators import RegexValidator
 
 class User(AbstractUser):
@@ -14,10 +15,22 @@ class User(AbstractUser):
     phone_number = models.CharField(validators=[phone_regex], max_length=17, blank=True)
     address = models.TextField(blank=True)
     profile_picture = models.ImageField(upload_to='profile_pics/', blank=True, null=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)  # filled by shops.images
     is_verified = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta(AbstractUser.Meta):
+        # Admin user directory (accounts.directory): newest-first keyset pages,
+        # optionally by type, and prefix search on username, email and phone
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='user_created_idx'),
+            models.Index(fields=['user_type', '-created_at', '-id'], name='user_type_created_idx'),
+            models.Index(Lower('username'), name='user_username_lower_idx'),
+            models.Index(Lower('email'), name='user_email_lower_idx'),
+            models.Index(fields=['phone_number'], name='user_phone_idx'),
+        ]
+
     def __str__(self):
         return f"{self.username} ({self.user_type})"
 
@@ -47,4 +60,19 @@ class ShopkeeperProfile(models.Model):
     approved_at = models.DateTimeField(blank=True, null=True)
     
     def __str__(self):
-        return f"Shopkeeper: {self.business_name} ({self.user.username})"
\ No newline at end of file
+        return f"Shopkeeper: {self.business_name} ({self.user.username})"
+
+class AdminAuditLog(models.Model):
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='audit_logs')
+    resource = models.CharField(max_length=50)
+    action = models.CharField(max_length=50)
+    object_ids = models.JSONField(default=list, blank=True)
+    filters = models.JSONField(default=dict, blank=True)
+    affected_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.action} on {self.affected_count} {self.resource} by {self.actor}"
@@ -0,0 +1,81 @@
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+# scope -> (attempts, window in seconds)
+LIMITS = {
+    'login_ip': (30, 60),
+    'login_user': (10, 900),
+    'register_ip': (10, 3600),
+    **getattr(settings, 'AUTH_RATE_LIMITS', {}),
+}
+TRUSTED_PROXY_COUNT = getattr(settings, 'TRUSTED_PROXY_COUNT', 0)
+
+
+class RateLimiter:
+    """
+    Fixed-window attempt counter in the cache, one per scope and identifier
+    (client IP, username). Checked before any password is hashed, so floods
+    are turned away for the price of a cache read.
+    """
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.limit, self.window = LIMITS[scope]
+
+    def key(self, ident, now):
+        digest = hashlib.sha256(str(ident).lower().encode()).hexdigest()[:32]
+        return f'ratelimit:{self.scope}:{digest}:{int(now // self.window)}'
+
+    def hit(self, ident):
+        key = self.key(ident, time.time())
+        if cache.add(key, 1, self.window):
+            return
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 1, self.window)
+
+    def reset(self, ident):
+        cache.delete(self.key(ident, time.time()))
+
+
+def retry_after(*checks):
+    """
+    Seconds until every exhausted (limiter, ident) pair frees up, or 0 when
+    none is. All counters are read in one cache round trip.
+    """
+    now = time.time()
+    keys = {limiter.key(ident, now): limiter for limiter, ident in checks}
+    counts = cache.get_many(keys)
+    waits = [limiter.window - int(now % limiter.window)
+             for key, limiter in keys.items() if counts.get(key, 0) >= limiter.limit]
+    return max(waits, default=0)
+
+
+def client_ip(request):
+    """
+    The client's address: behind TRUSTED_PROXY_COUNT proxies, the
+    X-Forwarded-For entry the outermost one appended (entries further left
+    come from the client and cannot be trusted); otherwise REMOTE_ADDR.
+    """
+    if TRUSTED_PROXY_COUNT:
+        forwarded = [hop.strip() for hop in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if hop.strip()]
+        if len(forwarded) >= TRUSTED_PROXY_COUNT:
+            return forwarded[-TRUSTED_PROXY_COUNT]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def too_many_attempts(seconds):
+    response = Response({'error': 'Too many attempts, please try again later'},
+                        status=status.HTTP_429_TOO_MANY_REQUESTS)
+    response['Retry-After'] = str(seconds)
+    return response
+
+
+login_ip = RateLimiter('login_ip')
+login_user = RateLimiter('login_user')
+register_ip = RateLimiter('register_ip')
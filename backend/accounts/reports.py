@@ -0,0 +1,213 @@
+import csv
+import os
+import threading
+import uuid
+from pathlib import Path
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from accounts.models import User
+from shops.models import Product, Review
+from orders.models import Order
+
+EXPORT_CHUNK_SIZE = getattr(settings, 'REPORT_EXPORT_CHUNK_SIZE', 2000)
+ASYNC_EXPORT_THRESHOLD = getattr(settings, 'REPORT_ASYNC_EXPORT_THRESHOLD', 100000)
+EXPORT_ROOT = Path(getattr(settings, 'REPORT_EXPORT_ROOT', settings.BASE_DIR / 'exports'))
+
+TRUE_VALUES = ('1', 'true', 'yes')
+
+
+def _parse_bool(value):
+    return value.lower() in TRUE_VALUES
+
+
+def _orders_queryset(filters):
+    return Order.objects.filter(**filters).order_by('id').values_list(
+        'id', 'order_number', 'customer__username', 'customer__email', 'shop__name',
+        'status', 'payment_status', 'payment_method', 'subtotal', 'delivery_fee',
+        'discount_amount', 'total_amount', 'created_at',
+    )
+
+
+def _users_queryset(filters):
+    return User.objects.filter(**filters).order_by('id').values_list(
+        'id', 'username', 'email', 'first_name', 'last_name', 'user_type',
+        'phone_number', 'is_active', 'is_verified', 'created_at',
+    )
+
+
+def _products_queryset(filters):
+    return Product.objects.filter(**filters).order_by('id').values_list(
+        'id', 'sku', 'name', 'shop__name', 'category__name', 'price', 'discount_price',
+        'stock_quantity', 'status', 'is_featured', 'average_rating', 'created_at',
+    )
+
+
+def _reviews_queryset(filters):
+    return Review.objects.filter(**filters).order_by('id').values_list(
+        'id', 'customer__username', 'product__name', 'shop__name', 'rating', 'title',
+        'is_verified', 'is_approved', 'created_at',
+    )
+
+
+def _revenue_queryset(filters):
+    return Order.objects.filter(payment_status='paid', **filters).annotate(
+        date=TruncDate('created_at')
+    ).values('date').annotate(
+        revenue=Sum('total_amount'), orders=Count('id')
+    ).order_by('date').values_list('date', 'orders', 'revenue')
+
+
+# Each report declares its columns, a values_list queryset and the query
+# parameters it accepts as filters (param -> (lookup, parser)).
+REPORTS = {
+    'orders': {
+        'columns': ('id', 'order_number', 'customer', 'customer_email', 'shop', 'status',
+                    'payment_status', 'payment_method', 'subtotal', 'delivery_fee',
+                    'discount_amount', 'total_amount', 'created_at'),
+        'queryset': _orders_queryset,
+        'date_field': 'created_at',
+        'filters': {'status': ('status', str), 'payment_status': ('payment_status', str), 'shop': ('shop_id', int)},
+    },
+    'users': {
+        'columns': ('id', 'username', 'email', 'first_name', 'last_name', 'user_type',
+                    'phone_number', 'is_active', 'is_verified', 'created_at'),
+        'queryset': _users_queryset,
+        'date_field': 'created_at',
+        'filters': {'type': ('user_type', str), 'status': ('is_active', lambda v: v == 'active')},
+    },
+    'products': {
+        'columns': ('id', 'sku', 'name', 'shop', 'category', 'price', 'discount_price',
+                    'stock_quantity', 'status', 'is_featured', 'average_rating', 'created_at'),
+        'queryset': _products_queryset,
+        'date_field': 'created_at',
+        'filters': {'status': ('status', str), 'shop': ('shop_id', int)},
+    },
+    'reviews': {
+        'columns': ('id', 'customer', 'product', 'shop', 'rating', 'title', 'is_verified',
+                    'is_approved', 'created_at'),
+        'queryset': _reviews_queryset,
+        'date_field': 'created_at',
+        'filters': {'rating': ('rating', int), 'approved': ('is_approved', _parse_bool)},
+    },
+    'revenue': {
+        'columns': ('date', 'orders', 'revenue'),
+        'queryset': _revenue_queryset,
+        'date_field': 'created_at',
+        'filters': {'shop': ('shop_id', int)},
+    },
+}
+
+
+def parse_filters(report, params):
+    """Translate query parameters into ORM lookups, raising ValueError on bad input"""
+    definition = REPORTS[report]
+    date_field = definition['date_field']
+    filters = {}
+    for param, (lookup, parser) in definition['filters'].items():
+        value = params.get(param)
+        if value:
+            filters[lookup] = parser(value)
+    for param, lookup in (('start_date', '__date__gte'), ('end_date', '__date__lte')):
+        value = params.get(param)
+        if value:
+            parsed = parse_date(value)
+            if parsed is None:
+                raise ValueError(f'{param} must be in YYYY-MM-DD format')
+            filters[date_field + lookup] = parsed
+    return filters
+
+
+def build_queryset(report, filters):
+    return REPORTS[report]['queryset'](filters)
+
+
+def is_large_export(report, filters):
+    """Check whether an export exceeds the async threshold without a full COUNT(*)"""
+    if report == 'revenue':
+        return False
+    return build_queryset(report, filters)[:ASYNC_EXPORT_THRESHOLD + 1].count() > ASYNC_EXPORT_THRESHOLD
+
+
+class Echo:
+    """Pseudo-buffer that hands each written CSV line straight back to the caller"""
+
+    def write(self, value):
+        return value
+
+
+def _clean_cell(value, excel):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    # Spreadsheet apps evaluate cells starting with these characters as formulas
+    if excel and isinstance(value, str) and value[:1] in ('=', '+', '-', '@'):
+        return "'" + value
+    return value
+
+
+def iter_rows(report, filters, excel=False):
+    """Yield encoded CSV lines for a report, reading the database in chunks"""
+    writer = csv.writer(Echo())
+    if excel:
+        yield '\ufeff'
+    yield writer.writerow(REPORTS[report]['columns'])
+    for row in build_queryset(report, filters).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield writer.writerow([_clean_cell(value, excel) for value in row])
+
+
+def export_filename(report, excel=False):
+    suffix = '-excel' if excel else ''
+    return f"{report}-{timezone.now():%Y%m%d-%H%M%S}{suffix}.csv"
+
+
+def streaming_response(report, filters, excel=False):
+    response = StreamingHttpResponse(iter_rows(report, filters, excel), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{export_filename(report, excel)}"'
+    return response
+
+
+# ============ BACKGROUND EXPORTS ============
+
+def job_path(job_id, suffix='.csv'):
+    return EXPORT_ROOT / f"{job_id}{suffix}"
+
+
+def _run_export_job(job_id, report, filters, excel):
+    part_path = job_path(job_id, '.part')
+    try:
+        with open(part_path, 'w', newline='', encoding='utf-8') as handle:
+            for line in iter_rows(report, filters, excel):
+                handle.write(line)
+        os.replace(part_path, job_path(job_id))
+    except Exception as e:
+        job_path(job_id, '.error').write_text(str(e))
+        if part_path.exists():
+            part_path.unlink()
+    finally:
+        connection.close()
+
+
+def start_export_job(report, filters, excel=False):
+    """Write the export to EXPORT_ROOT on a background thread and return its job id"""
+    EXPORT_ROOT.mkdir(parents=True, exist_ok=True)
+    job_id = str(uuid.uuid4())
+    job_path(job_id, '.part').touch()
+    thread = threading.Thread(target=_run_export_job, args=(job_id, report, filters, excel), daemon=True)
+    thread.start()
+    return job_id
+
+
+def job_status(job_id):
+    if job_path(job_id).exists():
+        return 'completed'
+    if job_path(job_id, '.error').exists():
+        return 'failed'
+    if job_path(job_id, '.part').exists():
+        return 'running'
+    return None
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
+from shops.serializers import ImageVariantsField
 from .models import User, CustomerProfile, ShopkeeperProfile
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -54,11 +55,13 @@ class UserLoginSerializer(serializers.Serializer):
             raise serializers.ValidationError('Must include username and password')
 
 class UserSerializer(serializers.ModelSerializer):
+    image_variants = ImageVariantsField()
+    
     class Meta:
         model = User
         fields = ('id', 'username', 'email', 'first_name', 'last_name', 
                  'phone_number', 'address', 'user_type', 'profile_picture', 
-                 'is_verified', 'created_at')
+                 'image_variants', 'is_verified', 'created_at')
         read_only_fields = ('id', 'username', 'user_type', 'created_at', 'is_verified')
 
 class CustomerProfileSerializer(serializers.ModelSerializer):
@@ -0,0 +1,29 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .authentication import USER_CLAIMS, claims_changes
+from .models import User
+
+
+@receiver(post_save, sender=User)
+def user_claims_changed(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        return
+    if update_fields is None or set(update_fields) & set(USER_CLAIMS):
+        claims_changes.mark(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    claims_changes.mark(instance.pk)
+
+
+@receiver(post_save, sender='shops.Shop')
+def shop_created(sender, instance, created, **kwargs):
+    # The owner's tokens carry shop_id, which only changes when a shop appears
+    if created:
+        claims_changes.mark(instance.owner_id)
+
+
+@receiver(post_delete, sender='shops.Shop')
+def shop_deleted(sender, instance, **kwargs):
+    claims_changes.mark(instance.owner_id)
@@ -1,3 +1,89 @@
-from django.test import TestCase
+from datetime import datetime, timezone
+from unittest import mock
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from .directory import decode_cursor, encode_cursor, user_directory
+from .models import User
+from .ratelimit import RateLimiter, retry_after
+from .tokens import BloomFilter
 
-# Create your tests here.
+
+class RateLimiterTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.limiter = RateLimiter('login_user')
+        self.limiter.limit, self.limiter.window = 3, 60
+
+    def at(self, now):
+        return mock.patch('accounts.ratelimit.time.time', return_value=now)
+
+    def test_limit_is_reached_within_the_window(self):
+        with self.at(6000):
+            for _ in range(2):
+                self.limiter.hit('alice')
+            self.assertEqual(retry_after((self.limiter, 'alice')), 0)
+            self.limiter.hit('Alice')
+        with self.at(6015):
+            self.assertEqual(retry_after((self.limiter, 'alice')), 45)
+            self.assertEqual(retry_after((self.limiter, 'bob')), 0)
+
+    def test_counter_rolls_over_with_the_window(self):
+        with self.at(6059):
+            for _ in range(3):
+                self.limiter.hit('alice')
+            self.assertEqual(retry_after((self.limiter, 'alice')), 1)
+        with self.at(6060):
+            self.assertEqual(retry_after((self.limiter, 'alice')), 0)
+            self.limiter.hit('alice')
+            self.assertEqual(cache.get(self.limiter.key('alice', 6060)), 1)
+
+    def test_reset_clears_the_current_window(self):
+        with self.at(6000):
+            for _ in range(3):
+                self.limiter.hit('alice')
+            self.limiter.reset('alice')
+            self.assertEqual(retry_after((self.limiter, 'alice')), 0)
+
+
+class UserDirectoryTests(TestCase):
+    def test_cursor_round_trip(self):
+        created_at = datetime(2025, 3, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+        cursor = encode_cursor({'created_at': created_at, 'id': 42})
+        self.assertNotIn('=', cursor)
+        self.assertEqual(decode_cursor(cursor), (created_at, 42))
+
+    def test_invalid_cursor(self):
+        for cursor in ('', 'not-a-cursor', encode_cursor({'created_at': datetime(2025, 1, 1), 'id': 1})[:-4]):
+            with self.assertRaises(ValueError):
+                decode_cursor(cursor)
+
+    def test_pages_follow_the_cursor(self):
+        for i in range(5):
+            User.objects.create_user(username=f'user{i}', password='pass12345')
+        seen, cursor = [], None
+        while True:
+            rows, cursor = user_directory({'limit': '2', **({'cursor': cursor} if cursor else {})})
+            seen += [row['username'] for row in rows]
+            if cursor is None:
+                break
+        self.assertEqual(seen, [f'user{i}' for i in reversed(range(5))])
+
+
+class BloomFilterTests(SimpleTestCase):
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(1000)
+        values = [f'jti-{i}' for i in range(1000)]
+        for value in values:
+            bloom.add(value)
+        self.assertEqual(bloom.count, 1000)
+        self.assertTrue(all(value in bloom for value in values))
+
+    def test_false_positives_stay_near_the_error_rate(self):
+        bloom = BloomFilter(1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(f'jti-{i}')
+        false_positives = sum(f'other-{i}' in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test_empty_filter_contains_nothing(self):
+        self.assertNotIn('jti-1', BloomFilter(10))
@@ -0,0 +1,219 @@
+import atexit
+import hashlib
+import math
+import threading
+import time
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import BlacklistMixin, RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+from .models import User
+
+BLOOM_CAPACITY = getattr(settings, 'TOKEN_BLACKLIST_BLOOM_CAPACITY', 100000)
+BLOOM_ERROR_RATE = 0.001
+OUTSTANDING_BATCH_SIZE = getattr(settings, 'OUTSTANDING_TOKEN_BATCH_SIZE', 200)
+OUTSTANDING_FLUSH_SECONDS = getattr(settings, 'OUTSTANDING_TOKEN_FLUSH_SECONDS', 2)
+# Longest a process trusts its filter without re-reading new blacklist rows,
+# whatever the cached version says (a per-process cache never shows it changing)
+BLACKLIST_SYNC_SECONDS = getattr(settings, 'TOKEN_BLACKLIST_SYNC_SECONDS', 5)
+VERSION_KEY = 'token_blacklist:version'
+# Re-read this far behind the last sync so rows committed late are not missed
+SYNC_OVERLAP = timedelta(minutes=1)
+
+
+class BloomFilter:
+    """Set membership with no false negatives and about error_rate false positives up to capacity"""
+
+    def __init__(self, capacity, error_rate=BLOOM_ERROR_RATE):
+        self.capacity = capacity
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        step = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * step) % self.size for i in range(self.hashes)]
+
+    def add(self, value):
+        for position in self.positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.positions(value))
+
+
+class BlacklistFilter:
+    """
+    Bloom filter of blacklisted JTIs in front of the BlacklistedToken table:
+    a JTI the filter has not seen is not blacklisted, so most checks make no
+    query. Blacklisting writes a new version to the shared cache; a process
+    seeing a version it has not synced to, or that last synced more than
+    BLACKLIST_SYNC_SECONDS ago, adds the rows blacklisted since its last
+    sync. The filter is rebuilt from unexpired rows when it fills.
+    """
+
+    def __init__(self, capacity=BLOOM_CAPACITY):
+        self.capacity = capacity
+        self.lock = threading.Lock()
+        self.bloom = None
+        self.version = None
+        self.synced_at = None
+        self.checked_at = 0
+
+    def changed(self):
+        cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+
+    def current_version(self):
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            # Evicted or never set: start a version every process syncs to
+            cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+            version = cache.get(VERSION_KEY)
+        return version
+
+    def rebuild(self):
+        started = timezone.now()
+        jtis = BlacklistedToken.objects.filter(token__expires_at__gt=started).values_list('token__jti', flat=True)
+        bloom = BloomFilter(max(self.capacity, 2 * jtis.count()))
+        for jti in jtis.iterator(chunk_size=5000):
+            bloom.add(jti)
+        self.bloom, self.synced_at = bloom, started
+        self.checked_at = time.monotonic()
+
+    def sync(self):
+        started = timezone.now()
+        recent = BlacklistedToken.objects.filter(blacklisted_at__gte=self.synced_at - SYNC_OVERLAP)
+        for jti in recent.values_list('token__jti', flat=True):
+            if jti not in self.bloom:
+                self.bloom.add(jti)
+        self.synced_at = started
+        self.checked_at = time.monotonic()
+
+    def might_contain(self, jti):
+        version = self.current_version()
+        with self.lock:
+            if self.bloom is None or self.bloom.count > self.bloom.capacity:
+                self.rebuild()
+            elif version != self.version or time.monotonic() - self.checked_at > BLACKLIST_SYNC_SECONDS:
+                self.sync()
+            self.version = version
+            return jti in self.bloom
+
+
+blacklist_filter = BlacklistFilter()
+
+
+class OutstandingWriter:
+    """
+    Buffers OutstandingToken rows and inserts them with one bulk_create per
+    batch, when the batch is full or OUTSTANDING_FLUSH_SECONDS after its first
+    row. A row lost in a crash only drops the bookkeeping entry; blacklisting
+    a token creates its row if it is missing.
+    """
+
+    def __init__(self, batch_size=OUTSTANDING_BATCH_SIZE, interval=OUTSTANDING_FLUSH_SECONDS):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.rows = []
+        self.timer = None
+        self.lock = threading.Lock()
+
+    def add(self, row):
+        with self.lock:
+            self.rows.append(row)
+            if len(self.rows) < self.batch_size:
+                if self.timer is None:
+                    self.timer = threading.Timer(self.interval, self.flush_in_thread)
+                    self.timer.daemon = True
+                    self.timer.start()
+                return
+            rows = self.take()
+        self.write(rows)
+
+    def take(self):
+        rows, self.rows = self.rows, []
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        return rows
+
+    def flush(self):
+        with self.lock:
+            rows = self.take()
+        if rows:
+            self.write(rows)
+
+    def flush_in_thread(self):
+        close_old_connections()
+        try:
+            self.flush()
+        finally:
+            close_old_connections()
+
+    def write(self, rows):
+        try:
+            with transaction.atomic():
+                OutstandingToken.objects.bulk_create(rows, ignore_conflicts=True)
+        except IntegrityError:
+            # A user was deleted after their token was issued
+            existing = set(User.objects.filter(id__in={row.user_id for row in rows}).values_list('id', flat=True))
+            for row in rows:
+                if row.user_id not in existing:
+                    row.user_id = None
+            OutstandingToken.objects.bulk_create(rows, ignore_conflicts=True)
+
+
+outstanding_writer = OutstandingWriter()
+atexit.register(outstanding_writer.flush)
+
+
+class StoredRefreshToken(RefreshToken):
+    """
+    Refresh token whose blacklist check goes through blacklist_filter and
+    whose outstanding-token rows are written in batches by outstanding_writer
+    """
+
+    def outstanding_row(self):
+        user_id = self.payload.get(api_settings.USER_ID_CLAIM)
+        return OutstandingToken(
+            user_id=User._meta.pk.to_python(user_id) if user_id is not None else None,
+            jti=self.payload[api_settings.JTI_CLAIM],
+            token=str(self),
+            created_at=self.current_time,
+            expires_at=datetime_from_epoch(self.payload['exp']),
+        )
+
+    def check_blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        if blacklist_filter.might_contain(jti) and BlacklistedToken.objects.filter(token__jti=jti).exists():
+            raise TokenError('Token is blacklisted')
+
+    def blacklist(self):
+        row = self.outstanding_row()
+        token, _ = OutstandingToken.objects.get_or_create(jti=row.jti, defaults={
+            'user_id': row.user_id, 'token': row.token, 'created_at': row.created_at, 'expires_at': row.expires_at,
+        })
+        blacklisted = BlacklistedToken.objects.get_or_create(token=token)
+        transaction.on_commit(blacklist_filter.changed)
+        return blacklisted
+
+    def outstand(self):
+        outstanding_writer.add(self.outstanding_row())
+
+    @classmethod
+    def for_user(cls, user):
+        # Skip BlacklistMixin.for_user, which inserts the row straight away
+        token = super(BlacklistMixin, cls).for_user(user)
+        token.outstand()
+        return token
@@ -28,6 +28,7 @@ urlpatterns = [
     path('shopkeepers/<int:shopkeeper_id>/reject/', views.reject_shopkeeper, name='reject_shopkeeper'),
     
     # Admin Dashboard API
+    path('admin/dashboard/', admin_views.admin_dashboard, name='admin_dashboard'),
     path('admin/stats/', admin_views.admin_dashboard_stats, name='admin_stats'),
     path('admin/recent-orders/', admin_views.admin_recent_orders, name='admin_recent_orders'),
     path('admin/recent-users/', admin_views.admin_recent_users, name='admin_recent_users'),
@@ -59,4 +60,13 @@ urlpatterns = [
     # Admin CRUD - Reviews
     path('admin/reviews/', admin_views.admin_reviews, name='admin_reviews'),
     path('admin/reviews/<int:review_id>/', admin_views.admin_review_detail, name='admin_review_detail'),
+    
+    # Admin Bulk Actions
+    path('admin/<str:resource>/bulk/', admin_views.admin_bulk_action, name='admin_bulk_action'),
+    path('admin/audit-log/', admin_views.admin_audit_log, name='admin_audit_log'),
+    
+    # Admin Reports
+    path('admin/reports/<str:report>/export/', admin_views.admin_export_report, name='admin_export_report'),
+    path('admin/reports/jobs/<uuid:job_id>/', admin_views.admin_export_job, name='admin_export_job'),
+    path('admin/reports/jobs/<uuid:job_id>/download/', admin_views.admin_export_download, name='admin_export_download'),
 ]
\ No newline at end of file
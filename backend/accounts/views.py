@@ -2,8 +2,11 @@ from rest_framework import status, generics, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
+from orders.guest_cart import GuestCartError, merge_guest_cart
+from . import dashboard, ratelimit
+from .authentication import full_user, tokens_for_user
+from .tokens import StoredRefreshToken
 from .models import User, CustomerProfile, ShopkeeperProfile
 from .serializers import (
     UserRegistrationSerializer, UserLoginSerializer, UserSerializer,
@@ -15,10 +18,16 @@ from .serializers import (
 @permission_classes([AllowAny])
 def register_user(request):
     """Register a new customer or admin user"""
+    ip = ratelimit.client_ip(request)
+    wait = ratelimit.retry_after((ratelimit.register_ip, ip))
+    if wait:
+        return ratelimit.too_many_attempts(wait)
+    
     serializer = UserRegistrationSerializer(data=request.data)
     if serializer.is_valid():
+        ratelimit.register_ip.hit(ip)
         user = serializer.save()
-        refresh = RefreshToken.for_user(user)
+        refresh = tokens_for_user(user)
         return Response({
             'user': UserSerializer(user).data,
             'refresh': str(refresh),
@@ -31,10 +40,16 @@ def register_user(request):
 @permission_classes([AllowAny])
 def register_shopkeeper(request):
     """Register a new shopkeeper"""
+    ip = ratelimit.client_ip(request)
+    wait = ratelimit.retry_after((ratelimit.register_ip, ip))
+    if wait:
+        return ratelimit.too_many_attempts(wait)
+    
     serializer = ShopkeeperRegistrationSerializer(data=request.data)
     if serializer.is_valid():
+        ratelimit.register_ip.hit(ip)
         user = serializer.save()
-        refresh = RefreshToken.for_user(user)
+        refresh = tokens_for_user(user)
         return Response({
             'user': UserSerializer(user).data,
             'refresh': str(refresh),
@@ -47,16 +62,35 @@ def register_shopkeeper(request):
 @permission_classes([AllowAny])
 def login_user(request):
     """Login user and return JWT tokens"""
+    # Turn floods away before any password is hashed
+    ip, username = ratelimit.client_ip(request), str(request.data.get('username', ''))
+    wait = ratelimit.retry_after((ratelimit.login_ip, ip), (ratelimit.login_user, username))
+    if wait:
+        return ratelimit.too_many_attempts(wait)
+    
     serializer = UserLoginSerializer(data=request.data)
     if serializer.is_valid():
         user = serializer.validated_data['user']
-        refresh = RefreshToken.for_user(user)
+        ratelimit.login_user.reset(username)
+        refresh = tokens_for_user(user)
+        # Carry over anything the customer put in the cart before logging in
+        merged = 0
+        if user.user_type == 'customer' and request.data.get('cart_token'):
+            try:
+                merged = merge_guest_cart(user, request.data['cart_token'])
+            except GuestCartError:
+                pass
         return Response({
             'user': UserSerializer(user).data,
             'refresh': str(refresh),
             'access': str(refresh.access_token),
+            'cart_items_merged': merged,
             'message': 'Login successful'
         }, status=status.HTTP_200_OK)
+    # Only failures count, so many users behind one address can still log in
+    ratelimit.login_ip.hit(ip)
+    if username:
+        ratelimit.login_user.hit(username)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['POST'])
@@ -65,7 +99,7 @@ def logout_user(request):
     """Logout user by blacklisting refresh token"""
     try:
         refresh_token = request.data["refresh"]
-        token = RefreshToken(refresh_token)
+        token = StoredRefreshToken(refresh_token)
         token.blacklist()
         return Response({'message': 'Logout successful'}, status=status.HTTP_200_OK)
     except Exception as e:
@@ -77,7 +111,7 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
     permission_classes = [IsAuthenticated]
     
     def get_object(self):
-        return self.request.user
+        return full_user(self.request.user)
     
     def update(self, request, *args, **kwargs):
         partial = kwargs.pop('partial', False)
@@ -168,6 +202,7 @@ def approve_shopkeeper(request, shopkeeper_id):
         # Also update the user's is_verified status
         shopkeeper.user.is_verified = True
         shopkeeper.user.save()
+        dashboard.invalidate('pending_shopkeepers', 'stats')
         
         return Response({
             'message': 'Shopkeeper approved successfully',
@@ -198,6 +233,7 @@ def reject_shopkeeper(request, shopkeeper_id):
         
         shopkeeper.verification_status = 'rejected'
         shopkeeper.save()
+        dashboard.invalidate('pending_shopkeepers', 'stats')
         
         return Response({
             'message': 'Shopkeeper rejected',
@@ -246,7 +282,7 @@ def user_dashboard(request):
     elif user.user_type == 'admin':
         return Response({
             'user_type': 'admin',
-            'profile': UserSerializer(user).data
+            'profile': UserSerializer(full_user(user)).data
         })
     
     return Response(
@@ -285,14 +321,18 @@ def notification_preferences(request):
 @permission_classes([IsAuthenticated])
 def change_password(request):
     """Change user password"""
-    user = request.user
+    user = full_user(request.user)
     current_password = request.data.get('current_password')
     new_password = request.data.get('new_password')
     
     if not current_password or not new_password:
         return Response({'error': 'Both current and new password are required'}, status=status.HTTP_400_BAD_REQUEST)
     
+    wait = ratelimit.retry_after((ratelimit.login_user, user.username))
+    if wait:
+        return ratelimit.too_many_attempts(wait)
     if not user.check_password(current_password):
+        ratelimit.login_user.hit(user.username)
         return Response({'error': 'Current password is incorrect'}, status=status.HTTP_400_BAD_REQUEST)
     
     user.set_password(new_password)
@@ -305,13 +345,17 @@ def change_password(request):
 @permission_classes([IsAuthenticated])
 def delete_account(request):
     """Delete user account (requires password confirmation)"""
-    user = request.user
+    user = full_user(request.user)
     password = request.data.get('password')
     
     if not password:
         return Response({'error': 'Password is required to delete account'}, status=status.HTTP_400_BAD_REQUEST)
     
+    wait = ratelimit.retry_after((ratelimit.login_user, user.username))
+    if wait:
+        return ratelimit.too_many_attempts(wait)
     if not user.check_password(password):
+        ratelimit.login_user.hit(user.username)
         return Response({'error': 'Incorrect password'}, status=status.HTTP_400_BAD_REQUEST)
     
     if user.user_type == 'admin':
@@ -0,0 +1,116 @@
+"""
+Static and media serving benchmark.
+
+    python -m benchmarks.asset_serving --rounds 50 --media-mb 5
+
+Runs collectstatic into a temporary STATIC_ROOT (hashed names plus .gz/.br
+copies), writes a --media-mb file into a temporary MEDIA_ROOT, then calls
+the serving views directly. For each way of serving it reports the body
+bytes sent and the median time to first byte and to the last byte. The
+development helper (django.views.static.serve) is the baseline.
+"""
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from benchmarks import setup_django
+
+setup_django()
+
+from django.core.management import call_command
+from django.test import RequestFactory, override_settings
+from django.views.static import serve
+from mediastore.views import serve_media, serve_static
+
+
+def measure(view, rounds, **headers):
+    factory = RequestFactory()
+    sizes, first, total = [], [], []
+    for _ in range(rounds):
+        request = factory.get('/', **headers)
+        started = time.perf_counter()
+        response = view(request)
+        body = iter(response.streaming_content if response.streaming else [response.content])
+        size = 0
+        chunk = next(body, b'')
+        first.append((time.perf_counter() - started) * 1000)
+        while chunk:
+            size += len(chunk)
+            chunk = next(body, b'')
+        total.append((time.perf_counter() - started) * 1000)
+        response.close()
+        sizes.append(size)
+    return sizes[-1], statistics.median(first), statistics.median(total)
+
+
+def largest_static(root):
+    candidates = []
+    for directory, _, files in os.walk(root):
+        for filename in files:
+            if filename.endswith('.js') and os.path.exists(os.path.join(directory, filename + '.gz')):
+                path = os.path.join(directory, filename)
+                candidates.append((os.path.getsize(path), os.path.relpath(path, root)))
+    return max(candidates)[1] if candidates else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare asset serving strategies.')
+    parser.add_argument('--rounds', type=int, default=50)
+    parser.add_argument('--media-mb', type=float, default=5)
+    args = parser.parse_args()
+
+    static_root, media_root = tempfile.mkdtemp(), tempfile.mkdtemp()
+    try:
+        run(static_root, media_root, args)
+    finally:
+        shutil.rmtree(static_root, ignore_errors=True)
+        shutil.rmtree(media_root, ignore_errors=True)
+
+
+def run(static_root, media_root, args):
+    with override_settings(STATIC_ROOT=static_root, MEDIA_ROOT=media_root, MEDIA_SENDFILE=None):
+        call_command('collectstatic', interactive=False, verbosity=0)
+        asset = largest_static(static_root)
+        if asset is None:
+            raise SystemExit('collectstatic produced no compressible JavaScript')
+        with open(os.path.join(media_root, 'photo.bin'), 'wb') as media:
+            media.write(os.urandom(int(args.media_mb * 1024 * 1024)))
+
+        cases = [
+            (f'static {asset}', None, None),
+            ('  dev helper', lambda r: serve(r, asset, document_root=static_root), {}),
+            ('  identity', lambda r: serve_static(r, asset), {}),
+            ('  gzip', lambda r: serve_static(r, asset), {'HTTP_ACCEPT_ENCODING': 'gzip'}),
+            ('  brotli', lambda r: serve_static(r, asset), {'HTTP_ACCEPT_ENCODING': 'br, gzip'}),
+            ('  revalidation (304)', lambda r: serve_static(r, asset), {'HTTP_IF_NONE_MATCH': None}),
+            (f'media {args.media_mb:g} MB', None, None),
+            ('  dev helper', lambda r: serve(r, 'photo.bin', document_root=media_root), {}),
+            ('  streamed', lambda r: serve_media(r, 'photo.bin'), {}),
+            ('  range 64 KB', lambda r: serve_media(r, 'photo.bin'), {'HTTP_RANGE': 'bytes=0-65535'}),
+        ]
+        etag = serve_static(RequestFactory().get('/'), asset)['ETag']
+
+        print(f"{'serving':<40}{'bytes':>12}{'ttfb ms':>10}{'total ms':>10}")
+        for name, view, headers in cases:
+            if view is None:
+                print(name)
+                continue
+            if 'br' in headers.get('HTTP_ACCEPT_ENCODING', '') and not os.path.exists(
+                    os.path.join(static_root, asset + '.br')):
+                print(f'{name:<40}{"(pip install brotli)":>32}')
+                continue
+            if 'HTTP_IF_NONE_MATCH' in headers:
+                headers = {'HTTP_IF_NONE_MATCH': etag}
+            size, first, total = measure(view, args.rounds, **headers)
+            print(f'{name:<40}{size:>12}{first:>10.3f}{total:>10.3f}')
+
+        with override_settings(MEDIA_SENDFILE='x-accel-redirect'):
+            size, first, total = measure(lambda r: serve_media(r, 'photo.bin'), args.rounds)
+            print(f"{'  x-accel-redirect (from Django)':<40}{size:>12}{first:>10.3f}{total:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""
+Concurrent coupon redemption stress test.
+
+    python -m benchmarks.coupon_stress --customers 50 --attempts 4 --usage-limit 100 --threads 16
+
+Creates a throwaway coupon, shop and customers, plus one pending order
+per attempt. Then --threads workers redeem the coupon for those orders
+at the same time. The run passes when no limit was exceeded and these
+three agree: the coupon's counter, the per-customer counters and the
+CouponUsage rows. Every row it created is deleted afterwards.
+"""
+import argparse
+import queue
+import sys
+import threading
+import time
+from datetime import timedelta, time as dtime
+from decimal import Decimal
+
+from benchmarks import setup_django
+
+setup_django()
+
+from django.db import OperationalError, connection, transaction
+from django.db.models import Max, Sum
+from django.utils import timezone
+from accounts.models import User
+from shops.models import Shop
+from orders.coupons import CouponError, coupon_cache, redeem_coupon
+from orders.models import Coupon, CouponCustomerUsage, CouponUsage, Order
+
+
+def create_fixtures(prefix, customers, attempts, usage_limit, per_customer):
+    now = timezone.now()
+    owner = User.objects.create(username=f'{prefix}_owner', user_type='shopkeeper')
+    shop = Shop.objects.create(owner=owner, name=f'{prefix} shop', description='Stress test', address='-', phone='0',
+                               opening_time=dtime(0, 0), closing_time=dtime(23, 59))
+    User.objects.bulk_create([User(username=f'{prefix}_{i}', user_type='customer') for i in range(customers)])
+    users = list(User.objects.filter(username__startswith=f'{prefix}_').exclude(id=owner.id).order_by('id'))
+    Order.objects.bulk_create([
+        Order(order_number=f'{prefix[:6].upper()}{i:08d}', customer=user, shop=shop, subtotal=Decimal('100.00'),
+              total_amount=Decimal('100.00'), delivery_address='-', delivery_phone='0')
+        for i, user in enumerate(user for user in users for _ in range(attempts))
+    ])
+    orders = list(Order.objects.filter(shop=shop).select_related('customer'))
+    coupon = Coupon.objects.create(code=f'{prefix.upper()}-COUPON', name='Stress', coupon_type='fixed_amount',
+                                   discount_value=Decimal('10.00'), usage_limit=usage_limit,
+                                   usage_limit_per_customer=per_customer,
+                                   valid_from=now - timedelta(hours=1), valid_until=now + timedelta(hours=1))
+    return owner, coupon, orders
+
+
+def run(coupon, orders, threads, retries):
+    tasks = queue.Queue()
+    for order in orders:
+        tasks.put(order)
+    outcomes = {'redeemed': 0, 'rejected': 0, 'lock_failures': 0, 'lock_retries': 0}
+    latencies = []
+    lock = threading.Lock()
+
+    def worker():
+        try:
+            while True:
+                try:
+                    order = tasks.get_nowait()
+                except queue.Empty:
+                    return
+                start = time.perf_counter()
+                outcome, retried = 'lock_failures', 0
+                for attempt in range(retries):
+                    try:
+                        with transaction.atomic():
+                            redeem_coupon(coupon_cache.get(coupon.code), order.customer, order, coupon.discount_value)
+                        outcome = 'redeemed'
+                        break
+                    except CouponError:
+                        outcome = 'rejected'
+                        break
+                    except OperationalError:
+                        # SQLite serialises writers; other backends block on the row lock instead
+                        retried += 1
+                        time.sleep(0.01 * (attempt + 1))
+                with lock:
+                    outcomes[outcome] += 1
+                    outcomes['lock_retries'] += retried
+                    latencies.append((time.perf_counter() - start) * 1000)
+        finally:
+            connection.close()
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    outcomes['seconds'] = round(time.perf_counter() - started, 2)
+    latencies.sort()
+    outcomes['p50_ms'] = round(latencies[len(latencies) // 2], 2) if latencies else 0.0
+    outcomes['p99_ms'] = round(latencies[int(len(latencies) * 0.99)], 2) if latencies else 0.0
+    return outcomes
+
+
+def verify(coupon, outcomes, customers, attempts, usage_limit, per_customer):
+    coupon.refresh_from_db()
+    counters = CouponCustomerUsage.objects.filter(coupon=coupon).aggregate(total=Sum('times_used'), peak=Max('times_used'))
+    usage_rows = CouponUsage.objects.filter(coupon=coupon).count()
+    problems = []
+    if coupon.times_used != outcomes['redeemed']:
+        problems.append(f'coupon counter {coupon.times_used} != redeemed {outcomes["redeemed"]}')
+    if usage_rows != outcomes['redeemed']:
+        problems.append(f'{usage_rows} CouponUsage rows != redeemed {outcomes["redeemed"]}')
+    if (counters['total'] or 0) != outcomes['redeemed']:
+        problems.append(f'per-customer counters sum to {counters["total"]}, redeemed {outcomes["redeemed"]}')
+    if coupon.times_used > usage_limit:
+        problems.append(f'usage limit exceeded: {coupon.times_used} > {usage_limit}')
+    if (counters['peak'] or 0) > per_customer:
+        problems.append(f'per-customer limit exceeded: {counters["peak"]} > {per_customer}')
+    expected = min(usage_limit, customers * min(attempts, per_customer))
+    if not outcomes['lock_failures'] and coupon.times_used != expected:
+        problems.append(f'expected {expected} redemptions, got {coupon.times_used}')
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Redeem one coupon from many threads and check the counters.')
+    parser.add_argument('--customers', type=int, default=50)
+    parser.add_argument('--attempts', type=int, default=4, help='redemption attempts per customer')
+    parser.add_argument('--usage-limit', type=int, default=100)
+    parser.add_argument('--per-customer', type=int, default=3)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--retries', type=int, default=50, help='retries per attempt on database lock errors')
+    parser.add_argument('--prefix', default='cstress')
+    args = parser.parse_args()
+
+    if User.objects.filter(username__startswith=f'{args.prefix}_').exists():
+        parser.error(f"Rows with prefix '{args.prefix}' already exist; use another --prefix")
+
+    owner, coupon, orders = create_fixtures(args.prefix, args.customers, args.attempts, args.usage_limit, args.per_customer)
+    try:
+        outcomes = run(coupon, orders, args.threads, args.retries)
+        problems = verify(coupon, outcomes, args.customers, args.attempts, args.usage_limit, args.per_customer)
+    finally:
+        coupon.delete()
+        User.objects.filter(username__startswith=f'{args.prefix}_').delete()
+
+    print(' '.join(f'{key}={value}' for key, value in outcomes.items()))
+    if problems:
+        print('FAILED:')
+        for line in problems:
+            print(f'  {line}')
+        sys.exit(1)
+    print('OK: counters consistent and limits respected.')
+
+
+if __name__ == '__main__':
+    main()
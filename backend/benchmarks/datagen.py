@@ -0,0 +1,241 @@
+"""
+Synthetic data generator for capacity planning.
+
+    python -m benchmarks.datagen --shops 200 --products 20000 --users 5000 --orders 50000
+
+All rows are written with bulk_create in batches. The same --seed always
+produces the same data set. Generated accounts share the prefix
+(default "bench") and one password, so the load scenarios can log in
+as them.
+"""
+import argparse
+import math
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta, time as dtime
+from decimal import Decimal
+
+from benchmarks import setup_django
+
+setup_django()
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+from accounts.models import User, CustomerProfile, ShopkeeperProfile
+from shops.models import Category, Shop, Product
+from orders.models import Order, OrderItem, OrderTracking
+
+BENCH_PASSWORD = 'bench-pass-123'
+CENTER = (12.9716, 77.5946)  # Bengaluru
+
+WORDS = (
+    'rice', 'milk', 'bread', 'apple', 'banana', 'tea', 'coffee', 'sugar', 'salt', 'butter',
+    'cheese', 'paneer', 'soap', 'shampoo', 'charger', 'cable', 'headphones', 'notebook', 'pen',
+    'shirt', 'saree', 'kurta', 'shoes', 'lamp', 'bulb', 'bucket', 'broom', 'spinach', 'tomato',
+    'onion', 'potato', 'mango', 'yogurt', 'biscuits', 'noodles', 'juice', 'honey', 'oil', 'flour',
+)
+CATEGORIES = ('Groceries', 'Electronics', 'Clothing', 'Books', 'Home & Garden', 'Personal Care', 'Dairy', 'Bakery')
+
+# Roughly what a mature marketplace looks like: most orders are finished.
+STATUS_MIX = (
+    ('delivered', 0.58),
+    ('cancelled', 0.08),
+    ('refunded', 0.02),
+    ('pending', 0.07),
+    ('confirmed', 0.07),
+    ('preparing', 0.07),
+    ('ready_for_pickup', 0.04),
+    ('out_for_delivery', 0.07),
+)
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let bulk_create keep the created_at values we generate"""
+    fields = [model._meta.get_field('created_at') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def random_point(rng, radius_km, center=CENTER):
+    # Uniform over a disc; 1 degree latitude ~ 111 km
+    distance = radius_km * math.sqrt(rng.random())
+    bearing = rng.random() * 2 * math.pi
+    lat = center[0] + (distance * math.cos(bearing)) / 111.0
+    lng = center[1] + (distance * math.sin(bearing)) / (111.0 * math.cos(math.radians(center[0])))
+    return Decimal(f'{lat:.6f}'), Decimal(f'{lng:.6f}')
+
+
+def _created_at(rng, now, days):
+    return now - timedelta(seconds=rng.randint(0, days * 86400))
+
+
+def create_users(prefix, count, user_type, password_hash, rng, now, days, batch_size):
+    users = [
+        User(
+            username=f'{prefix}_{user_type}_{i}',
+            email=f'{prefix}_{user_type}_{i}@example.com',
+            first_name=rng.choice(WORDS).title(),
+            last_name=user_type.title(),
+            user_type=user_type,
+            password=password_hash,
+            phone_number=f'+91{rng.randint(7000000000, 9999999999)}',
+            address=f'{rng.randint(1, 999)} {rng.choice(WORDS).title()} Road',
+            is_verified=user_type != 'customer',
+            is_staff=user_type == 'admin',
+            created_at=_created_at(rng, now, days),
+        )
+        for i in range(count)
+    ]
+    with explicit_timestamps(User):
+        User.objects.bulk_create(users, batch_size=batch_size)
+    # bulk_create only returns primary keys on some backends, so re-read them
+    return list(User.objects.filter(username__startswith=f'{prefix}_{user_type}_').order_by('id'))
+
+
+def generate(shops, products, users, orders, seed=42, prefix='bench', days=180, radius_km=15, batch_size=1000):
+    rng = random.Random(seed)
+    now = timezone.now()
+    password_hash = make_password(BENCH_PASSWORD)
+    timings = {}
+
+    def step(name, fn):
+        start = time.perf_counter()
+        result = fn()
+        timings[name] = round(time.perf_counter() - start, 2)
+        print(f'{name}: {timings[name]}s')
+        return result
+
+    with transaction.atomic():
+        categories = step('categories', lambda: [Category.objects.get_or_create(name=name)[0] for name in CATEGORIES])
+        step('admin', lambda: create_users(prefix, 1, 'admin', password_hash, rng, now, days, batch_size))
+        shopkeepers = step('shopkeepers', lambda: create_users(prefix, shops, 'shopkeeper', password_hash, rng, now, days, batch_size))
+        customers = step('customers', lambda: create_users(prefix, users, 'customer', password_hash, rng, now, days, batch_size))
+
+        def make_profiles():
+            ShopkeeperProfile.objects.bulk_create([
+                ShopkeeperProfile(user=u, business_name=f'{u.first_name} Store', business_address=u.address,
+                                  business_phone=u.phone_number, verification_status='approved', approved_at=now)
+                for u in shopkeepers
+            ], batch_size=batch_size)
+            CustomerProfile.objects.bulk_create([CustomerProfile(user=u) for u in customers], batch_size=batch_size)
+        step('profiles', make_profiles)
+
+        def make_shops():
+            rows = []
+            for i, owner in enumerate(shopkeepers):
+                lat, lng = random_point(rng, radius_km)
+                rows.append(Shop(
+                    owner=owner, name=f'{prefix} {owner.first_name} Store {i}', description='Benchmark shop',
+                    address=owner.address, phone=owner.phone_number, opening_time=dtime(8, 0), closing_time=dtime(22, 0),
+                    latitude=lat, longitude=lng, delivery_fee=Decimal(rng.choice((0, 10, 20, 30))),
+                    delivery_radius=Decimal(rng.choice((3, 5, 8, 10))), minimum_order_amount=Decimal(rng.choice((0, 50, 100))),
+                    created_at=_created_at(rng, now, days),
+                ))
+            with explicit_timestamps(Shop):
+                Shop.objects.bulk_create(rows, batch_size=batch_size)
+            created = list(Shop.objects.filter(owner__in=shopkeepers).order_by('id'))
+            Shop.categories.through.objects.bulk_create([
+                Shop.categories.through(shop_id=shop.id, category_id=rng.choice(categories).id) for shop in created
+            ], batch_size=batch_size)
+            return created
+        shop_rows = step('shops', make_shops)
+
+        def make_products():
+            rows = []
+            for i in range(products):
+                price = Decimal(rng.randint(10, 5000))
+                on_sale = rng.random() < 0.2
+                rows.append(Product(
+                    shop=shop_rows[i % len(shop_rows)], category=rng.choice(categories),
+                    name=f'{rng.choice(WORDS).title()} {rng.choice(WORDS)} {i}', description=' '.join(rng.choices(WORDS, k=12)),
+                    price=price, discount_price=(price * Decimal('0.85')).quantize(Decimal('0.01')) if on_sale else None,
+                    stock_quantity=rng.randint(0, 500), sku=f'{prefix.upper()}-{seed}-{i}', tags=','.join(rng.sample(WORDS, 3)),
+                    status='available' if rng.random() < 0.9 else 'out_of_stock', is_featured=rng.random() < 0.02,
+                    created_at=_created_at(rng, now, days),
+                ))
+            with explicit_timestamps(Product):
+                Product.objects.bulk_create(rows, batch_size=batch_size)
+            return list(Product.objects.filter(sku__startswith=f'{prefix.upper()}-{seed}-').only('id', 'shop_id', 'price', 'discount_price'))
+        product_rows = step('products', make_products)
+
+        products_by_shop = {}
+        for product in product_rows:
+            products_by_shop.setdefault(product.shop_id, []).append(product)
+        shops_with_products = [shop for shop in shop_rows if shop.id in products_by_shop]
+        statuses, weights = zip(*STATUS_MIX)
+
+        def make_orders():
+            created = 0
+            while created < orders:
+                count = min(batch_size, orders - created)
+                batch, lines = [], []
+                for n in range(created, created + count):
+                    shop = rng.choice(shops_with_products)
+                    chosen = rng.sample(products_by_shop[shop.id], min(len(products_by_shop[shop.id]), rng.randint(1, 5)))
+                    items = [(p, rng.randint(1, 4)) for p in chosen]
+                    subtotal = sum(p.final_price * qty for p, qty in items)
+                    order_status = rng.choices(statuses, weights)[0]
+                    customer = rng.choice(customers)
+                    created_at = _created_at(rng, now, days)
+                    batch.append(Order(
+                        order_number=f'{prefix[:4].upper()}{seed % 100:02d}{n:010d}', customer=customer, shop=shop,
+                        status=order_status, payment_status='paid' if order_status == 'delivered' else 'pending',
+                        subtotal=subtotal, delivery_fee=shop.delivery_fee, total_amount=subtotal + shop.delivery_fee,
+                        delivery_address=customer.address, delivery_phone=customer.phone_number,
+                        status_timestamps={order_status: created_at.isoformat()}, status_changed_at=created_at,
+                        created_at=created_at,
+                    ))
+                    lines.append(items)
+                with explicit_timestamps(Order, OrderTracking):
+                    Order.objects.bulk_create(batch)
+                    numbers = [o.order_number for o in batch]
+                    ids = dict(Order.objects.filter(order_number__in=numbers).values_list('order_number', 'id'))
+                    OrderItem.objects.bulk_create([
+                        OrderItem(order_id=ids[order.order_number], product_id=p.id, quantity=qty,
+                                  unit_price=p.final_price, subtotal=p.final_price * qty)
+                        for order, items in zip(batch, lines) for p, qty in items
+                    ])
+                    OrderTracking.objects.bulk_create([
+                        OrderTracking(order_id=ids[order.order_number], status=order.status,
+                                      message='Generated', created_at=order.created_at)
+                        for order in batch
+                    ])
+                created += count
+        step('orders', make_orders)
+
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic data set with bulk inserts.')
+    parser.add_argument('--shops', type=int, default=100)
+    parser.add_argument('--products', type=int, default=5000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--orders', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--prefix', default='bench')
+    parser.add_argument('--days', type=int, default=180, help='spread created_at over this many days')
+    parser.add_argument('--radius-km', type=float, default=15)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    if User.objects.filter(username__startswith=f'{args.prefix}_').exists():
+        parser.error(f"Data with prefix '{args.prefix}' already exists; use another --prefix or a fresh database")
+
+    start = time.perf_counter()
+    generate(args.shops, args.products, args.users, args.orders, seed=args.seed, prefix=args.prefix,
+             days=args.days, radius_km=args.radius_km, batch_size=args.batch_size)
+    print(f'Done in {time.perf_counter() - start:.1f}s. Log in as {args.prefix}_admin_0 / {args.prefix}_customer_N '
+          f'with password {BENCH_PASSWORD!r}.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,256 @@
+"""
+Scripted load scenarios against a running server.
+
+    python manage.py runserver --noreload &   # or gunicorn
+    python -m benchmarks.load --base-url http://127.0.0.1:8000 --duration 30 --concurrency 8 \\
+        --output baseline.json
+    # later, on the same machine and data set
+    python -m benchmarks.load --base-url http://127.0.0.1:8000 --duration 30 --concurrency 8 \\
+        --output results.json --baseline baseline.json
+
+Log-ins use the accounts created by benchmarks.datagen. Each scenario
+runs for --duration seconds with --concurrency threads. The run reports
+throughput and latency percentiles and writes a JSON document. No
+baseline is committed, since the numbers only mean something on the
+hardware that produced them: save a run of a known-good build with
+--output and pass that file back as --baseline to flag regressions; the
+exit status is 1 when a scenario regresses beyond --tolerance.
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+WORDS = ('rice', 'milk', 'bread', 'tea', 'charger', 'shirt', 'lamp', 'tomato', 'honey', 'oil')
+CENTER = (12.9716, 77.5946)
+ADMIN_DASHBOARD = '/api/auth/admin/dashboard/'
+# The single-widget endpoints the dashboard used to call one by one
+ADMIN_WIDGETS = (
+    '/api/auth/admin/stats/', '/api/auth/admin/recent-orders/', '/api/auth/admin/recent-users/',
+    '/api/auth/admin/pending-shopkeepers/', '/api/auth/admin/revenue-chart/',
+    '/api/auth/admin/top-shops/', '/api/auth/admin/top-products/',
+)
+
+
+class Client:
+    def __init__(self, base_url, token=None, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.token = token
+        self.timeout = timeout
+
+    def request(self, method, path, data=None):
+        body = json.dumps(data).encode() if data is not None else None
+        request = urllib.request.Request(self.base_url + path, data=body, method=method)
+        request.add_header('Content-Type', 'application/json')
+        if self.token:
+            request.add_header('Authorization', f'Bearer {self.token}')
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                payload = response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            payload = e.read()
+            status = e.code
+        return status, payload
+
+    def json(self, method, path, data=None):
+        status, payload = self.request(method, path, data)
+        try:
+            return status, json.loads(payload or b'null')
+        except ValueError:
+            return status, None
+
+
+def login(base_url, username, password):
+    status, data = Client(base_url).json('POST', '/api/auth/login/', {'username': username, 'password': password})
+    if status != 200:
+        raise SystemExit(f'Login failed for {username}: {status} {data}')
+    return data['access']
+
+
+class Context:
+    """Shared, read-only state the scenarios draw from"""
+
+    def __init__(self, base_url, prefix, password, customers):
+        self.base_url = base_url
+        self.customer_tokens = [login(base_url, f'{prefix}_customer_{i}', password) for i in range(customers)]
+        self.admin_token = login(base_url, f'{prefix}_admin_0', password)
+        status, data = Client(base_url).json('GET', '/api/shops/products/?page=1')
+        self.product_ids = [p['id'] for p in (data or {}).get('results', [])] if status == 200 else []
+        if not self.product_ids:
+            raise SystemExit('No products found; run benchmarks.datagen first')
+
+    def customer(self, rng):
+        return Client(self.base_url, rng.choice(self.customer_tokens))
+
+
+def browse(ctx, rng):
+    client = Client(ctx.base_url)
+    yield client.request('GET', f'/api/shops/shops/?page={rng.randint(1, 3)}')
+    yield client.request('GET', f'/api/shops/products/?page={rng.randint(1, 5)}')
+
+
+def search(ctx, rng):
+    yield Client(ctx.base_url).request('GET', '/api/shops/search/?' + urllib.parse.urlencode({'q': rng.choice(WORDS)}))
+
+
+def nearby(ctx, rng):
+    lat = CENTER[0] + rng.uniform(-0.05, 0.05)
+    lng = CENTER[1] + rng.uniform(-0.05, 0.05)
+    yield Client(ctx.base_url).request('GET', f'/api/shops/nearby/?lat={lat:.5f}&lng={lng:.5f}&radius=5')
+
+
+def add_to_cart(ctx, rng):
+    yield ctx.customer(rng).request('POST', '/api/orders/cart/add/', {'product_id': rng.choice(ctx.product_ids), 'quantity': 1})
+
+
+def checkout(ctx, rng):
+    client = ctx.customer(rng)
+    yield client.request('POST', '/api/orders/cart/add/', {'product_id': rng.choice(ctx.product_ids), 'quantity': 1})
+    yield client.request('POST', '/api/orders/checkout/', {
+        'delivery_address': '1 Benchmark Road', 'delivery_phone': '+919999999999', 'payment_method': 'cash_on_delivery',
+    })
+
+
+def admin_dashboard(ctx, rng):
+    yield Client(ctx.base_url, ctx.admin_token).request('GET', ADMIN_DASHBOARD)
+
+
+def admin_widgets(ctx, rng):
+    client = Client(ctx.base_url, ctx.admin_token)
+    for path in ADMIN_WIDGETS:
+        yield client.request('GET', path)
+
+
+SCENARIOS = {
+    'browse': browse,
+    'search': search,
+    'nearby': nearby,
+    'add_to_cart': add_to_cart,
+    'checkout': checkout,
+    'admin_dashboard': admin_dashboard,
+    'admin_widgets': admin_widgets,
+}
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run_scenario(ctx, name, duration, concurrency, seed):
+    """Run one scenario; latency is measured per scenario iteration"""
+    scenario = SCENARIOS[name]
+    latencies, errors, requests = [], [0], [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            failed, count = 0, 0
+            for status, _ in scenario(ctx, rng):
+                count += 1
+                if status >= 400:
+                    failed += 1
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed * 1000)
+                requests[0] += count
+                errors[0] += failed
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    return {
+        'iterations': len(latencies),
+        'requests': requests[0],
+        'errors': errors[0],
+        'throughput_rps': round(requests[0] / wall, 2),
+        'iterations_per_second': round(len(latencies) / wall, 2),
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50), 2),
+            'p90': round(percentile(latencies, 90), 2),
+            'p99': round(percentile(latencies, 99), 2),
+            'max': round(max(latencies), 2) if latencies else 0.0,
+        },
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Return the scenarios that got slower or lost throughput beyond tolerance"""
+    regressions = []
+    for name, current in results['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if not previous:
+            continue
+        if current['latency_ms']['p90'] > previous['latency_ms']['p90'] * (1 + tolerance):
+            regressions.append(f"{name}: p90 {previous['latency_ms']['p90']}ms -> {current['latency_ms']['p90']}ms")
+        if current['throughput_rps'] < previous['throughput_rps'] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {previous['throughput_rps']} -> {current['throughput_rps']} req/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run load scenarios against a local server.')
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='comma-separated subset of: ' + ', '.join(SCENARIOS))
+    parser.add_argument('--duration', type=float, default=20, help='seconds per scenario')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--prefix', default='bench')
+    parser.add_argument('--password', default='bench-pass-123')
+    parser.add_argument('--customers', type=int, default=20, help='customer accounts to spread cart traffic over')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--baseline', help='compare against a previous --output file')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed regression as a fraction (default 0.2)')
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        parser.error(f'Unknown scenarios: {", ".join(sorted(unknown))}')
+
+    ctx = Context(args.base_url, args.prefix, args.password, args.customers)
+    results = {
+        'meta': {'base_url': args.base_url, 'duration': args.duration, 'concurrency': args.concurrency,
+                 'seed': args.seed, 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')},
+        'scenarios': {},
+    }
+    print(f"{'scenario':<16}{'req/s':>10}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for name in names:
+        result = run_scenario(ctx, name, args.duration, args.concurrency, args.seed)
+        results['scenarios'][name] = result
+        latency = result['latency_ms']
+        print(f"{name:<16}{result['throughput_rps']:>10}{latency['p50']:>10}{latency['p90']:>10}{latency['p99']:>10}{result['errors']:>8}")
+
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(results, handle, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as handle:
+            regressions = compare(results, json.load(handle), args.tolerance)
+        if regressions:
+            print('Regressions against baseline:')
+            for line in regressions:
+                print(f'  {line}')
+            sys.exit(1)
+        print('No regressions against baseline.')
+
+
+if __name__ == '__main__':
+    main()
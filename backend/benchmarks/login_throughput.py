@@ -0,0 +1,93 @@
+"""
+Password hashing and login throughput benchmark.
+
+    python -m benchmarks.login_throughput --rounds 20
+
+For each password hasher it reports the median time to verify one
+password and the resulting logins per second on one core: Django's stock
+PBKDF2, the tuned PBKDF2 and, when argon2-cffi is installed, stock and
+tuned Argon2. It then times the login view end to end with the configured
+hasher, and the rate-limited rejection that answers a flood without
+hashing. A throwaway user is created and deleted afterwards.
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks import setup_django
+
+setup_django()
+
+from django.contrib.auth.hashers import Argon2PasswordHasher, PBKDF2PasswordHasher, get_hasher
+from django.test import RequestFactory
+from accounts import ratelimit
+from accounts.hashers import TunedArgon2PasswordHasher, TunedPBKDF2PasswordHasher
+from accounts.models import User
+from accounts.views import login_user
+
+PASSWORD = 'correct horse battery staple'
+
+
+def median_ms(function, rounds):
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def report(name, ms):
+    print(f'{name:<44}{ms:>10.2f}{1000 / ms:>12.1f}')
+
+
+def hashers():
+    yield 'django PBKDF2', PBKDF2PasswordHasher()
+    yield f'tuned PBKDF2 ({TunedPBKDF2PasswordHasher.iterations} iterations)', TunedPBKDF2PasswordHasher()
+    try:
+        import argon2  # noqa: F401
+    except ImportError:
+        print(f"{'argon2':<44}{'(pip install argon2-cffi)':>22}")
+        return
+    yield 'django Argon2', Argon2PasswordHasher()
+    tuned = TunedArgon2PasswordHasher
+    yield (f'tuned Argon2 (t={tuned.time_cost}, m={tuned.memory_cost} KiB, p={tuned.parallelism})', tuned())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure password hashing cost and login throughput.')
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'hasher':<44}{'verify ms':>10}{'logins/s':>12}")
+    for name, hasher in hashers():
+        encoded = hasher.encode(PASSWORD, hasher.salt())
+        report(name, median_ms(lambda: hasher.verify(PASSWORD, encoded), args.rounds))
+
+    username = f'bench_login_{int(time.time())}'
+    user = User.objects.create_user(username=username, password=PASSWORD, user_type='customer')
+    factory = RequestFactory()
+    attempt = iter(range(10 ** 9))
+
+    def login(password=PASSWORD, same_ip=False):
+        # A new client address per request keeps the per-IP limit out of the way
+        n = 0 if same_ip else next(attempt)
+        request = factory.post('/api/auth/login/', {'username': username, 'password': password},
+                               content_type='application/json', REMOTE_ADDR=f'10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}')
+        return login_user(request)
+
+    try:
+        print()
+        report(f'login view ({get_hasher().algorithm})', median_ms(login, args.rounds))
+        limit, _ = ratelimit.LIMITS['login_ip']
+        for _ in range(limit):
+            ratelimit.login_ip.hit('10.0.0.0')
+        report('login view, rate limited (429)', median_ms(lambda: login('wrong', same_ip=True), args.rounds))
+    finally:
+        ratelimit.login_ip.reset('10.0.0.0')
+        ratelimit.login_user.reset(username)
+        user.delete()
+
+
+if __name__ == '__main__':
+    main()
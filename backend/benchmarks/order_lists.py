@@ -0,0 +1,61 @@
+"""
+Query count and payload size of order list representations.
+
+    python -m benchmarks.datagen --orders 5000     # once, if the database is empty
+    python -m benchmarks.order_lists --orders 1000
+
+Serializes the newest --orders orders in several ways and reports
+queries, JSON bytes and time for each. The ways are the full detail
+serializer without prefetching (how lists used to be rendered) and the
+list serializer with and without ?expand.
+"""
+import argparse
+import time
+
+from benchmarks import setup_django
+
+setup_django()
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from orders.models import Order
+from orders.serializers import OrderListSerializer, OrderSerializer
+
+
+def measure(build):
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        payload = JSONRenderer().render(build())
+        elapsed = (time.perf_counter() - start) * 1000
+    return len(queries), len(payload), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare order list serializers on a large page.')
+    parser.add_argument('--orders', type=int, default=1000)
+    args = parser.parse_args()
+
+    ids = list(Order.objects.order_by('-created_at').values_list('id', flat=True)[:args.orders])
+    if not ids:
+        raise SystemExit('No orders found; run benchmarks.datagen first')
+    base = Order.objects.filter(id__in=ids).order_by('-created_at')
+
+    variants = {
+        'detail, no prefetch': lambda: OrderSerializer(base.all(), many=True, context={'expand': {'tracking'}}).data,
+        'list': lambda: OrderListSerializer(OrderListSerializer.setup_queryset(base.all()), many=True).data,
+        'list ?expand=items': lambda: OrderListSerializer(
+            OrderListSerializer.setup_queryset(base.all(), {'items'}), many=True, context={'expand': {'items'}}).data,
+        'list ?expand=items,tracking': lambda: OrderListSerializer(
+            OrderListSerializer.setup_queryset(base.all(), {'items', 'tracking'}), many=True,
+            context={'expand': {'items', 'tracking'}}).data,
+    }
+    print(f'{len(ids)} orders')
+    print(f"{'representation':<30}{'queries':>9}{'KB':>10}{'ms':>10}")
+    for name, build in variants.items():
+        queries, size, elapsed = measure(build)
+        print(f'{name:<30}{queries:>9}{size / 1024:>10.1f}{elapsed:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Route planner latency benchmark.
+
+    python -m benchmarks.routing --stops 100,300,500 --pickups 10 --budget-ms 200 --rounds 5
+
+Plans trips of random stops around the city centre. The distance
+matrix, nearest-neighbour path and 2-opt all run in-process against the
+database-free planner. Reports the worst-case planning time and how much
+2-opt shortened the greedy route. The exit status is 1 when any round
+overruns --budget-ms by more than --slack-ms (matrix building is not
+time-boxed).
+"""
+import argparse
+import random
+import sys
+import time
+
+from benchmarks import setup_django
+
+setup_django()
+
+from benchmarks.datagen import random_point
+from shops.geo import distance_matrix
+from orders.routing import nearest_neighbour, path_length, plan_route
+
+
+def run(stops, pickups, budget_ms, rounds, seed, radius_km):
+    rng = random.Random(seed)
+    worst_ms, gains = 0.0, []
+    for _ in range(rounds):
+        start = random_point(rng, radius_km)
+        shop_points = [random_point(rng, radius_km) for _ in range(pickups)]
+        drop_points = [random_point(rng, radius_km) for _ in range(stops - pickups)]
+
+        began = time.perf_counter()
+        route = plan_route(start, shop_points, drop_points, budget_ms=budget_ms)
+        worst_ms = max(worst_ms, (time.perf_counter() - began) * 1000)
+
+        # Same phases, greedy only, for comparison
+        points = [start] + shop_points + drop_points
+        matrix = distance_matrix(points)
+        greedy = nearest_neighbour(matrix, 0, range(1, pickups + 1))
+        greedy += nearest_neighbour(matrix, greedy[-1], range(pickups + 1, len(points)))[1:]
+        greedy_km = path_length(matrix, greedy)
+        planned_km = sum(leg for _, _, leg in route)
+        gains.append((greedy_km - planned_km) / greedy_km * 100 if greedy_km else 0.0)
+    return {'worst_ms': round(worst_ms, 1), 'avg_gain_pct': round(sum(gains) / len(gains), 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure route planning latency for large multi-drop trips.')
+    parser.add_argument('--stops', default='100,300,500', help='comma-separated stop counts')
+    parser.add_argument('--pickups', type=int, default=10, help='shop pickups per trip')
+    parser.add_argument('--budget-ms', type=float, default=200)
+    parser.add_argument('--slack-ms', type=float, default=150, help='allowed overrun for the untimed matrix build')
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--radius-km', type=float, default=8)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'stops':>6}{'worst ms':>10}{'2-opt gain %':>14}")
+    for stops in [int(value) for value in args.stops.split(',') if value.strip()]:
+        result = run(stops, min(args.pickups, stops), args.budget_ms, args.rounds, args.seed, args.radius_km)
+        over = result['worst_ms'] > args.budget_ms + args.slack_ms
+        failed = failed or over
+        print(f"{stops:>6}{result['worst_ms']:>10}{result['avg_gain_pct']:>14}{'  OVER BUDGET' if over else ''}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+import os
+import time
+from collections import Counter
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import models
+from mediastore.models import MediaBlob
+from mediastore.storage import BLOB_DIR
+from shops.images import VARIANT_DIR, image_models
+
+
+def referenced_blobs():
+    """Count references to each blob, streaming every file field of every model"""
+    counts = Counter()
+    for model in apps.get_models():
+        for field in model._meta.concrete_fields:
+            if not isinstance(field, models.FileField):
+                continue
+            names = (model._base_manager.filter(**{f'{field.name}__startswith': f'{BLOB_DIR}/'})
+                     .values_list(field.name, flat=True).iterator(chunk_size=2000))
+            counts.update(names)
+    return counts
+
+
+def referenced_variants():
+    """
+    Every variant file named in an image_variants entry that is still
+    current, i.e. made from the file its field holds now
+    """
+    names = set()
+    for model, fields in image_models():
+        rows = model._base_manager.values_list('image_variants', *fields).iterator(chunk_size=2000)
+        for recorded, *current in rows:
+            for field, name in zip(fields, current):
+                entry = (recorded or {}).get(field)
+                if entry and name and entry.get('source') == name:
+                    for paths in entry['variants'].values():
+                        names.update(paths.values())
+    return names
+
+
+def media_files(root, top):
+    """Relative names and modification times of every file under one media directory"""
+    for directory, _, files in os.walk(os.path.join(root, top)):
+        for filename in files:
+            path = os.path.join(directory, filename)
+            yield os.path.relpath(path, root).replace(os.sep, '/'), os.path.getmtime(path)
+
+
+class Command(BaseCommand):
+    help = 'Delete media blobs no model field refers to, and image variants no image_variants entry refers to.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=float, default=getattr(settings, 'MEDIA_GC_GRACE_HOURS', 24),
+                            help='keep unreferenced files younger than this (uploads not yet saved on a model)')
+        parser.add_argument('--dry-run', action='store_true', help='only report what would be deleted')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        counts = referenced_blobs()
+        variants = referenced_variants()
+        cutoff = time.time() - options['grace_hours'] * 3600
+        root = default_storage.location
+
+        removed, removed_variants, freed = [], 0, 0
+        candidates = [(name, False) for name, modified in media_files(root, BLOB_DIR) if not counts[name] and modified <= cutoff]
+        candidates += [(name, True) for name, modified in media_files(root, VARIANT_DIR) if name not in variants and modified <= cutoff]
+        for name, is_variant in candidates:
+            path = os.path.join(root, name)
+            # Re-read the mtime: an upload reusing the file since the walk touched it
+            if os.path.getmtime(path) > cutoff:
+                continue
+            freed += os.path.getsize(path)
+            if is_variant:
+                removed_variants += 1
+            else:
+                removed.append(name)
+            if not options['dry_run']:
+                os.remove(path)
+
+        if options['dry_run']:
+            self.stdout.write(f'{len(removed)} unreferenced blob(s) and {removed_variants} variant(s), '
+                              f'{freed / 1024 / 1024:.1f} MB, would be deleted')
+            return
+
+        for start in range(0, len(removed), 500):
+            MediaBlob.objects.filter(name__in=removed[start:start + 500]).delete()
+        self.stdout.write(f'Deleted {len(removed)} blob(s) and {removed_variants} variant(s), freed {freed / 1024 / 1024:.1f} MB, '
+                          f'in {time.perf_counter() - started:.1f}s')
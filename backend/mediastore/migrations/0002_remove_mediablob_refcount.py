@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:15
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mediastore', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='mediablob',
+            name='refcount',
+        ),
+    ]
@@ -0,0 +1,19 @@
+from django.db import models
+
+
+class MediaBlob(models.Model):
+    """
+    One stored file of ContentAddressedStorage. Which fields point at it is
+    worked out by `manage.py gc_media` from the models themselves.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    sha256 = models.CharField(max_length=64, db_index=True)
+    size = models.PositiveBigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return self.name
+    
+    @classmethod
+    def register(cls, name, sha256, size):
+        cls.objects.get_or_create(name=name, defaults={'sha256': sha256, 'size': size})
@@ -0,0 +1,159 @@
+import mimetypes
+import os
+import re
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+# Suffix -> Content-Encoding for precompressed static files, best first
+ENCODINGS = (('.br', 'br'), ('.gz', 'gzip'))
+
+
+class RangeFile:
+    """Read at most length bytes of an open file, for FileResponse"""
+
+    def __init__(self, handle, start, length):
+        handle.seek(start)
+        self.handle = handle
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        size = self.remaining if size < 0 else min(size, self.remaining)
+        data = self.handle.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.handle.close()
+
+
+def parse_range(header, size):
+    """(start, end) inclusive for a single 'bytes=' range, None to send everything, or raise ValueError"""
+    match = RANGE_RE.match(header or '')
+    if not match or (not match.group(1) and not match.group(2)):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError('unsatisfiable range')
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError('unsatisfiable range')
+    return start, end
+
+
+def accepted_encodings(header):
+    """Accept-Encoding as {coding: q}; a coding with q=0 is refused"""
+    weights = {}
+    for part in (header or '').split(','):
+        coding, *params = [item.strip() for item in part.split(';')]
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[coding.lower()] = q
+    return weights
+
+
+def encoding_etag(etag, encoding):
+    # Each encoding is a different representation, so it gets its own tag
+    return f'{etag[:-1]}-{encoding}"' if etag.endswith('"') else f'{etag}-{encoding}'
+
+
+def not_modified(request, etag, mtime):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        return etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+    since = parse_http_date_safe(request.headers.get('If-Modified-Since') or '')
+    return since is not None and int(mtime) <= since
+
+
+def serve_file(request, root, path, cache_control, etag=None, precompressed=False, sendfile=None):
+    """
+    Serve path under root with conditional GET, single byte ranges and, when
+    precompressed, a .br/.gz sibling the client accepts. With sendfile set
+    to 'x-accel-redirect' or 'x-sendfile' only headers are returned and the
+    web server in front streams the file (and handles ranges itself).
+    """
+    try:
+        full_path = safe_join(root, path)
+    except ValueError:
+        raise Http404('Not found')
+    if not os.path.isfile(full_path):
+        raise Http404('Not found')
+
+    stat = os.stat(full_path)
+    etag = etag or '"%x-%x"' % (int(stat.st_mtime), stat.st_size)
+    content_type, _ = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+    headers = {'ETag': etag, 'Last-Modified': http_date(stat.st_mtime), 'Cache-Control': cache_control}
+
+    encoding = None
+    if precompressed and not sendfile:
+        headers['Vary'] = 'Accept-Encoding'
+        weights = accepted_encodings(request.headers.get('Accept-Encoding'))
+        for suffix, candidate in ENCODINGS:
+            if weights.get(candidate, weights.get('*', 0)) > 0 and os.path.isfile(full_path + suffix):
+                encoding, full_path = candidate, full_path + suffix
+                headers['ETag'] = encoding_etag(etag, encoding)
+                break
+
+    if not_modified(request, headers['ETag'], stat.st_mtime):
+        response = HttpResponseNotModified()
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+    if sendfile:
+        response = HttpResponse(content_type=content_type)
+        if sendfile == 'x-accel-redirect':
+            response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX.rstrip('/') + '/' + path
+        else:
+            response['X-Sendfile'] = full_path
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+    if encoding:
+        response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+        response['Content-Encoding'] = encoding
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+    try:
+        byte_range = parse_range(request.headers.get('Range'), stat.st_size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return response
+    if_range = request.headers.get('If-Range')
+    if byte_range and if_range and if_range != etag:
+        byte_range = None
+
+    handle = open(full_path, 'rb')
+    if byte_range is None:
+        response = FileResponse(handle, content_type=content_type)
+    else:
+        start, end = byte_range
+        response = FileResponse(RangeFile(handle, start, end - start + 1), status=206, content_type=content_type)
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+    response['Accept-Ranges'] = 'bytes'
+    for name, value in headers.items():
+        response[name] = value
+    return response
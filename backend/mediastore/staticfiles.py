@@ -0,0 +1,59 @@
+import gzip
+import os
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # optional; without it only .gz files are built
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.mjs', '.json', '.map', '.svg', '.txt', '.html', '.xml', '.ico',
+                           '.ttf', '.otf', '.eot')
+MIN_COMPRESS_SIZE = getattr(settings, 'STATIC_MIN_COMPRESS_SIZE', 512)
+
+
+def compress(path):
+    """Write path.gz and path.br next to path when they come out smaller; returns what was written"""
+    with open(path, 'rb') as source:
+        data = source.read()
+    written = []
+    encoders = [('.gz', lambda raw: gzip.compress(raw, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        encoders.append(('.br', lambda raw: brotli.compress(raw, quality=11)))
+    for suffix, encode in encoders:
+        encoded = encode(data)
+        if len(encoded) < len(data):
+            with open(path + suffix, 'wb') as target:
+                target.write(encoded)
+            written.append(path + suffix)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Manifest storage (content-hashed names) that also writes gzip and,
+    when the brotli package is installed, Brotli copies of text assets at
+    collectstatic time, so nothing is compressed per request.
+    """
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # Not collected yet (e.g. DEBUG=False before collectstatic): plain name
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        names = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                names.update((name, hashed_name))
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for name in sorted(names):
+            path = self.path(name)
+            if path.endswith(COMPRESSIBLE_EXTENSIONS) and os.path.getsize(path) >= MIN_COMPRESS_SIZE:
+                compress(path)
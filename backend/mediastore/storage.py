@@ -0,0 +1,72 @@
+import hashlib
+import os
+import tempfile
+from django.core.files.storage import FileSystemStorage
+
+BLOB_DIR = 'blobs'
+
+
+def blob_name(digest, extension):
+    return f'{BLOB_DIR}/{digest[:2]}/{digest[2:]}{extension}'
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    MEDIA_ROOT storage that keeps each distinct file once, under the
+    SHA-256 of its content (blobs/ab/cdef...jpg), whatever name it was
+    uploaded with. Saving the same bytes again reuses the blob. Files are
+    removed from disk by `manage.py gc_media` once nothing refers to them,
+    never here, since another field may share the blob.
+    """
+
+    @property
+    def scratch_location(self):
+        # Next to MEDIA_ROOT rather than inside it, so partial uploads are
+        # never reachable under MEDIA_URL; same filesystem for os.replace
+        return os.path.normpath(self.location) + '.tmp'
+
+    def get_available_name(self, name, max_length=None):
+        # The final name comes from the content in _save, so no suffixing
+        return name
+
+    def _save(self, name, content):
+        extension = os.path.splitext(name)[1].lower()[:10]
+        scratch = self.scratch_location
+        os.makedirs(scratch, exist_ok=True)
+
+        # Hash while spooling to a temp file so the upload is read once
+        hasher, size = hashlib.sha256(), 0
+        fd, temp_path = tempfile.mkstemp(dir=scratch)
+        try:
+            with os.fdopen(fd, 'wb') as temp:
+                for chunk in content.chunks():
+                    hasher.update(chunk)
+                    temp.write(chunk)
+                    size += len(chunk)
+            digest = hasher.hexdigest()
+            name = blob_name(digest, extension)
+            full_path = self.path(name)
+            if os.path.exists(full_path):
+                os.remove(temp_path)
+                # Counts as new again, so gc_media's grace period protects it
+                os.utime(full_path)
+            else:
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                # Atomic; a concurrent writer of the same blob wrote the same bytes
+                os.replace(temp_path, full_path)
+                if self.file_permissions_mode is not None:
+                    os.chmod(full_path, self.file_permissions_mode)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        from .models import MediaBlob
+        MediaBlob.register(name, digest, size)
+        return name
+
+    def delete(self, name):
+        # Blobs are left to gc_media; files saved before this storage was
+        # configured are not shared and go at once
+        if name and not name.startswith(f'{BLOB_DIR}/'):
+            super().delete(name)
@@ -0,0 +1,58 @@
+import os
+import shutil
+import tempfile
+from django.test import RequestFactory, SimpleTestCase
+from .serving import parse_range, serve_file
+
+
+class ParseRangeTests(SimpleTestCase):
+    def test_no_or_unsupported_range_sends_everything(self):
+        for header in (None, '', 'bytes=-', 'items=0-5', 'bytes=0-1,4-5'):
+            self.assertIsNone(parse_range(header, 100))
+
+    def test_byte_ranges(self):
+        self.assertEqual(parse_range('bytes=0-9', 100), (0, 9))
+        self.assertEqual(parse_range('bytes=90-', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=90-500', 100), (90, 99))
+
+    def test_suffix_range(self):
+        self.assertEqual(parse_range('bytes=-10', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=-500', 100), (0, 99))
+
+    def test_unsatisfiable(self):
+        for header in ('bytes=100-', 'bytes=10-5', 'bytes=-0'):
+            with self.assertRaises(ValueError):
+                parse_range(header, 100)
+
+
+class ServeFileRangeTests(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        with open(os.path.join(self.root, 'file.bin'), 'wb') as f:
+            f.write(bytes(range(100)))
+        self.factory = RequestFactory()
+
+    def get(self, headers):
+        return serve_file(self.factory.get('/media/file.bin', headers=headers), self.root, 'file.bin', 'no-cache')
+
+    def test_partial_content(self):
+        response = self.get({'Range': 'bytes=10-19'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(10, 20)))
+
+    def test_suffix_range(self):
+        response = self.get({'Range': 'bytes=-5'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(95, 100)))
+
+    def test_range_not_satisfiable(self):
+        response = self.get({'Range': 'bytes=200-'})
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */100')
+
+    def test_stale_if_range_sends_everything(self):
+        response = self.get({'Range': 'bytes=10-19', 'If-Range': '"stale"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(b''.join(response.streaming_content)), 100)
@@ -0,0 +1,29 @@
+import re
+from django.conf import settings
+from .serving import serve_file
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+HASHED_STATIC_RE = re.compile(r'\.[0-9a-f]{12}\.[^/]+$')
+
+
+def serve_immutable(request, path):
+    """
+    Serve a content-addressed media file (blobs/ or variants/). The name
+    changes whenever the bytes do, so clients may cache it forever.
+    """
+    # blobs/ab/cdef.jpg -> "abcdef", the content hash
+    etag = '"%s"' % ''.join(path.split('/')[-2:]).split('.', 1)[0]
+    return serve_file(request, settings.MEDIA_ROOT, path, IMMUTABLE_CACHE_CONTROL, etag=etag,
+                      sendfile=settings.MEDIA_SENDFILE)
+
+
+def serve_media(request, path):
+    """Other uploads, which may be replaced under the same name"""
+    return serve_file(request, settings.MEDIA_ROOT, path, settings.MEDIA_CACHE_CONTROL,
+                      sendfile=settings.MEDIA_SENDFILE)
+
+
+def serve_static(request, path):
+    """collectstatic output, preferring the .br/.gz files built alongside it"""
+    cache_control = IMMUTABLE_CACHE_CONTROL if HASHED_STATIC_RE.search(path) else settings.MEDIA_CACHE_CONTROL
+    return serve_file(request, settings.STATIC_ROOT, path, cache_control, precompressed=True)
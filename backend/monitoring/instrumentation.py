@@ -0,0 +1,105 @@
+import hashlib
+import re
+import threading
+import time
+from collections import Counter, deque
+from django.conf import settings
+
+SQL_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+SQL_WHITESPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """Normalise a parametrised SQL statement so repeated query shapes compare equal"""
+    sql = SQL_WHITESPACE.sub(' ', sql.strip())
+    sql = SQL_IN_LIST.sub('IN (...)', sql)
+    return hashlib.sha1(sql.encode()).hexdigest()[:12], sql
+
+
+class QueryRecorder:
+    """execute_wrapper hook that times every query run while a request is handled"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+        self.samples = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            key, normalised = fingerprint(sql)
+            self.shapes[key] += 1
+            self.samples.setdefault(key, normalised)
+
+    def duplicates(self):
+        return {key: count for key, count in self.shapes.items() if count > 1}
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class EndpointStats:
+    """Rolling per-endpoint samples of wall time, query count and query time"""
+
+    def __init__(self, window):
+        self.window = window
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.samples = {}
+            self.requests = Counter()
+            self.duplicates = {}
+            self.duplicate_sql = {}
+
+    def record(self, endpoint, wall_time, recorder):
+        with self.lock:
+            if endpoint not in self.samples:
+                self.samples[endpoint] = deque(maxlen=self.window)
+                self.duplicates[endpoint] = Counter()
+            self.samples[endpoint].append((wall_time, recorder.count, recorder.duration))
+            self.requests[endpoint] += 1
+            for key, count in recorder.duplicates().items():
+                self.duplicates[endpoint][key] += count
+                self.duplicate_sql.setdefault(key, recorder.samples[key])
+
+    def report(self, top_duplicates=5):
+        with self.lock:
+            endpoints = {name: list(samples) for name, samples in self.samples.items()}
+            requests = dict(self.requests)
+            duplicates = {name: counter.most_common(top_duplicates) for name, counter in self.duplicates.items()}
+            duplicate_sql = dict(self.duplicate_sql)
+
+        data = []
+        for name, samples in endpoints.items():
+            wall = [s[0] * 1000 for s in samples]
+            queries = [s[1] for s in samples]
+            query_time = [s[2] * 1000 for s in samples]
+            data.append({
+                'endpoint': name,
+                'requests': requests[name],
+                'sampled': len(samples),
+                'wall_ms': {'p50': round(percentile(wall, 50), 2), 'p90': round(percentile(wall, 90), 2), 'p99': round(percentile(wall, 99), 2)},
+                'queries': {'p50': percentile(queries, 50), 'p90': percentile(queries, 90), 'max': max(queries)},
+                'query_ms': {'p50': round(percentile(query_time, 50), 2), 'p90': round(percentile(query_time, 90), 2), 'p99': round(percentile(query_time, 99), 2)},
+                'duplicate_queries': [
+                    {'fingerprint': key, 'executions': count, 'sql': duplicate_sql[key][:300]}
+                    for key, count in duplicates[name]
+                ],
+            })
+        data.sort(key=lambda item: item['queries']['p90'], reverse=True)
+        return data
+
+
+endpoint_stats = EndpointStats(getattr(settings, 'INSTRUMENTATION_WINDOW', 500))
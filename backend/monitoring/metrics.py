@@ -0,0 +1,262 @@
+import json
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from django.conf import settings
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _labels_key(labels):
+    return json.dumps(sorted(labels.items()))
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class Registry:
+    """
+    Process-local metric store that is periodically snapshotted to
+    METRICS_MULTIPROC_DIR/<pid>.json. The exporter merges every snapshot,
+    so counters from all gunicorn workers add up without a network service.
+    """
+
+    def __init__(self, directory, flush_interval):
+        self.directory = Path(directory)
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.metrics = {}
+        self.pid = None
+        self.values = {}
+        self.last_flush = 0.0
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def _snapshot_path(self, pid):
+        return self.directory / f'{pid}.json'
+
+    def _ensure_process(self):
+        # Forked workers must not inherit the parent's counts. A snapshot left
+        # by a dead process that had the same pid is adopted so no counts are lost.
+        pid = os.getpid()
+        if self.pid == pid:
+            return
+        self.pid = pid
+        self.values = {}
+        path = self._snapshot_path(pid)
+        if path.exists():
+            try:
+                data = json.loads(path.read_text())
+                self.values = {name: dict(samples) for name, samples in data['values'].items()
+                               if data['types'].get(name) != 'gauge'}
+            except (ValueError, KeyError):
+                pass
+
+    def update(self, name, key, fn):
+        with self.lock:
+            self._ensure_process()
+            samples = self.values.setdefault(name, {})
+            samples[key] = fn(samples.get(key))
+
+    def maybe_flush(self):
+        if time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            self._ensure_process()
+            self.last_flush = time.monotonic()
+            payload = json.dumps({
+                'types': {name: metric.kind for name, metric in self.metrics.items()},
+                'values': self.values,
+            })
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._snapshot_path(self.pid)
+        tmp_path = path.with_suffix(f'.{threading.get_ident()}.tmp')
+        tmp_path.write_text(payload)
+        os.replace(tmp_path, path)
+
+    def collect(self):
+        """Merge all process snapshots; gauges only count live processes"""
+        self.flush()
+        merged = {}
+        for path in self.directory.glob('*.json'):
+            try:
+                pid = int(path.stem)
+                data = json.loads(path.read_text())
+            except (ValueError, OSError):
+                continue
+            alive = _pid_alive(pid)
+            for name, samples in data['values'].items():
+                metric = self.metrics.get(name)
+                if metric is None or (metric.kind == 'gauge' and not alive):
+                    continue
+                target = merged.setdefault(name, {})
+                for key, value in samples.items():
+                    target[key] = metric.merge(target.get(key), value)
+        return merged
+
+    def render(self):
+        merged = self.collect()
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for key, value in sorted(merged.get(name, {}).items()):
+                lines.extend(metric.expose(dict(json.loads(key)), value))
+        return '\n'.join(lines) + '\n'
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    parts = []
+    for name, value in labels.items():
+        value = str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+        parts.append(f'{name}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        registry.register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name} expects labels {self.labelnames}')
+        return _labels_key(labels)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        registry.update(self.name, self._key(labels), lambda value: (value or 0) + amount)
+
+    def merge(self, current, value):
+        return (current or 0) + value
+
+    def expose(self, labels, value):
+        return [f'{self.name}{_format_labels(labels)} {_format_value(value)}']
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        registry.update(self.name, self._key(labels), lambda current: value)
+
+    def merge(self, current, value):
+        return (current or 0) + value
+
+    def expose(self, labels, value):
+        return [f'{self.name}{_format_labels(labels)} {_format_value(value)}']
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        def apply(current):
+            # Stored as [per-bucket counts..., +Inf count, sum]
+            current = current or [0] * (len(self.buckets) + 1) + [0.0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    current[index] += 1
+                    break
+            else:
+                current[len(self.buckets)] += 1
+            current[-1] += value
+            return current
+        registry.update(self.name, self._key(labels), apply)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def merge(self, current, value):
+        if current is None:
+            return list(value)
+        return [a + b for a, b in zip(current, value)]
+
+    def expose(self, labels, value):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), value[:-1]):
+            cumulative += count
+            bucket_labels = dict(labels, le=_format_value(bound) if bound != float('inf') else '+Inf')
+            lines.append(f'{self.name}_bucket{_format_labels(bucket_labels)} {cumulative}')
+        lines.append(f'{self.name}_count{_format_labels(labels)} {cumulative}')
+        lines.append(f'{self.name}_sum{_format_labels(labels)} {_format_value(value[-1])}')
+        return lines
+
+
+registry = Registry(
+    getattr(settings, 'METRICS_MULTIPROC_DIR', settings.BASE_DIR / 'metrics'),
+    getattr(settings, 'METRICS_FLUSH_INTERVAL', 1.0),
+)
+
+
+# ============ REQUEST METRICS ============
+
+http_requests_total = Counter('http_requests_total', 'HTTP requests by view, method and status.', ('view', 'method', 'status'))
+http_request_duration_seconds = Histogram('http_request_duration_seconds', 'HTTP request latency by view.', ('view',))
+
+# ============ BUSINESS METRICS ============
+
+checkout_total = Counter('checkout_total', 'Checkout attempts by outcome.', ('outcome',))
+orders_created_total = Counter('orders_created_total', 'Orders created by checkout.')
+checkout_duration_seconds = Histogram('checkout_duration_seconds', 'Time spent creating orders at checkout.')
+cart_size_items = Histogram('cart_size_items', 'Number of distinct products in the cart at checkout.', buckets=(1, 2, 3, 5, 10, 20, 50, 100))
+order_status_transitions_total = Counter('order_status_transitions_total', 'Order status changes.', ('from_status', 'to_status'))
+search_duration_seconds = Histogram('search_duration_seconds', 'Product search latency.')
+search_results = Histogram('search_results', 'Products returned per search.', buckets=(0, 1, 5, 10, 25, 50, 100, 250, 1000))
+nearby_shops_duration_seconds = Histogram('nearby_shops_duration_seconds', 'Nearby shop lookup latency.')
+nearby_shops_results = Histogram('nearby_shops_results', 'Shops returned per nearby lookup.', buckets=(0, 1, 5, 10, 25, 50, 100))
+dispatch_assignments_total = Counter('dispatch_assignments_total', 'Deliveries assigned to agents by dispatch mode.', ('mode',))
+dispatch_pickup_distance_km = Histogram('dispatch_pickup_distance_km', 'Agent to shop distance at assignment.', buckets=(0.5, 1, 2, 3, 5, 8, 10, 15))
+
+# ============ RUNTIME METRICS ============
+
+db_connections_open = Gauge('db_connections_open', 'Open database connections per alias.', ('alias',))
+process_max_rss_bytes = Gauge('process_max_rss_bytes', 'Peak resident memory of live worker processes.')
+process_cpu_seconds = Gauge('process_cpu_seconds', 'CPU time consumed by live worker processes.')
+
+
+def update_runtime_metrics(connections):
+    for connection in connections.all():
+        db_connections_open.set(1 if connection.connection is not None else 0, alias=connection.alias)
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    process_max_rss_bytes.set(usage.ru_maxrss * 1024)
+    process_cpu_seconds.set(usage.ru_utime + usage.ru_stime)
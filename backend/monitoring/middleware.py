@@ -0,0 +1,60 @@
+import random
+import time
+from contextlib import ExitStack
+from django.conf import settings
+from django.db import connections
+from . import metrics
+from .instrumentation import QueryRecorder, endpoint_stats
+
+
+def endpoint_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return match.view_name or match._func_path
+
+
+class QueryInstrumentationMiddleware:
+    """Record wall time, query count and duplicate queries for a sample of requests"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'INSTRUMENTATION_SAMPLE_RATE', 1.0)
+        self.server_timing = getattr(settings, 'INSTRUMENTATION_SERVER_TIMING', True)
+
+    def __call__(self, request):
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        wall_time = time.perf_counter() - start
+
+        endpoint_stats.record(endpoint_name(request), wall_time, recorder)
+        if self.server_timing:
+            response['Server-Timing'] = (
+                f'total;dur={wall_time * 1000:.1f}, '
+                f'db;dur={recorder.duration * 1000:.1f};desc="{recorder.count} queries"'
+            )
+        return response
+
+
+class MetricsMiddleware:
+    """Count requests and observe latency per resolved view for the /metrics exporter"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        response = self.get_response(request)
+        view = endpoint_name(request)
+        metrics.http_request_duration_seconds.observe(time.perf_counter() - start, view=view)
+        metrics.http_requests_total.inc(view=view, method=request.method, status=str(response.status_code))
+        metrics.update_runtime_metrics(connections)
+        metrics.registry.maybe_flush()
+        return response
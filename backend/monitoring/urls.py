@@ -0,0 +1,6 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('endpoints/', views.endpoint_report, name='endpoint_report'),
+]
@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+from .instrumentation import endpoint_stats
+from .metrics import registry
+
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def endpoint_report(request):
+    """Per-endpoint latency and query-count percentiles (Admin only)"""
+    if request.user.user_type != 'admin':
+        return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
+    
+    if request.method == 'DELETE':
+        endpoint_stats.reset()
+        return Response({'message': 'Endpoint statistics reset'})
+    
+    return Response(endpoint_stats.report())
+
+
+def metrics_view(request):
+    """Prometheus text exposition of metrics merged across worker processes"""
+    token = getattr(settings, 'METRICS_AUTH_TOKEN', '')
+    if token:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        if not constant_time_compare(supplied, token):
+            return HttpResponse('Unauthorized\n', status=401, content_type='text/plain')
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
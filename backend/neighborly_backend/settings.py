@@ -26,15 +26,20 @@ INSTALLED_APPS = [
     # Third party apps
     'rest_framework',
     'rest_framework_simplejwt',
+    'rest_framework_simplejwt.token_blacklist',
     'corsheaders',
     
     # Local apps
     'accounts',
     'shops',
     'orders',
+    'monitoring',
+    'mediastore',
 ]
 
 MIDDLEWARE = [
+    'monitoring.middleware.MetricsMiddleware',
+    'monitoring.middleware.QueryInstrumentationMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -73,6 +78,14 @@ DATABASES = {
     }
 }
 
+# Cache (set CACHE_BACKEND/CACHE_LOCATION to a shared cache when running several workers)
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='neighborly'),
+    }
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -89,6 +102,36 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing (accounts.hashers). Argon2id (argon2-cffi, in
+# requirements.txt) is preferred; without it PBKDF2 with the iteration count
+# below is used. Stored hashes made with other settings are upgraded on the
+# user's next login.
+PASSWORD_ARGON2 = {'time_cost': 2, 'memory_cost': 19456, 'parallelism': 1}
+PASSWORD_PBKDF2_ITERATIONS = config('PASSWORD_PBKDF2_ITERATIONS', default=600000, cast=int)
+try:
+    import argon2  # noqa: F401
+    PASSWORD_HASHERS = ['accounts.hashers.TunedArgon2PasswordHasher']
+except ImportError:
+    PASSWORD_HASHERS = []
+PASSWORD_HASHERS += [
+    'accounts.hashers.TunedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+# Attempts allowed per window (accounts.ratelimit), as (attempts, seconds):
+# failed logins per client IP, failed password checks per username, and
+# registrations per client IP
+AUTH_RATE_LIMITS = {
+    'login_ip': (30, 60),
+    'login_user': (10, 900),
+    'register_ip': (10, 3600),
+}
+# Reverse proxies in front of Django that append to X-Forwarded-For (1 for the
+# nginx setup in the README). The client IP is the address the outermost of
+# them saw; 0 uses REMOTE_ADDR, as the header can be forged without a proxy.
+TRUSTED_PROXY_COUNT = config('TRUSTED_PROXY_COUNT', default=0, cast=int)
+
 # Internationalization
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
@@ -106,6 +149,24 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploads are stored once per distinct content under MEDIA_ROOT/blobs (see
+# mediastore.storage); `manage.py gc_media` deletes blobs nothing refers to
+# once they are older than MEDIA_GC_GRACE_HOURS
+STORAGES = {
+    'default': {'BACKEND': 'mediastore.storage.ContentAddressedStorage'},
+    'staticfiles': {'BACKEND': 'mediastore.staticfiles.CompressedManifestStaticFilesStorage'},
+}
+MEDIA_GC_GRACE_HOURS = 24
+
+# Asset serving (mediastore.views). collectstatic writes content-hashed names
+# plus .gz copies (and .br with `pip install brotli`). With MEDIA_SENDFILE set
+# to 'x-accel-redirect' (nginx, internal location at MEDIA_ACCEL_PREFIX) or
+# 'x-sendfile' (Apache), Django only resolves the file and the web server
+# sends the bytes; otherwise Django streams them with range support.
+MEDIA_SENDFILE = config('MEDIA_SENDFILE', default='') or None
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+MEDIA_CACHE_CONTROL = 'public, max-age=3600'
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -115,7 +176,7 @@ AUTH_USER_MODEL = 'accounts.User'
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -152,6 +213,8 @@ SIMPLE_JWT = {
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
     'TOKEN_USER_CLASS': 'rest_framework_simplejwt.models.TokenUser',
+    # Re-read the user on refresh so new tokens carry current claims
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.authentication.ClaimsTokenRefreshSerializer',
 
     'JTI_CLAIM': 'jti',
 
@@ -160,6 +223,30 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
 }
 
+# Seconds a worker trusts its memo of "claims changed" marks before asking
+# the cache again (accounts.authentication)
+AUTH_CLAIMS_CHECK_TTL = 5
+# Build request.user from access-token claims without loading the row. The
+# "claims changed" marks must reach every worker, so None turns this on only
+# with a shared cache backend; True suits a single-process deployment
+AUTH_CLAIMS_FAST_PATH = None
+
+# Seconds a shopkeeper's shop id and verification status stay cached for the
+# shopkeeper endpoints; saves to Shop/ShopkeeperProfile clear it (shops.context)
+SHOPKEEPER_CONTEXT_TTL = 300
+
+# Refresh-token store (accounts.tokens): the blacklist bloom filter is sized
+# for this many live blacklisted tokens before it is rebuilt larger, and
+# outstanding-token rows are inserted in batches of this size or after this
+# many seconds. Expired rows are removed by `manage.py prune_tokens`.
+# Each process re-reads newly blacklisted tokens at least every
+# TOKEN_BLACKLIST_SYNC_SECONDS, so logouts reach every worker in that time
+# even without a shared cache.
+TOKEN_BLACKLIST_BLOOM_CAPACITY = 100000
+TOKEN_BLACKLIST_SYNC_SECONDS = 5
+OUTSTANDING_TOKEN_BATCH_SIZE = 200
+OUTSTANDING_TOKEN_FLUSH_SECONDS = 2
+
 # CORS Configuration
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -172,7 +259,79 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_CREDENTIALS = True
 
+# Pagination headers the frontend reads (admin user directory)
+CORS_EXPOSE_HEADERS = ['X-Next-Cursor', 'Link']
+
 CORS_ALLOW_ALL_ORIGINS = DEBUG  # Only in development
 
 # Email Configuration (for development)
-EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
\ No newline at end of file
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+
+# Admin dashboard (accounts.dashboard): threads computing uncached widgets in
+# parallel, and per-widget cache lifetimes overriding the defaults there,
+# e.g. {'top_shops': 600}
+DASHBOARD_WORKERS = 4
+DASHBOARD_WIDGET_TTLS = {}
+
+# Shop and product rankings (orders.leaderboard): read from daily sales rollups
+# kept up to date at checkout; seconds a ranking stays cached
+LEADERBOARD_CACHE_TTL = 60
+
+# Admin report exports
+REPORT_EXPORT_CHUNK_SIZE = 2000
+REPORT_ASYNC_EXPORT_THRESHOLD = 100000
+REPORT_EXPORT_ROOT = BASE_DIR / 'exports'
+
+
+# Request instrumentation (fraction of requests sampled, samples kept per endpoint)
+INSTRUMENTATION_SAMPLE_RATE = config('INSTRUMENTATION_SAMPLE_RATE', default=1.0, cast=float)
+INSTRUMENTATION_WINDOW = 500
+INSTRUMENTATION_SERVER_TIMING = True
+
+# Prometheus metrics: each worker snapshots into METRICS_MULTIPROC_DIR and
+# /metrics merges the snapshots. Set METRICS_AUTH_TOKEN to require a bearer token.
+METRICS_MULTIPROC_DIR = config('METRICS_MULTIPROC_DIR', default=str(BASE_DIR / 'metrics'))
+METRICS_FLUSH_INTERVAL = 1.0
+METRICS_AUTH_TOKEN = config('METRICS_AUTH_TOKEN', default='')
+
+# Delivery quotes: cache lifetime, and an optional dotted path to a
+# callable(address) -> (latitude, longitude) or None used when the client
+# sends no coordinates.
+DELIVERY_QUOTE_TTL = 300
+DELIVERY_GEOCODER = config('DELIVERY_GEOCODER', default='') or None
+
+# Seconds an active coupon stays in each worker's in-memory cache
+COUPON_CACHE_TTL = 60
+
+# Resized copies of uploaded images (shops.images): widths in pixels, each
+# saved as WebP and JPEG under content-hashed names in MEDIA_ROOT/variants
+IMAGE_VARIANT_WIDTHS = (160, 320, 640, 1280)
+IMAGE_VARIANT_DIR = 'variants'
+IMAGE_WORKERS = 2
+
+# Guest carts live only in the cache until login or checkout merges them
+GUEST_CART_TTL = 7 * 24 * 3600
+GUEST_CART_MAX_LINES = 100
+
+# Delivery dispatch. DISPATCH_MODE 'immediate' assigns the nearest agent when an
+# order becomes ready_for_pickup; 'batch' leaves it to `manage.py dispatch_orders`.
+DISPATCH_MODE = config('DISPATCH_MODE', default='immediate')
+DISPATCH_CELL_KM = 1.0
+DISPATCH_FLUSH_INTERVAL = 5.0
+DISPATCH_FLUSH_SIZE = 200
+DISPATCH_INDEX_REFRESH = 10.0
+DISPATCH_MAX_PICKUP_KM = 10.0
+DISPATCH_AGENT_CAPACITY = 3
+DISPATCH_BATCH_SIZE = 100
+
+# Route planning: travel speed and time per stop for ETAs, and the time
+# budget for improving one agent's route
+ROUTE_SPEED_KMH = 20.0
+ROUTE_STOP_MINUTES = 3.0
+ROUTE_TIME_BUDGET_MS = 200
+
+# Order archival (`manage.py archive_orders`): finished orders older than this
+# move to the archive tables; list reads with ?created_after= before the
+# horizon also read the archive
+ORDER_ARCHIVE_AFTER_DAYS = config('ORDER_ARCHIVE_AFTER_DAYS', default=180, cast=int)
+ORDER_ARCHIVE_BATCH_SIZE = 500
@@ -1,8 +1,9 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
 from django.http import JsonResponse
+from monitoring.views import metrics_view
+from mediastore.views import serve_immutable, serve_media, serve_static
 
 def api_root(request):
     return JsonResponse({
@@ -12,6 +13,7 @@ def api_root(request):
             'auth': '/api/auth/',
             'shops': '/api/shops/',
             'orders': '/api/orders/',
+            'monitoring': '/api/monitoring/',
             'admin': '/admin/',
         }
     })
@@ -20,12 +22,13 @@ urlpatterns = [
     path('', api_root, name='api_root'),
     path('api/', api_root, name='api_index'),
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
     path('api/auth/', include('accounts.urls')),
     path('api/shops/', include('shops.urls')),
     path('api/orders/', include('orders.urls')),
-]
-
-# Serve media files in development
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-    urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file
+    path('api/monitoring/', include('monitoring.urls')),
+    # Content-addressed media never changes under the same URL
+    re_path(r'^%s(?P<path>(?:blobs|variants)/.+)$' % settings.MEDIA_URL.lstrip('/'), serve_immutable, name='immutable_media'),
+    re_path(r'^%s(?P<path>.+)$' % settings.MEDIA_URL.lstrip('/'), serve_media, name='media'),
+    re_path(r'^%s(?P<path>.+)$' % settings.STATIC_URL.lstrip('/'), serve_static, name='static'),
+]
\ No newline at end of file
@@ -1,7 +1,9 @@
 from django.contrib import admin
+from django.db import transaction
+from .leaderboard import forget_orders
 from .models import (
     Cart, CartItem, Order, OrderItem, OrderTracking, 
-    DeliveryAgent, Delivery, Coupon, CouponUsage
+    DeliveryAgent, Delivery, Coupon, CouponUsage, ArchivedOrder
 )
 
 class CartItemInline(admin.TabularInline):
@@ -30,11 +32,22 @@ class OrderAdmin(admin.ModelAdmin):
     inlines = [OrderItemInline, OrderTrackingInline]
     readonly_fields = ('order_id', 'order_number')
 
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            forget_orders(Order.objects.filter(pk=obj.pk))
+            obj.delete()
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            forget_orders(queryset)
+            queryset.delete()
+
 @admin.register(Coupon)
 class CouponAdmin(admin.ModelAdmin):
-    list_display = ('code', 'name', 'coupon_type', 'discount_value', 'valid_from', 'valid_until', 'is_active')
+    list_display = ('code', 'name', 'coupon_type', 'discount_value', 'times_used', 'usage_limit', 'valid_from', 'valid_until', 'is_active')
     list_filter = ('coupon_type', 'is_active', 'valid_from', 'valid_until')
     search_fields = ('code', 'name')
+    readonly_fields = ('times_used',)
     filter_horizontal = ('applicable_shops',)
 
 @admin.register(DeliveryAgent)
@@ -47,4 +60,15 @@ class DeliveryAgentAdmin(admin.ModelAdmin):
 class DeliveryAdmin(admin.ModelAdmin):
     list_display = ('order', 'delivery_agent', 'status', 'pickup_time', 'delivery_time')
     list_filter = ('status', 'pickup_time', 'delivery_time')
-    search_fields = ('order__order_number', 'delivery_agent__user__username')
\ No newline at end of file
+    search_fields = ('order__order_number', 'delivery_agent__user__username')
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    list_display = ('order_number', 'customer', 'shop', 'status', 'total_amount', 'created_at', 'archived_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('order_number', 'customer__username', 'shop__name')
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
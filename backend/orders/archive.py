@@ -0,0 +1,145 @@
+from datetime import datetime, time, timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import BooleanField, Count, F, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .leaderboard import keeping_totals
+from .models import (
+    ArchivedOrder, ArchivedOrderItem, ArchivedOrderTracking,
+    CouponUsage, Order, OrderItem, OrderTracking
+)
+
+ARCHIVE_AFTER_DAYS = getattr(settings, 'ORDER_ARCHIVE_AFTER_DAYS', 180)
+ARCHIVE_BATCH_SIZE = getattr(settings, 'ORDER_ARCHIVE_BATCH_SIZE', 500)
+ARCHIVABLE_STATUSES = ('delivered', 'cancelled', 'refunded')
+
+# Columns copied verbatim from Order to ArchivedOrder
+ORDER_COLUMNS = [field.attname for field in Order._meta.concrete_fields]
+HISTORY_COLUMNS = (
+    'id', 'order_id', 'order_number', 'customer', 'shop', 'status', 'payment_status', 'payment_method',
+    'subtotal', 'delivery_fee', 'discount_amount', 'total_amount', 'status_changed_at',
+    'estimated_delivery_time', 'created_at', 'customer_name', 'shop_name', 'items_count', 'archived',
+)
+
+
+def archive_cutoff(now=None):
+    return (now or timezone.now()) - timedelta(days=ARCHIVE_AFTER_DAYS)
+
+
+def archive_batch(cutoff, batch_size=ARCHIVE_BATCH_SIZE):
+    """
+    Move one batch of finished orders created before cutoff, with their
+    items and tracking, into the archive tables. Returns how many moved.
+    Runs in one transaction, so a row never exists in both tables or in
+    neither.
+    """
+    with transaction.atomic():
+        ids = list(Order.objects.select_for_update()
+                   .filter(status__in=ARCHIVABLE_STATUSES, created_at__lt=cutoff)
+                   .order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return 0
+
+        coupon_codes = dict(CouponUsage.objects.filter(order_id__in=ids).values_list('order_id', 'coupon__code'))
+        ArchivedOrder.objects.bulk_create([
+            ArchivedOrder(coupon_code=coupon_codes.get(row['id'], ''), **row)
+            for row in Order.objects.filter(id__in=ids).values(*ORDER_COLUMNS)
+        ])
+        ArchivedOrderItem.objects.bulk_create([
+            ArchivedOrderItem(id=item_id, order_id=order_id, product_id=product_id, product_name=product_name or '',
+                              quantity=quantity, unit_price=unit_price, subtotal=subtotal)
+            for item_id, order_id, product_id, product_name, quantity, unit_price, subtotal in
+            OrderItem.objects.filter(order_id__in=ids).values_list(
+                'id', 'order_id', 'product_id', 'product__name', 'quantity', 'unit_price', 'subtotal')
+        ])
+        ArchivedOrderTracking.objects.bulk_create([
+            ArchivedOrderTracking(**row)
+            for row in OrderTracking.objects.filter(order_id__in=ids).values(
+                'id', 'order_id', 'status', 'message', 'created_at', 'created_by_id')
+        ])
+        # Cascades to items, tracking, deliveries and coupon usage rows. Coupon
+        # limits are unaffected because they use the counters on Coupon.
+        with keeping_totals():
+            Order.objects.filter(id__in=ids).delete()
+    return len(ids)
+
+
+def archive_orders(cutoff=None, batch_size=ARCHIVE_BATCH_SIZE, max_batches=None):
+    """Archive batch after batch until nothing old is left; returns the total moved"""
+    cutoff = cutoff or archive_cutoff()
+    total, batches = 0, 0
+    while max_batches is None or batches < max_batches:
+        moved = archive_batch(cutoff, batch_size)
+        if not moved:
+            break
+        total += moved
+        batches += 1
+    return total
+
+
+def parse_date_range(params):
+    """created_after/created_before (YYYY-MM-DD) as aware datetimes; raises ValueError"""
+    bounds = []
+    for name, day_time in (('created_after', time.min), ('created_before', time.max)):
+        value = params.get(name)
+        if value:
+            try:
+                day = datetime.strptime(value, '%Y-%m-%d').date()
+            except ValueError:
+                raise ValueError(f'{name} must be YYYY-MM-DD')
+            bounds.append(timezone.make_aware(datetime.combine(day, day_time)))
+        else:
+            bounds.append(None)
+    return tuple(bounds)
+
+
+def filter_date_range(queryset, start, end):
+    if start is not None:
+        queryset = queryset.filter(created_at__gte=start)
+    if end is not None:
+        queryset = queryset.filter(created_at__lte=end)
+    return queryset
+
+
+def newest_archived():
+    """
+    created_at of the newest archived order, None while the archive is
+    empty. One seek on the created_at index; not cached, because the
+    archive command runs in its own process and could not clear a
+    per-process cache.
+    """
+    return ArchivedOrder.objects.aggregate(newest=Max('created_at'))['newest']
+
+
+def needs_archive(start):
+    """
+    Only ranges reaching back to the newest archived order have to read the
+    archive. Going by what was actually archived rather than the configured
+    age keeps `archive_orders --days` with a shorter age correct.
+    """
+    if start is None:
+        return False
+    newest = newest_archived()
+    return newest is not None and start <= newest
+
+
+def _history_rows(queryset, item_model, archived):
+    items_count = (item_model.objects.filter(order=OuterRef('pk')).order_by()
+                   .values('order').annotate(count=Count('id')).values('count'))
+    return queryset.annotate(
+        customer_name=F('customer__username'),
+        shop_name=F('shop__name'),
+        items_count=Coalesce(Subquery(items_count), 0),
+        archived=Value(archived, output_field=BooleanField()),
+    ).values(*HISTORY_COLUMNS)
+
+
+def order_history(hot, archived, start, end):
+    """
+    List rows from the hot and archive tables in one UNION query, newest
+    first. Both querysets must already be scoped to what the user may see.
+    """
+    hot = _history_rows(filter_date_range(hot, start, end).order_by(), OrderItem, False)
+    archived = _history_rows(filter_date_range(archived, start, end).order_by(), ArchivedOrderItem, True)
+    return hot.union(archived, all=True).order_by('-created_at')
@@ -0,0 +1,83 @@
+from decimal import Decimal
+from django.db import transaction
+from django.utils import timezone
+from shops.models import Product
+from .models import Cart, CartItem
+
+
+class CartBatchError(Exception):
+    pass
+
+
+def _final_quantities(current, operations):
+    """Replay the operations in order over {product_id: quantity}"""
+    quantities = dict(current)
+    for operation in operations:
+        product_id = operation['product_id']
+        if operation['op'] == 'add':
+            quantities[product_id] = quantities.get(product_id, 0) + operation.get('quantity', 1)
+        elif operation['op'] == 'set':
+            quantities[product_id] = operation['quantity']
+        else:
+            quantities[product_id] = 0
+    return quantities
+
+
+def apply_cart_operations(user, operations):
+    """
+    Apply add/set/remove operations to the user's cart in one transaction:
+    one read of the affected lines, then at most one bulk insert, one bulk
+    update and one delete. A set to 0 removes the line. Returns the diff
+    against the cart as it was, keyed by product id.
+    """
+    product_ids = {operation['product_id'] for operation in operations}
+    with transaction.atomic():
+        # Locking the cart row serialises concurrent batches on the same cart
+        cart, _ = Cart.objects.select_for_update().get_or_create(customer=user)
+        existing = {item.product_id: item for item in
+                    CartItem.objects.select_for_update().filter(cart=cart, product_id__in=product_ids)}
+        quantities = _final_quantities({pid: item.quantity for pid, item in existing.items()}, operations)
+
+        adding = {pid for pid, quantity in quantities.items() if quantity > 0 and pid not in existing}
+        available = set(Product.objects.filter(id__in=adding, status='available').values_list('id', flat=True))
+        missing = sorted(adding - available)
+        if missing:
+            raise CartBatchError(f"Products not available: {', '.join(map(str, missing))}")
+
+        now = timezone.now()
+        created = CartItem.objects.bulk_create([
+            CartItem(cart=cart, product_id=pid, quantity=quantities[pid]) for pid in sorted(adding)
+        ])
+        updated = []
+        for pid, item in existing.items():
+            if 0 < quantities[pid] != item.quantity:
+                item.quantity = quantities[pid]
+                item.updated_at = now
+                updated.append(item)
+        CartItem.objects.bulk_update(updated, ['quantity', 'updated_at'])
+        removed = [pid for pid, item in existing.items() if quantities[pid] == 0]
+        if removed:
+            CartItem.objects.filter(cart=cart, product_id__in=removed).delete()
+        if created or updated or removed:
+            Cart.objects.filter(pk=cart.pk).update(updated_at=now)
+
+    return {
+        'added': [{'product_id': item.product_id, 'cart_item_id': item.id, 'quantity': item.quantity}
+                  for item in created],
+        'updated': [{'product_id': item.product_id, 'cart_item_id': item.id, 'quantity': item.quantity}
+                    for item in updated],
+        'removed': sorted(removed),
+        **cart_totals(cart),
+    }
+
+
+def cart_totals(cart):
+    """Line count, item count and amount from one narrow query"""
+    rows = cart.items.values_list('quantity', 'product__price', 'product__discount_price')
+    total_items, total_amount, lines = 0, Decimal('0'), 0
+    for quantity, price, discount_price in rows:
+        unit_price = discount_price if discount_price is not None and discount_price < price else price
+        total_items += quantity
+        total_amount += quantity * unit_price
+        lines += 1
+    return {'lines': lines, 'total_items': total_items, 'total_amount': total_amount}
@@ -0,0 +1,124 @@
+from decimal import Decimal
+from shops.models import Product
+from .coupons import apply_coupon, redeem_coupon
+from .delivery import geocode
+from .leaderboard import record_order
+from .models import CartItem, Order, OrderItem, OrderTracking
+from .state import initial_state
+
+
+def delivery_coordinates(data):
+    """Checkout coordinates: sent by the client, or geocoded from the address"""
+    if 'delivery_latitude' in data:
+        return data['delivery_latitude'], data['delivery_longitude']
+    return geocode(data['delivery_address'])
+
+
+def place_orders(user, items, data, quote):
+    """
+    Create one order per shop for the given cart lines (product and shop
+    loaded) from validated checkout data and a deliverable quote. Call inside
+    a transaction; raises CouponError when the coupon does not apply.
+    """
+    shop_quotes = {shop['shop_id']: shop for shop in quote['shops']}
+
+    # The coupon goes on the one shop order it is worth most on
+    coupon, coupon_shop_id, coupon_discount = None, None, Decimal('0.00')
+    if data.get('coupon_code', '').strip():
+        coupon, coupon_shop_id, coupon_discount = apply_coupon(data['coupon_code'], quote['shops'])
+
+    # Group cart items by shop
+    shops_orders = {}
+    for item in items:
+        shop_id = item.product.shop.id
+        if shop_id not in shops_orders:
+            shops_orders[shop_id] = {
+                'shop': item.product.shop,
+                'items': []
+            }
+        shops_orders[shop_id]['items'].append(item)
+
+    created_orders = []
+
+    # Create separate orders for each shop
+    for shop_data in shops_orders.values():
+        shop = shop_data['shop']
+        items = shop_data['items']
+
+        # Calculate totals
+        subtotal = sum(item.subtotal for item in items)
+        shop_quote = shop_quotes[shop.id]
+        delivery_fee = shop_quote['delivery_fee']
+        discount_amount = coupon_discount if shop.id == coupon_shop_id else Decimal('0.00')
+        total_amount = subtotal + delivery_fee - discount_amount
+
+        # Create order
+        order = Order.objects.create(
+            customer=user,
+            shop=shop,
+            subtotal=subtotal,
+            delivery_fee=delivery_fee,
+            discount_amount=discount_amount,
+            total_amount=total_amount,
+            delivery_address=data['delivery_address'],
+            delivery_phone=data['delivery_phone'],
+            delivery_instructions=data.get('delivery_instructions', ''),
+            delivery_latitude=quote['latitude'],
+            delivery_longitude=quote['longitude'],
+            delivery_distance_km=shop_quote['distance_km'],
+            payment_method=data['payment_method'],
+            special_instructions=data.get('special_instructions', ''),
+            **initial_state(user)
+        )
+
+        # Create order items
+        order_items = OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                product=item.product,
+                quantity=item.quantity,
+                unit_price=item.product.final_price,
+                subtotal=item.subtotal
+            )
+            for item in items
+        ])
+        record_order(order, order_items)
+
+        if shop.id == coupon_shop_id:
+            redeem_coupon(coupon, user, order, discount_amount)
+
+        # Create initial tracking
+        OrderTracking.objects.create(
+            order=order,
+            status='pending',
+            message='Order placed successfully',
+            created_by=user
+        )
+
+        created_orders.append(order)
+
+    return created_orders
+
+
+def reorder_lines(order):
+    """
+    Lines of an earlier order priced as of now. Every product is checked
+    for availability and current price with one query. Returns unsaved
+    CartItems for what can be bought again, plus what is unavailable and
+    what changed price since the order.
+    """
+    lines = list(order.items.values_list('product_id', 'product__name', 'quantity', 'unit_price'))
+    products = Product.objects.filter(id__in=[line[0] for line in lines], status='available').select_related('shop')
+    products = {product.id: product for product in products}
+
+    items, unavailable, price_changes = [], [], []
+    for product_id, name, quantity, unit_price in lines:
+        product = products.get(product_id)
+        if product is None:
+            unavailable.append({'product_id': product_id, 'product_name': name})
+            continue
+        if product.final_price != unit_price:
+            price_changes.append({'product_id': product_id, 'product_name': name,
+                                  'old_price': unit_price, 'new_price': product.final_price})
+        items.append(CartItem(product=product, quantity=quantity))
+    return items, unavailable, price_changes
@@ -0,0 +1,138 @@
+import threading
+import time
+from decimal import Decimal, ROUND_HALF_UP
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import Coupon, CouponCustomerUsage, CouponUsage
+
+CACHE_TTL = getattr(settings, 'COUPON_CACHE_TTL', 60)
+CENTS = Decimal('0.01')
+
+
+class CouponError(Exception):
+    pass
+
+
+class CouponCache:
+    """
+    Process-local cache of active coupons keyed by code. An entry lives for
+    CACHE_TTL seconds or until the coupon expires, whichever comes first.
+    Unknown codes are cached too, so guessing codes does not hit the
+    database. Usage counters are never cached; redemption checks them in
+    the database.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = {}
+
+    def get(self, code):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(code)
+            if entry is not None and entry[1] > now:
+                return entry[0]
+
+        coupon = (Coupon.objects.filter(code=code, is_active=True)
+                  .prefetch_related('applicable_shops').first())
+        lifetime = self.ttl
+        if coupon is not None:
+            coupon.shop_ids = frozenset(shop.id for shop in coupon.applicable_shops.all())
+            lifetime = min(lifetime, max((coupon.valid_until - timezone.now()).total_seconds(), 0))
+
+        with self.lock:
+            self._evict_expired(now)
+            self.entries[code] = (coupon, now + lifetime)
+        return coupon
+
+    def _evict_expired(self, now):
+        expired = [code for code, (_, expires_at) in self.entries.items() if expires_at <= now]
+        for code in expired:
+            del self.entries[code]
+
+    def invalidate(self, code=None):
+        with self.lock:
+            if code is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(code, None)
+
+
+coupon_cache = CouponCache(CACHE_TTL)
+
+
+def calculate_discount(coupon, subtotal, delivery_fee):
+    if coupon.coupon_type == 'percentage':
+        discount = (subtotal * coupon.discount_value / 100).quantize(CENTS, rounding=ROUND_HALF_UP)
+    elif coupon.coupon_type == 'fixed_amount':
+        discount = coupon.discount_value
+    else:
+        discount = delivery_fee
+    if coupon.maximum_discount_amount is not None:
+        discount = min(discount, coupon.maximum_discount_amount)
+    return min(discount, subtotal + delivery_fee)
+
+
+def check_coupon(coupon, shop_id, subtotal, delivery_fee, now=None):
+    """Return the discount for one shop order, or raise CouponError"""
+    now = now or timezone.now()
+    if now < coupon.valid_from:
+        raise CouponError('This coupon is not valid yet')
+    if now > coupon.valid_until:
+        raise CouponError('This coupon has expired')
+    if coupon.shop_ids and shop_id not in coupon.shop_ids:
+        raise CouponError('This coupon is not valid for the shops in your cart')
+    if subtotal < coupon.minimum_order_amount:
+        raise CouponError(f'This coupon needs a minimum order of {coupon.minimum_order_amount}')
+    return calculate_discount(coupon, subtotal, delivery_fee)
+
+
+def apply_coupon(code, shop_quotes):
+    """
+    Pick the shop order the coupon is worth most on. shop_quotes are the
+    per-shop entries of a delivery quote. Returns (coupon, shop_id, discount).
+    """
+    coupon = coupon_cache.get(code.strip())
+    if coupon is None:
+        raise CouponError('Invalid coupon code')
+
+    now = timezone.now()
+    best, first_error = None, None
+    for shop in shop_quotes:
+        try:
+            discount = check_coupon(coupon, shop['shop_id'], shop['subtotal'], shop['delivery_fee'], now)
+        except CouponError as e:
+            first_error = first_error or e
+            continue
+        if best is None or discount > best[1]:
+            best = (shop['shop_id'], discount)
+    if best is None:
+        raise first_error or CouponError('This coupon cannot be applied to your cart')
+    return coupon, best[0], best[1]
+
+
+def redeem_coupon(coupon, customer, order, discount):
+    """
+    Claim one use of the coupon for this order. The per-customer and global
+    counters are bumped with conditional UPDATEs. A concurrent redemption
+    can therefore never push either counter past its limit. Must run inside
+    the caller's transaction so a failed checkout gives the use back.
+    """
+    with transaction.atomic():
+        counter, created = CouponCustomerUsage.objects.get_or_create(coupon_id=coupon.pk, customer=customer)
+        claimed = (CouponCustomerUsage.objects
+                   .filter(pk=counter.pk, times_used__lt=coupon.usage_limit_per_customer)
+                   .update(times_used=F('times_used') + 1))
+        if not claimed:
+            raise CouponError('You have already used this coupon the maximum number of times')
+
+        claimed = (Coupon.objects
+                   .filter(Q(usage_limit__isnull=True) | Q(times_used__lt=F('usage_limit')), pk=coupon.pk, is_active=True)
+                   .update(times_used=F('times_used') + 1))
+        if not claimed:
+            raise CouponError('This coupon has reached its usage limit')
+
+        return CouponUsage.objects.create(coupon_id=coupon.pk, customer=customer, order=order, discount_amount=discount)
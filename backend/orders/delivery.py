@@ -0,0 +1,114 @@
+import hashlib
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Sum
+from django.utils.module_loading import import_string
+from shops.geo import haversine
+
+QUOTE_TTL = getattr(settings, 'DELIVERY_QUOTE_TTL', 300)
+
+
+class DeliveryQuoteError(Exception):
+    pass
+
+
+def geocode(address):
+    """Resolve an address through the optional DELIVERY_GEOCODER callable"""
+    geocoder_path = getattr(settings, 'DELIVERY_GEOCODER', None)
+    if not geocoder_path or not address:
+        return None
+    return import_string(geocoder_path)(address)
+
+
+def parse_coordinates(latitude, longitude):
+    if latitude in (None, '') and longitude in (None, ''):
+        return None
+    try:
+        latitude, longitude = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        raise DeliveryQuoteError('Invalid coordinates')
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise DeliveryQuoteError('Invalid coordinates')
+    return latitude, longitude
+
+
+def cart_version(cart):
+    """Fingerprint of everything a quote depends on, read with one aggregate query"""
+    state = cart.items.aggregate(
+        lines=Count('id'),
+        quantity=Sum('quantity'),
+        items_changed=Max('updated_at'),
+        products_changed=Max('product__updated_at'),
+        shops_changed=Max('product__shop__updated_at'),
+    )
+    raw = '|'.join(str(state[key]) for key in sorted(state))
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+
+def _quote_key(cart, version, coordinates):
+    location = 'none' if coordinates is None else f'{coordinates[0]:.5f},{coordinates[1]:.5f}'
+    return f'delivery_quote:{cart.id}:{version}:{location}'
+
+
+def build_quote(items, coordinates):
+    """Price delivery for every shop in the cart; items need product and shop loaded"""
+    shops = {}
+    for item in items:
+        shop = item.product.shop
+        entry = shops.setdefault(shop.id, {'shop': shop, 'subtotal': Decimal('0.00')})
+        entry['subtotal'] += item.subtotal
+
+    quoted = []
+    for entry in shops.values():
+        shop = entry['shop']
+        subtotal = entry['subtotal']
+        errors = []
+        distance = None
+        if coordinates is not None and shop.latitude is not None and shop.longitude is not None:
+            distance = haversine(coordinates[1], coordinates[0], shop.longitude, shop.latitude)
+
+        if not shop.offers_delivery:
+            errors.append('Shop does not offer delivery')
+        if distance is not None and distance > float(shop.delivery_radius):
+            errors.append(f'Address is {distance:.1f} km away; {shop.name} delivers within {shop.delivery_radius} km')
+        if subtotal < shop.minimum_order_amount:
+            errors.append(f'Minimum order for {shop.name} is {shop.minimum_order_amount}')
+
+        fee = Decimal(str(shop.calculate_delivery_fee(distance or 0.0, float(subtotal))))
+        quoted.append({
+            'shop_id': shop.id,
+            'shop_name': shop.name,
+            'subtotal': subtotal,
+            'distance_km': round(distance, 2) if distance is not None else None,
+            'delivery_fee': fee,
+            'free_delivery': bool(shop.free_delivery_above) and subtotal >= shop.free_delivery_above,
+            'deliverable': not errors,
+            'errors': errors,
+        })
+
+    subtotal = sum((shop['subtotal'] for shop in quoted), Decimal('0.00'))
+    delivery_fee = sum((shop['delivery_fee'] for shop in quoted), Decimal('0.00'))
+    return {
+        'latitude': coordinates[0] if coordinates else None,
+        'longitude': coordinates[1] if coordinates else None,
+        'shops': quoted,
+        'subtotal': subtotal,
+        'delivery_fee': delivery_fee,
+        'total': subtotal + delivery_fee,
+        'deliverable': all(shop['deliverable'] for shop in quoted),
+    }
+
+
+def get_cart_quote(cart, coordinates, items=None):
+    """Return the cached quote for this cart version and location, computing it on a miss"""
+    version = cart_version(cart)
+    key = _quote_key(cart, version, coordinates)
+    quote = cache.get(key)
+    if quote is None:
+        if items is None:
+            items = cart.items.select_related('product__shop')
+        quote = build_quote(items, coordinates)
+        quote['cart_version'] = version
+        cache.set(key, quote, QUOTE_TTL)
+    return quote
@@ -0,0 +1,287 @@
+import math
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from monitoring import metrics
+from shops.geo import haversine
+from .models import Delivery, DeliveryAgent, Order
+
+CELL_KM = getattr(settings, 'DISPATCH_CELL_KM', 1.0)
+FLUSH_INTERVAL = getattr(settings, 'DISPATCH_FLUSH_INTERVAL', 5.0)
+FLUSH_SIZE = getattr(settings, 'DISPATCH_FLUSH_SIZE', 200)
+REFRESH_INTERVAL = getattr(settings, 'DISPATCH_INDEX_REFRESH', 10.0)
+MAX_PICKUP_KM = getattr(settings, 'DISPATCH_MAX_PICKUP_KM', 10.0)
+AGENT_CAPACITY = getattr(settings, 'DISPATCH_AGENT_CAPACITY', 3)
+BATCH_SIZE = getattr(settings, 'DISPATCH_BATCH_SIZE', 100)
+CANDIDATES_PER_ORDER = 10
+ACTIVE_DELIVERY_STATUSES = ('assigned', 'picked_up', 'in_transit')
+KM_PER_DEGREE = 111.0
+
+
+def _coordinate(value):
+    return Decimal(f'{value:.6f}')
+
+
+def _ring(center, radius):
+    """Grid cells exactly `radius` steps away from center"""
+    if radius == 0:
+        return [center]
+    row, col = center
+    cells = []
+    for offset in range(-radius, radius + 1):
+        cells.extend(((row - radius, col + offset), (row + radius, col + offset)))
+    for offset in range(-radius + 1, radius):
+        cells.extend(((row + offset, col - radius), (row + offset, col + radius)))
+    return cells
+
+
+class AgentIndex:
+    """
+    In-memory grid of agent positions. Location pings update the grid at
+    once and are written to DeliveryAgent in batches (every FLUSH_SIZE
+    pings or FLUSH_INTERVAL seconds). Each worker process pulls the
+    positions flushed by other workers every REFRESH_INTERVAL seconds.
+    """
+
+    def __init__(self, cell_km):
+        self.cell_deg = cell_km / KM_PER_DEGREE
+        self.lock = threading.Lock()
+        self.cells = defaultdict(set)
+        self.positions = {}  # agent id -> (lat, lng, cell)
+        self.pending = {}  # agent id -> (lat, lng) not yet written to the database
+        self.agent_ids = {}  # user id -> agent id
+        self.last_flush = time.monotonic()
+        self.last_refresh = None
+        self.synced_at = None
+
+    def _cell(self, lat, lng):
+        return math.floor(lat / self.cell_deg), math.floor(lng / self.cell_deg)
+
+    def _place(self, agent_id, lat, lng):
+        cell = self._cell(lat, lng)
+        previous = self.positions.get(agent_id)
+        if previous is not None and previous[2] != cell:
+            self.cells[previous[2]].discard(agent_id)
+            if not self.cells[previous[2]]:
+                del self.cells[previous[2]]
+        self.cells[cell].add(agent_id)
+        self.positions[agent_id] = (lat, lng, cell)
+
+    def agent_for_user(self, user):
+        agent_id = self.agent_ids.get(user.id)
+        if agent_id is None:
+            agent_id = DeliveryAgent.objects.filter(user=user).values_list('id', flat=True).first()
+            if agent_id is not None:
+                self.agent_ids[user.id] = agent_id
+        return agent_id
+
+    def update(self, agent_id, lat, lng):
+        with self.lock:
+            self._place(agent_id, lat, lng)
+            self.pending[agent_id] = (lat, lng)
+            due = len(self.pending) >= FLUSH_SIZE or time.monotonic() - self.last_flush >= FLUSH_INTERVAL
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Write buffered positions with one bulk UPDATE; returns how many were written"""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.last_flush = time.monotonic()
+        if not pending:
+            return 0
+        now = timezone.now()
+        try:
+            DeliveryAgent.objects.bulk_update([
+                DeliveryAgent(id=agent_id, current_latitude=_coordinate(lat), current_longitude=_coordinate(lng),
+                              location_updated_at=now)
+                for agent_id, (lat, lng) in pending.items()
+            ], ['current_latitude', 'current_longitude', 'location_updated_at'], batch_size=500)
+        except Exception:
+            # Keep the positions for the next flush unless a newer ping arrived meanwhile
+            with self.lock:
+                for agent_id, position in pending.items():
+                    self.pending.setdefault(agent_id, position)
+            raise
+        return len(pending)
+
+    def refresh(self, force=False):
+        """Flush local pings, then load positions other processes wrote since the last refresh"""
+        if not force and self.last_refresh is not None and time.monotonic() - self.last_refresh < REFRESH_INTERVAL:
+            return
+        self.flush()
+        started = timezone.now()
+        queryset = DeliveryAgent.objects.filter(current_latitude__isnull=False, current_longitude__isnull=False)
+        if self.synced_at is not None:
+            # Overlap a little so rows committed just after the last refresh are not missed
+            queryset = queryset.filter(location_updated_at__gte=self.synced_at - timedelta(seconds=FLUSH_INTERVAL))
+        rows = list(queryset.values_list('id', 'current_latitude', 'current_longitude'))
+        with self.lock:
+            for agent_id, lat, lng in rows:
+                if agent_id not in self.pending:
+                    self._place(agent_id, float(lat), float(lng))
+            self.synced_at = started
+            self.last_refresh = time.monotonic()
+
+    def nearest(self, lat, lng, max_km):
+        """Agents within max_km of the point as (distance_km, agent_id), closest first"""
+        # Longitude cells are the narrow side away from the equator
+        cell_km = self.cell_deg * KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01)
+        center = self._cell(lat, lng)
+        found = []
+        with self.lock:
+            for radius in range(int(max_km / cell_km) + 2):
+                for cell in _ring(center, radius):
+                    for agent_id in self.cells.get(cell, ()):
+                        agent_lat, agent_lng, _ = self.positions[agent_id]
+                        distance = haversine(lng, lat, agent_lng, agent_lat)
+                        if distance <= max_km:
+                            found.append((distance, agent_id))
+        found.sort()
+        return found
+
+
+agent_index = AgentIndex(CELL_KM)
+
+
+def free_slots(agent_ids):
+    """Spare delivery capacity of each available agent among agent_ids"""
+    rows = (DeliveryAgent.objects.filter(id__in=agent_ids, is_available=True)
+            .annotate(active=Count('deliveries', filter=Q(deliveries__status__in=ACTIVE_DELIVERY_STATUSES)))
+            .values_list('id', 'active'))
+    return {agent_id: AGENT_CAPACITY - active for agent_id, active in rows if active < AGENT_CAPACITY}
+
+
+def _claim(order, agent_id):
+    """Create the Delivery if the agent still has a free slot; the agent row lock serialises claims"""
+    try:
+        with transaction.atomic():
+            agent = DeliveryAgent.objects.select_for_update().filter(id=agent_id, is_available=True).first()
+            if agent is None:
+                return None
+            active = agent.deliveries.filter(status__in=ACTIVE_DELIVERY_STATUSES).count()
+            if active >= AGENT_CAPACITY:
+                return None
+            return Delivery.objects.create(order=order, delivery_agent=agent, status='assigned')
+    except IntegrityError:
+        # Another worker assigned this order first
+        return None
+
+
+def assign_nearest_agent(order):
+    """Give a ready order to the closest agent with a free slot; returns the Delivery or None"""
+    shop = order.shop
+    if shop.latitude is None or shop.longitude is None or Delivery.objects.filter(order=order).exists():
+        return None
+    agent_index.refresh()
+    candidates = agent_index.nearest(float(shop.latitude), float(shop.longitude), MAX_PICKUP_KM)
+    for start in range(0, len(candidates), CANDIDATES_PER_ORDER):
+        chunk = candidates[start:start + CANDIDATES_PER_ORDER]
+        slots = free_slots([agent_id for _, agent_id in chunk])
+        for distance, agent_id in chunk:
+            if agent_id in slots:
+                delivery = _claim(order, agent_id)
+                if delivery is not None:
+                    metrics.dispatch_assignments_total.inc(mode='nearest')
+                    metrics.dispatch_pickup_distance_km.observe(distance)
+                    return delivery
+    return None
+
+
+def min_cost_assignment(cost):
+    """
+    Hungarian algorithm (O(n^2 m)) for an n x m cost matrix with n <= m.
+    Returns the chosen column for each row.
+    """
+    n, m = len(cost), len(cost[0])
+    inf = float('inf')
+    u, v = [0.0] * (n + 1), [0.0] * (m + 1)
+    match, way = [0] * (m + 1), [0] * (m + 1)
+    for row in range(1, n + 1):
+        match[0] = row
+        col0 = 0
+        min_value = [inf] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[col0] = True
+            row0 = match[col0]
+            costs = cost[row0 - 1]
+            delta, col1 = inf, 0
+            for col in range(1, m + 1):
+                if not used[col]:
+                    current = costs[col - 1] - u[row0] - v[col]
+                    if current < min_value[col]:
+                        min_value[col] = current
+                        way[col] = col0
+                    if min_value[col] < delta:
+                        delta, col1 = min_value[col], col
+            for col in range(m + 1):
+                if used[col]:
+                    u[match[col]] += delta
+                    v[col] -= delta
+                else:
+                    min_value[col] -= delta
+            col0 = col1
+            if match[col0] == 0:
+                break
+        while col0:
+            col1 = way[col0]
+            match[col0] = match[col1]
+            col0 = col1
+
+    result = [None] * n
+    for col in range(1, m + 1):
+        if match[col]:
+            result[match[col] - 1] = col - 1
+    return result
+
+
+def assign_ready_orders(limit=BATCH_SIZE):
+    """
+    Assign all unassigned ready orders in one pass. The pairing minimises
+    the total pickup distance over every order and agent slot, not just
+    each order's own distance. Returns the created deliveries.
+    """
+    agent_index.refresh(force=True)
+    orders = list(Order.objects.filter(status='ready_for_pickup', delivery__isnull=True,
+                                       shop__latitude__isnull=False, shop__longitude__isnull=False)
+                  .select_related('shop').order_by('updated_at')[:limit])
+    if not orders:
+        return []
+
+    nearby = [agent_index.nearest(float(o.shop.latitude), float(o.shop.longitude), MAX_PICKUP_KM) for o in orders]
+    slots = free_slots({agent_id for candidates in nearby for _, agent_id in candidates})
+    distances = []
+    for candidates in nearby:
+        distances.append(dict([(agent_id, d) for d, agent_id in candidates if agent_id in slots][:CANDIDATES_PER_ORDER]))
+    agents = sorted({agent_id for row in distances for agent_id in row})
+    if not agents:
+        return []
+
+    # One column per free slot, so an agent near several ready shops can take more than one order
+    columns = [agent_id for agent_id in agents for _ in range(min(slots[agent_id], len(orders)))]
+    unreachable = MAX_PICKUP_KM * 1000
+    cost = [[row.get(agent_id, unreachable) for agent_id in columns] for row in distances]
+    if len(orders) <= len(columns):
+        pairs = enumerate(min_cost_assignment(cost))
+    else:
+        transposed = [list(col) for col in zip(*cost)]
+        pairs = ((row, col) for col, row in enumerate(min_cost_assignment(transposed)))
+
+    deliveries = []
+    for row, col in pairs:
+        distance = cost[row][col]
+        if distance >= unreachable:
+            continue
+        delivery = _claim(orders[row], columns[col])
+        if delivery is not None:
+            metrics.dispatch_assignments_total.inc(mode='batch')
+            metrics.dispatch_pickup_distance_km.observe(distance)
+            deliveries.append(delivery)
+    return deliveries
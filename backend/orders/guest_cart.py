@@ -0,0 +1,112 @@
+import uuid
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from shops.models import Product
+from .models import Cart, CartItem
+
+GUEST_CART_TTL = getattr(settings, 'GUEST_CART_TTL', 7 * 24 * 3600)
+GUEST_CART_MAX_LINES = getattr(settings, 'GUEST_CART_MAX_LINES', 100)
+TOKEN_SALT = 'orders.guest_cart'
+
+
+class GuestCartError(Exception):
+    pass
+
+
+def new_token():
+    """Signed, opaque id for a cart that lives only in the cache"""
+    return signing.dumps(uuid.uuid4().hex, salt=TOKEN_SALT)
+
+
+def _cache_key(token):
+    try:
+        cart_id = signing.loads(token, salt=TOKEN_SALT)
+    except signing.BadSignature:
+        raise GuestCartError('Invalid cart token')
+    return f'guest_cart:{cart_id}'
+
+
+def load(token):
+    """{product_id: quantity} for the token; empty once the cache entry expired"""
+    return cache.get(_cache_key(token)) or {}
+
+
+def save(token, items):
+    key = _cache_key(token)
+    if items:
+        cache.set(key, items, GUEST_CART_TTL)
+    else:
+        cache.delete(key)
+
+
+def apply_updates(items, updates):
+    """
+    Set the quantity of several products at once; quantity 0 removes the
+    line. Every product being added is checked with one query. Returns the
+    new {product_id: quantity} without touching the cache.
+    """
+    items = dict(items)
+    wanted = {update['product_id']: update['quantity'] for update in updates}
+    adding = [product_id for product_id, quantity in wanted.items() if quantity > 0]
+    available = set(Product.objects.filter(id__in=adding, status='available').values_list('id', flat=True))
+    missing = sorted(set(adding) - available)
+    if missing:
+        raise GuestCartError(f"Products not available: {', '.join(map(str, missing))}")
+
+    for product_id, quantity in wanted.items():
+        if quantity > 0:
+            items[product_id] = quantity
+        else:
+            items.pop(product_id, None)
+    if len(items) > GUEST_CART_MAX_LINES:
+        raise GuestCartError(f'A cart can hold at most {GUEST_CART_MAX_LINES} different products')
+    return items
+
+
+def cart_contents(items):
+    """Cart lines with their products, shaped like the database cart"""
+    products = (Product.objects.filter(id__in=items, status='available')
+                .select_related('shop', 'category').prefetch_related('images'))
+    lines = [{'product': product, 'quantity': items[product.id], 'subtotal': product.final_price * items[product.id]}
+             for product in products]
+    return {
+        'items': lines,
+        'total_items': sum(line['quantity'] for line in lines),
+        'total_amount': sum(line['subtotal'] for line in lines),
+    }
+
+
+def merge_guest_cart(user, token):
+    """
+    Move a guest cart into the user's database cart: quantities add to lines
+    already there, everything in one bulk update and one bulk insert.
+    The cache entry is deleted first so a cart is merged at most once even
+    if login and checkout race; it is put back if the write fails.
+    Returns the number of lines merged.
+    """
+    key = _cache_key(token)
+    items = cache.get(key)
+    if not items or not cache.delete(key):
+        return 0
+
+    try:
+        with transaction.atomic():
+            cart, _ = Cart.objects.get_or_create(customer=user)
+            available = set(Product.objects.filter(id__in=items, status='available').values_list('id', flat=True))
+            existing = {item.product_id: item for item in cart.items.filter(product_id__in=available)}
+            now = timezone.now()
+            for product_id, item in existing.items():
+                item.quantity += items[product_id]
+                item.updated_at = now
+            CartItem.objects.bulk_update(existing.values(), ['quantity', 'updated_at'])
+            CartItem.objects.bulk_create([
+                CartItem(cart=cart, product_id=product_id, quantity=items[product_id])
+                for product_id in available - existing.keys()
+            ])
+    except Exception:
+        cache.set(key, items, GUEST_CART_TTL)
+        raise
+    return len(available)
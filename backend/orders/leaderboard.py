@@ -0,0 +1,176 @@
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, F, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from shops.models import Product, Shop
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem, ProductSalesDay, ShopSalesDay
+
+# Window name -> days back from today (inclusive), None for all time
+WINDOWS = {'today': 1, '7d': 7, '30d': 30, 'all': None}
+TOP_K = 5
+CACHE_TTL = getattr(settings, 'LEADERBOARD_CACHE_TTL', 60)
+
+_state = threading.local()
+
+
+def _add(model, key_field, day, deltas):
+    """
+    Add {key: {field: delta}} to one day's rollup rows: missing rows are
+    inserted empty, then every row is incremented by one UPDATE with a CASE
+    per field, so the cost does not grow with the number of keys.
+    """
+    if not deltas:
+        return
+    model.objects.bulk_create([model(**{key_field: key, 'day': day}) for key in deltas], ignore_conflicts=True)
+    fields = next(iter(deltas.values())).keys()
+    changes = {}
+    for field in fields:
+        output_field = model._meta.get_field(field)
+        changes[field] = F(field) + Case(
+            *[When(**{key_field: key}, then=Value(delta[field], output_field=output_field)) for key, delta in deltas.items()],
+            default=Value(0, output_field=output_field), output_field=output_field)
+    model.objects.filter(day=day, **{f'{key_field}__in': list(deltas)}).update(**changes)
+
+
+def record_order(order, items):
+    """
+    Count a placed order in its day's shop and product rows. items are its
+    OrderItems. Call in the transaction that creates the order.
+    """
+    day = timezone.localdate(order.created_at)
+    _add(ShopSalesDay, 'shop_id', day, {order.shop_id: {'orders': 1, 'revenue': order.total_amount}})
+    products = defaultdict(lambda: {'quantity': 0, 'revenue': Decimal('0.00')})
+    for item in items:
+        products[item.product_id]['quantity'] += item.quantity
+        products[item.product_id]['revenue'] += item.subtotal
+    _add(ProductSalesDay, 'product_id', day, dict(products))
+
+
+@contextmanager
+def keeping_totals():
+    """Orders deleted inside this block keep their place in the rollups (forget_orders skips them)"""
+    _state.keeping = True
+    try:
+        yield
+    finally:
+        _state.keeping = False
+
+
+def forget_orders(orders):
+    """
+    Take a queryset of orders that is about to be deleted back out of the
+    rollups: the orders and their items are summed per (day, shop) and
+    (day, product) and each day's rows get one UPDATE, however many orders
+    there are. Call in the transaction that deletes them.
+    """
+    if getattr(_state, 'keeping', False):
+        return
+    shop_days = defaultdict(dict)
+    for row in (orders.annotate(day=TruncDate('created_at')).values('shop_id', 'day')
+                .annotate(orders=Count('id'), revenue=Sum('total_amount')).order_by()):
+        shop_days[row['day']][row['shop_id']] = {'orders': -row['orders'], 'revenue': -(row['revenue'] or 0)}
+    product_days = defaultdict(dict)
+    for row in (OrderItem.objects.filter(order__in=orders.values('id'))
+                .annotate(day=TruncDate('order__created_at')).values('product_id', 'day')
+                .annotate(quantity=Sum('quantity'), revenue=Sum('subtotal')).order_by()):
+        product_days[row['day']][row['product_id']] = {'quantity': -row['quantity'], 'revenue': -(row['revenue'] or 0)}
+    for day, deltas in shop_days.items():
+        _add(ShopSalesDay, 'shop_id', day, deltas)
+    for day, deltas in product_days.items():
+        _add(ProductSalesDay, 'product_id', day, deltas)
+
+
+def _since(window):
+    days = WINDOWS[window]
+    return None if days is None else timezone.localdate() - timedelta(days=days - 1)
+
+
+def _ranked(model, key_field, order_field, window, limit):
+    rows = model.objects.all()
+    since = _since(window)
+    if since is not None:
+        rows = rows.filter(day__gte=since)
+    totals = {'orders': Sum('orders')} if model is ShopSalesDay else {'quantity': Sum('quantity')}
+    return list(rows.values(key_field).annotate(total_revenue=Sum('revenue'), **totals)
+                .filter(**{f'{order_field}__gt': 0}).order_by(f'-{order_field}', key_field)[:limit])
+
+
+def _cached(name, window, limit, build):
+    key = f'leaderboard:{name}:{window}:{limit}'
+    data = cache.get(key)
+    if data is None:
+        data = build(window, limit)
+        cache.set(key, data, CACHE_TTL)
+    return data
+
+
+def _top_shops(window, limit):
+    rows = _ranked(ShopSalesDay, 'shop_id', 'total_revenue', window, limit)
+    shops = Shop.objects.select_related('owner').in_bulk([row['shop_id'] for row in rows])
+    data = [{'id': shop.id, 'name': shop.name, 'owner': shop.owner.username, 'total_orders': row['orders'],
+             'total_revenue': float(row['total_revenue'] or 0), 'average_rating': float(shop.average_rating),
+             'status': shop.status}
+            for row in rows if (shop := shops.get(row['shop_id']))]
+    if len(data) < limit and window == 'all':
+        # All-time ranking lists every shop, those without sales last
+        for shop in Shop.objects.select_related('owner').exclude(id__in=[s['id'] for s in data]).order_by('id')[:limit - len(data)]:
+            data.append({'id': shop.id, 'name': shop.name, 'owner': shop.owner.username, 'total_orders': 0,
+                         'total_revenue': 0.0, 'average_rating': float(shop.average_rating), 'status': shop.status})
+    return data
+
+
+def _top_products(window, limit):
+    rows = _ranked(ProductSalesDay, 'product_id', 'quantity', window, limit)
+    products = Product.objects.select_related('shop').in_bulk([row['product_id'] for row in rows])
+    return [{'id': product.id, 'name': product.name, 'shop': product.shop.name, 'price': float(product.price),
+             'total_sold': row['quantity'], 'total_revenue': float(row['total_revenue'] or 0),
+             'stock': product.stock_quantity}
+            for row in rows if (product := products.get(row['product_id']))]
+
+
+def top_shops(window='all', limit=TOP_K):
+    """Shops by revenue over the window, from the daily rollups, cached for CACHE_TTL"""
+    return _cached('shops', window, limit, _top_shops)
+
+
+def top_products(window='all', limit=TOP_K):
+    """Products by units sold over the window, from the daily rollups, cached for CACHE_TTL"""
+    return _cached('products', window, limit, _top_products)
+
+
+def rebuild():
+    """
+    Recompute every rollup row from the orders and archived orders on
+    record. For the first deploy and after bulk imports that bypass
+    checkout; returns the number of shop and product rows written.
+    """
+    shop_days = defaultdict(lambda: [0, Decimal('0.00')])
+    product_days = defaultdict(lambda: [0, Decimal('0.00')])
+    for orders in (Order.objects, ArchivedOrder.objects):
+        for row in (orders.annotate(day=TruncDate('created_at')).values('shop_id', 'day')
+                    .annotate(orders=Count('id'), revenue=Sum('total_amount')).order_by()):
+            totals = shop_days[row['shop_id'], row['day']]
+            totals[0] += row['orders']
+            totals[1] += row['revenue'] or 0
+    for items in (OrderItem.objects, ArchivedOrderItem.objects.filter(product__isnull=False)):
+        for row in (items.annotate(day=TruncDate('order__created_at')).values('product_id', 'day')
+                    .annotate(quantity=Sum('quantity'), revenue=Sum('subtotal')).order_by()):
+            totals = product_days[row['product_id'], row['day']]
+            totals[0] += row['quantity']
+            totals[1] += row['revenue'] or 0
+
+    with transaction.atomic():
+        ShopSalesDay.objects.all().delete()
+        ProductSalesDay.objects.all().delete()
+        ShopSalesDay.objects.bulk_create([ShopSalesDay(shop_id=shop_id, day=day, orders=n, revenue=revenue)
+                                          for (shop_id, day), (n, revenue) in shop_days.items()], batch_size=2000)
+        ProductSalesDay.objects.bulk_create([ProductSalesDay(product_id=product_id, day=day, quantity=n, revenue=revenue)
+                                             for (product_id, day), (n, revenue) in product_days.items()], batch_size=2000)
+    return len(shop_days), len(product_days)
@@ -0,0 +1,27 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from orders.archive import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE, ARCHIVABLE_STATUSES, archive_orders
+from orders.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Move delivered, cancelled and refunded orders older than the archive age into the archive tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=ARCHIVE_AFTER_DAYS, help='archive orders older than this many days')
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE)
+        parser.add_argument('--max-batches', type=int, help='stop after this many batches')
+        parser.add_argument('--dry-run', action='store_true', help='only count what would be archived')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        if options['dry_run']:
+            count = Order.objects.filter(status__in=ARCHIVABLE_STATUSES, created_at__lt=cutoff).count()
+            self.stdout.write(f'{count} order(s) created before {cutoff:%Y-%m-%d} would be archived')
+            return
+
+        started = time.perf_counter()
+        moved = archive_orders(cutoff, options['batch_size'], options['max_batches'])
+        self.stdout.write(f'Archived {moved} order(s) in {time.perf_counter() - started:.1f}s')
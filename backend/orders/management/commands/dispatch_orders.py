@@ -0,0 +1,23 @@
+import time
+from django.core.management.base import BaseCommand
+from orders.dispatch import assign_ready_orders
+from orders.routing import replan_routes
+
+
+class Command(BaseCommand):
+    help = 'Assign delivery agents to every waiting ready_for_pickup order in one optimised batch and replan their routes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='keep running, dispatching every INTERVAL seconds')
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            deliveries = assign_ready_orders()
+            replan_routes(deliveries)
+            elapsed = (time.perf_counter() - started) * 1000
+            self.stdout.write(f'Assigned {len(deliveries)} order(s) in {elapsed:.0f} ms')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,12 @@
+import time
+from django.core.management.base import BaseCommand
+from orders.leaderboard import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily shop and product sales rollups behind the admin rankings from every order, live and archived.'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        shop_rows, product_rows = rebuild()
+        self.stdout.write(f'Wrote {shop_rows} shop and {product_rows} product day(s) in {time.perf_counter() - started:.1f}s')
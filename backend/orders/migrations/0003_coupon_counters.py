@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_counters(apps, schema_editor):
+    Coupon = apps.get_model('orders', 'Coupon')
+    CouponUsage = apps.get_model('orders', 'CouponUsage')
+    CouponCustomerUsage = apps.get_model('orders', 'CouponCustomerUsage')
+    for row in CouponUsage.objects.values('coupon_id').annotate(total=Count('id')):
+        Coupon.objects.filter(pk=row['coupon_id']).update(times_used=row['total'])
+    CouponCustomerUsage.objects.bulk_create([
+        CouponCustomerUsage(coupon_id=row['coupon_id'], customer_id=row['customer_id'], times_used=row['total'])
+        for row in CouponUsage.objects.values('coupon_id', 'customer_id').annotate(total=Count('id'))
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_order_delivery_location'),
+        ('shops', '0002_shop_delivery_fee_per_km_shop_free_delivery_above'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CouponCustomerUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('times_used', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='coupon',
+            name='times_used',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='coupon',
+            index=models.Index(fields=['is_active', 'valid_until'], name='orders_coup_is_acti_00904b_idx'),
+        ),
+        migrations.AddField(
+            model_name='couponcustomerusage',
+            name='coupon',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='customer_counters', to='orders.coupon'),
+        ),
+        migrations.AddField(
+            model_name='couponcustomerusage',
+            name='customer',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='coupon_counters', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterUniqueTogether(
+            name='couponcustomerusage',
+            unique_together={('coupon', 'customer')},
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_coupon_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deliveryagent',
+            name='location_updated_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='delivery',
+            index=models.Index(fields=['delivery_agent', 'status'], name='orders_deli_deliver_4f8ed5_idx'),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:56
+
+import django.db.models.deletion
+from itertools import groupby
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_projection(apps, schema_editor):
+    # Merge-join orders with their events, both streamed in order id order
+    Order = apps.get_model('orders', 'Order')
+    OrderTracking = apps.get_model('orders', 'OrderTracking')
+    events = groupby(
+        OrderTracking.objects.order_by('order_id', 'created_at', 'id')
+        .values_list('order_id', 'status', 'created_at', 'created_by_id').iterator(chunk_size=5000),
+        key=lambda event: event[0],
+    )
+    next_group = next(events, None)
+    fields = ['status_timestamps', 'status_changed_at', 'status_changed_by']
+    batch = []
+    for order in Order.objects.order_by('id').only('id', 'status', 'created_at').iterator(chunk_size=1000):
+        timestamps, changed_at, changed_by = {}, order.created_at, None
+        while next_group is not None and next_group[0] < order.id:
+            next_group = next(events, None)
+        if next_group is not None and next_group[0] == order.id:
+            for _, status, created_at, created_by in next_group[1]:
+                timestamps[status] = created_at.isoformat()
+                changed_at, changed_by = created_at, created_by
+            next_group = next(events, None)
+        timestamps.setdefault(order.status, changed_at.isoformat())
+        order.status_timestamps = timestamps
+        order.status_changed_at = changed_at
+        order.status_changed_by_id = changed_by
+        batch.append(order)
+        if len(batch) >= 1000:
+            Order.objects.bulk_update(batch, fields)
+            batch = []
+    if batch:
+        Order.objects.bulk_update(batch, fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_dispatch'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='status_changed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='status_changed_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='status_timestamps',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddIndex(
+            model_name='ordertracking',
+            index=models.Index(fields=['order', 'created_at'], name='orders_orde_order_i_9dbc81_idx'),
+        ),
+        migrations.RunPython(backfill_projection, migrations.RunPython.noop),
+    ]
@@ -85,6 +85,9 @@ class Order(models.Model):
     delivery_address = models.TextField()
     delivery_phone = models.CharField(max_length=17)
     delivery_instructions = models.TextField(blank=True)
+    delivery_latitude = models.DecimalField(max_digits=9, decimal_places=6, blank=True, null=True)
+    delivery_longitude = models.DecimalField(max_digits=9, decimal_places=6, blank=True, null=True)
+    delivery_distance_km = models.DecimalField(max_digits=7, decimal_places=2, blank=True, null=True)
     estimated_delivery_time = models.DateTimeField(blank=True, null=True)
     actual_delivery_time = models.DateTimeField(blank=True, null=True)
     
@@ -96,6 +99,11 @@ class Order(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     confirmed_at = models.DateTimeField(blank=True, null=True)
     
+    # Current-state projection of the OrderTracking log, kept by orders.state
+    status_timestamps = models.JSONField(default=dict, blank=True)  # status -> ISO time it was entered
+    status_changed_at = models.DateTimeField(blank=True, null=True)
+    status_changed_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    
     class Meta:
         ordering = ['-created_at']
     
@@ -121,6 +129,7 @@ class OrderItem(models.Model):
         return f"{self.quantity}x {self.product.name} (Order: {self.order.order_number})"
 
 class OrderTracking(models.Model):
+    """Append-only status event log; write through orders.state.transition"""
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='tracking')
     status = models.CharField(max_length=20, choices=Order.ORDER_STATUS_CHOICES)
     message = models.TextField(blank=True)
@@ -129,9 +138,17 @@ class OrderTracking(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['order', 'created_at']),
+        ]
     
     def __str__(self):
         return f"Order {self.order.order_number} - {self.status}"
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Order tracking events are append-only')
+        super().save(*args, **kwargs)
 
 class DeliveryAgent(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='delivery_agent')
@@ -141,6 +158,7 @@ class DeliveryAgent(models.Model):
     is_available = models.BooleanField(default=True)
     current_latitude = models.DecimalField(max_digits=9, decimal_places=6, blank=True, null=True)
     current_longitude = models.DecimalField(max_digits=9, decimal_places=6, blank=True, null=True)
+    location_updated_at = models.DateTimeField(blank=True, null=True, db_index=True)
     
     def __str__(self):
         return f"Delivery Agent: {self.user.username}"
@@ -169,6 +187,11 @@ class Delivery(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['delivery_agent', 'status']),
+        ]
+    
     def __str__(self):
         return f"Delivery for Order {self.order.order_number}"
 
@@ -191,6 +214,7 @@ class Coupon(models.Model):
     maximum_discount_amount = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
     usage_limit = models.IntegerField(blank=True, null=True)  # Total usage limit
     usage_limit_per_customer = models.IntegerField(default=1)
+    times_used = models.PositiveIntegerField(default=0)  # Maintained atomically on redemption
     
     # Validity
     valid_from = models.DateTimeField()
@@ -202,8 +226,34 @@ class Coupon(models.Model):
     
     created_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['is_active', 'valid_until']),
+        ]
+    
     def __str__(self):
         return f"Coupon: {self.code}"
+    
+    def save(self, *args, **kwargs):
+        # times_used only changes through redemption UPDATEs; never write it back from a stale instance
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'times_used'
+            ]
+        super().save(*args, **kwargs)
+
+class CouponCustomerUsage(models.Model):
+    """Per-customer redemption counter, so limits are checked without counting CouponUsage rows"""
+    coupon = models.ForeignKey(Coupon, on_delete=models.CASCADE, related_name='customer_counters')
+    customer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='coupon_counters')
+    times_used = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        unique_together = ['coupon', 'customer']
+    
+    def __str__(self):
+        return f"{self.customer.username} used {self.coupon.code} {self.times_used}x"
 
 class CouponUsage(models.Model):
     coupon = models.ForeignKey(Coupon, on_delete=models.CASCADE, related_name='usage_records')
@@ -216,4 +266,114 @@ class CouponUsage(models.Model):
         unique_together = ['coupon', 'order']
     
     def __str__(self):
-        return f"Coupon {self.coupon.code} used by {self.customer.username}"
\ No newline at end of file
+        return f"Coupon {self.coupon.code} used by {self.customer.username}"
+# ============ ARCHIVE ============
+# Finished orders older than ORDER_ARCHIVE_AFTER_DAYS are moved here by
+# `manage.py archive_orders` (see orders.archive). Rows keep their original ids.
+
+class ArchivedOrder(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order_id = models.UUIDField(unique=True)
+    order_number = models.CharField(max_length=20)
+    
+    customer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_orders')
+    shop = models.ForeignKey(Shop, on_delete=models.CASCADE, related_name='archived_orders')
+    
+    status = models.CharField(max_length=20, choices=Order.ORDER_STATUS_CHOICES)
+    payment_status = models.CharField(max_length=20, choices=Order.PAYMENT_STATUS_CHOICES)
+    payment_method = models.CharField(max_length=20, choices=Order.PAYMENT_METHOD_CHOICES)
+    
+    subtotal = models.DecimalField(max_digits=10, decimal_places=2)
+    delivery_fee = models.DecimalField(max_digits=10, decimal_places=2)
+    tax_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    discount_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    coupon_code = models.CharField(max_length=50, blank=True)
+    
+    delivery_address = models.TextField()
+    delivery_phone = models.CharField(max_length=17)
+    delivery_instructions = models.TextField(blank=True)
+    delivery_latitude = models.DecimalField(max_digits=9, decimal_places=6, blank=True, null=True)
+    delivery_longitude = models.DecimalField(max_digits=9, decimal_places=6, blank=True, null=True)
+    delivery_distance_km = models.DecimalField(max_digits=7, decimal_places=2, blank=True, null=True)
+    estimated_delivery_time = models.DateTimeField(blank=True, null=True)
+    actual_delivery_time = models.DateTimeField(blank=True, null=True)
+    special_instructions = models.TextField(blank=True)
+    
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    confirmed_at = models.DateTimeField(blank=True, null=True)
+    status_timestamps = models.JSONField(default=dict, blank=True)
+    status_changed_at = models.DateTimeField(blank=True, null=True)
+    status_changed_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['customer', 'created_at']),
+            models.Index(fields=['shop', 'created_at']),
+            models.Index(fields=['created_at']),
+        ]
+    
+    def __str__(self):
+        return f"Archived order {self.order_number}"
+
+class ArchivedOrderItem(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, blank=True)
+    product_name = models.CharField(max_length=200)  # Kept in case the product is deleted later
+    quantity = models.PositiveIntegerField()
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+    subtotal = models.DecimalField(max_digits=10, decimal_places=2)
+    
+    def __str__(self):
+        return f"{self.quantity}x {self.product_name} (Archived order: {self.order_id})"
+
+class ArchivedOrderTracking(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='tracking')
+    status = models.CharField(max_length=20, choices=Order.ORDER_STATUS_CHOICES)
+    message = models.TextField(blank=True)
+    created_at = models.DateTimeField()
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Archived order {self.order_id} - {self.status}"
+
+# Daily sales rollups behind the shop and product rankings (orders.leaderboard).
+# Each placed order adds to its day's rows, so a ranking window reads at most
+# one row per shop or product per day instead of every order.
+class ShopSalesDay(models.Model):
+    shop = models.ForeignKey(Shop, on_delete=models.CASCADE, related_name='+')
+    day = models.DateField()
+    orders = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    class Meta:
+        unique_together = ['shop', 'day']
+        indexes = [
+            models.Index(fields=['day']),
+        ]
+    
+    def __str__(self):
+        return f"{self.shop_id} on {self.day}: {self.orders} orders"
+
+class ProductSalesDay(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    day = models.DateField()
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    class Meta:
+        unique_together = ['product', 'day']
+        indexes = [
+            models.Index(fields=['day']),
+        ]
+    
+    def __str__(self):
+        return f"{self.product_id} on {self.day}: {self.quantity} sold"
@@ -0,0 +1,146 @@
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from shops.geo import distance_matrix
+from .dispatch import ACTIVE_DELIVERY_STATUSES, agent_index
+from .models import DeliveryAgent, Order
+
+SPEED_KMH = getattr(settings, 'ROUTE_SPEED_KMH', 20.0)
+STOP_MINUTES = getattr(settings, 'ROUTE_STOP_MINUTES', 3.0)
+TIME_BUDGET_MS = getattr(settings, 'ROUTE_TIME_BUDGET_MS', 200)
+
+
+def nearest_neighbour(matrix, start, nodes):
+    """Greedy open path from start through every node"""
+    path = [start]
+    remaining = set(nodes)
+    current = start
+    while remaining:
+        row = matrix[current]
+        current = min(remaining, key=row.__getitem__)
+        remaining.remove(current)
+        path.append(current)
+    return path
+
+
+def two_opt(matrix, path, deadline):
+    """Shorten an open path in place by reversing segments; the first node stays fixed"""
+    size = len(path)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, size - 1):
+            if time.perf_counter() > deadline:
+                return path
+            before, first = path[i - 1], path[i]
+            row_before, row_first = matrix[before], matrix[first]
+            removed = row_before[first]
+            for j in range(i + 1, size):
+                last = path[j]
+                if j + 1 < size:
+                    after = path[j + 1]
+                    delta = row_before[last] + row_first[after] - removed - matrix[last][after]
+                else:
+                    delta = row_before[last] - removed
+                if delta < -1e-9:
+                    path[i:j + 1] = path[i:j + 1][::-1]
+                    improved = True
+                    break
+    return path
+
+
+def path_length(matrix, path):
+    return sum(matrix[a][b] for a, b in zip(path, path[1:]))
+
+
+def plan_route(start, pickups, dropoffs, budget_ms=None):
+    """
+    Order the stops of one trip: every pickup first, then every drop-off.
+    Each phase gets a nearest-neighbour path improved with 2-opt, all within
+    budget_ms. Points are (latitude, longitude). Returns
+    [(kind, index, leg_km)], where index points into pickups or dropoffs.
+    """
+    deadline = time.perf_counter() + (budget_ms if budget_ms is not None else TIME_BUDGET_MS) / 1000
+    points = [start] + list(pickups) + list(dropoffs)
+    matrix = distance_matrix(points)
+    pickup_nodes = range(1, len(pickups) + 1)
+    dropoff_nodes = range(len(pickups) + 1, len(points))
+
+    path = two_opt(matrix, nearest_neighbour(matrix, 0, pickup_nodes), deadline)
+    path += two_opt(matrix, nearest_neighbour(matrix, path[-1], dropoff_nodes), deadline)[1:]
+
+    route = []
+    for previous, node in zip(path, path[1:]):
+        if node <= len(pickups):
+            route.append(('pickup', node - 1, matrix[previous][node]))
+        else:
+            route.append(('dropoff', node - len(pickups) - 1, matrix[previous][node]))
+    return route
+
+
+def _agent_position(agent):
+    position = agent_index.positions.get(agent.id)
+    if position is not None:
+        return position[0], position[1]
+    if agent.current_latitude is not None and agent.current_longitude is not None:
+        return float(agent.current_latitude), float(agent.current_longitude)
+    return None
+
+
+def plan_agent_route(agent, now=None):
+    """
+    Plan the agent's current trip over its active deliveries and store each
+    order's estimated_delivery_time. Shops still to be visited are pickups;
+    orders with delivery coordinates are drop-offs.
+    """
+    now = now or timezone.now()
+    deliveries = list(agent.deliveries.filter(status__in=ACTIVE_DELIVERY_STATUSES).select_related('order__shop'))
+
+    shops, dropoffs, unrouted = {}, [], []
+    for delivery in deliveries:
+        order = delivery.order
+        if order.delivery_latitude is None or order.delivery_longitude is None:
+            unrouted.append(order.id)
+            continue
+        shop = order.shop
+        if delivery.status == 'assigned' and shop.latitude is not None and shop.longitude is not None:
+            shops.setdefault(shop.id, shop)
+        dropoffs.append(order)
+
+    pickups = list(shops.values())
+    start = _agent_position(agent)
+    if start is None:
+        if not pickups and not dropoffs:
+            return {'agent': agent.id, 'total_distance_km': 0.0, 'stops': [], 'unrouted_orders': unrouted}
+        # No fix on the agent yet: start the trip at the first stop
+        first = pickups[0] if pickups else None
+        start = (float(first.latitude), float(first.longitude)) if first else \
+            (float(dropoffs[0].delivery_latitude), float(dropoffs[0].delivery_longitude))
+
+    route = plan_route(
+        start,
+        [(shop.latitude, shop.longitude) for shop in pickups],
+        [(order.delivery_latitude, order.delivery_longitude) for order in dropoffs],
+    )
+
+    stops, elapsed, total = [], 0.0, 0.0
+    for kind, index, leg_km in route:
+        total += leg_km
+        elapsed += leg_km / SPEED_KMH * 60 + STOP_MINUTES
+        eta = now + timedelta(minutes=elapsed)
+        if kind == 'pickup':
+            stops.append({'type': kind, 'shop': pickups[index].id, 'leg_km': round(leg_km, 2), 'eta': eta})
+        else:
+            order = dropoffs[index]
+            order.estimated_delivery_time = eta
+            stops.append({'type': kind, 'order': order.id, 'leg_km': round(leg_km, 2), 'eta': eta})
+
+    Order.objects.bulk_update(dropoffs, ['estimated_delivery_time'], batch_size=500)
+    return {'agent': agent.id, 'total_distance_km': round(total, 2), 'stops': stops, 'unrouted_orders': unrouted}
+
+
+def replan_routes(deliveries):
+    """Refresh the route of every agent that just received one of these deliveries"""
+    agent_ids = {delivery.delivery_agent_id for delivery in deliveries if delivery.delivery_agent_id}
+    return [plan_agent_route(agent) for agent in DeliveryAgent.objects.filter(id__in=agent_ids)]
@@ -1,5 +1,10 @@
 from rest_framework import serializers
-from .models import Cart, CartItem, Order, OrderItem, OrderTracking, Coupon, CouponUsage
+from django.db.models import Count, F, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
+from .models import (
+    Cart, CartItem, Order, OrderItem, OrderTracking, Coupon, CouponUsage, Delivery,
+    ArchivedOrder, ArchivedOrderItem, ArchivedOrderTracking
+)
 from shops.serializers import ProductSerializer
 
 class CartItemSerializer(serializers.ModelSerializer):
@@ -19,6 +24,40 @@ class CartSerializer(serializers.ModelSerializer):
         model = Cart
         fields = '__all__'
 
+class GuestCartItemSerializer(serializers.Serializer):
+    product = ProductSerializer(read_only=True)
+    quantity = serializers.IntegerField()
+    subtotal = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+class GuestCartSerializer(serializers.Serializer):
+    cart_token = serializers.CharField(allow_null=True)
+    items = GuestCartItemSerializer(many=True)
+    total_items = serializers.IntegerField()
+    total_amount = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+class GuestCartLineSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=0, max_value=999)
+
+class GuestCartUpdateSerializer(serializers.Serializer):
+    cart_token = serializers.CharField(required=False, allow_blank=True)
+    items = GuestCartLineSerializer(many=True, allow_empty=False)
+
+class CartOperationSerializer(serializers.Serializer):
+    op = serializers.ChoiceField(choices=('add', 'set', 'remove'))
+    product_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(required=False, min_value=0, max_value=999)
+    
+    def validate(self, attrs):
+        if attrs['op'] == 'set' and 'quantity' not in attrs:
+            raise serializers.ValidationError('set needs a quantity')
+        if attrs['op'] == 'add' and attrs.get('quantity') == 0:
+            raise serializers.ValidationError('add needs a positive quantity')
+        return attrs
+
+class CartBatchSerializer(serializers.Serializer):
+    operations = CartOperationSerializer(many=True, allow_empty=False, max_length=200)
+
 class OrderItemSerializer(serializers.ModelSerializer):
     product_name = serializers.CharField(source='product.name', read_only=True)
     
@@ -27,20 +66,123 @@ class OrderItemSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 class OrderTrackingSerializer(serializers.ModelSerializer):
+    created_by_name = serializers.CharField(source='created_by.username', read_only=True, default=None)
+    
     class Meta:
         model = OrderTracking
         fields = '__all__'
 
-class OrderSerializer(serializers.ModelSerializer):
+ORDER_EXPANSIONS = ('items', 'tracking')
+
+def parse_expand(request):
+    """Related collections requested with ?expand=items,tracking"""
+    if request is None:
+        return set()
+    requested = request.query_params.get('expand', '').split(',')
+    return {name.strip() for name in requested if name.strip() in ORDER_EXPANSIONS}
+
+def prefetch_order_details(queryset, expand):
+    """One extra query per expanded collection, however many orders are listed"""
+    if 'items' in expand:
+        queryset = queryset.prefetch_related(Prefetch(
+            'items',
+            queryset=OrderItem.objects.select_related('product').only(
+                'id', 'order_id', 'product_id', 'quantity', 'unit_price', 'subtotal', 'product__name'
+            )
+        ))
+    if 'tracking' in expand:
+        queryset = queryset.prefetch_related(Prefetch('tracking', queryset=OrderTracking.objects.select_related('created_by')))
+    return queryset
+
+class ExpandableOrderMixin:
+    """Adds items/tracking when they are listed in context['expand']"""
+    
+    def get_fields(self):
+        fields = super().get_fields()
+        expand = self.context.get('expand', ())
+        if 'items' in expand and 'items' not in fields:
+            fields['items'] = OrderItemSerializer(many=True, read_only=True)
+        if 'tracking' in expand:
+            fields['tracking'] = OrderTrackingSerializer(many=True, read_only=True)
+        return fields
+
+class OrderSerializer(ExpandableOrderMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
-    tracking = OrderTrackingSerializer(many=True, read_only=True)
     customer_name = serializers.CharField(source='customer.username', read_only=True)
     shop_name = serializers.CharField(source='shop.name', read_only=True)
     
     class Meta:
         model = Order
         fields = '__all__'
-        read_only_fields = ('order_id', 'order_number', 'customer')
+        read_only_fields = ('order_id', 'order_number', 'customer', 'status', 'status_timestamps', 'status_changed_at', 'status_changed_by')
+
+class OrderListSerializer(ExpandableOrderMixin, serializers.ModelSerializer):
+    """Compact order row for list views; use with OrderListSerializer.setup_queryset"""
+    customer_name = serializers.CharField(read_only=True)
+    shop_name = serializers.CharField(read_only=True)
+    items_count = serializers.IntegerField(read_only=True)
+    
+    class Meta:
+        model = Order
+        fields = ('id', 'order_id', 'order_number', 'customer', 'customer_name', 'shop', 'shop_name',
+                  'status', 'payment_status', 'payment_method', 'subtotal', 'delivery_fee', 'discount_amount',
+                  'total_amount', 'items_count', 'status_changed_at', 'estimated_delivery_time', 'created_at')
+        read_only_fields = fields
+    
+    @classmethod
+    def setup_queryset(cls, queryset, expand=()):
+        """Annotate names and item counts in the main query and load only the listed columns"""
+        items_count = (OrderItem.objects.filter(order=OuterRef('pk')).order_by()
+                       .values('order').annotate(count=Count('id')).values('count'))
+        columns = [name for name in cls.Meta.fields if name not in ('customer_name', 'shop_name', 'items_count')]
+        queryset = queryset.only(*columns).annotate(
+            customer_name=F('customer__username'),
+            shop_name=F('shop__name'),
+            items_count=Coalesce(Subquery(items_count), 0),
+        )
+        return prefetch_order_details(queryset, expand)
+
+class OrderHistorySerializer(serializers.Serializer):
+    """Rows of orders.archive.order_history: the list fields plus where the order lives"""
+    id = serializers.IntegerField()
+    order_id = serializers.UUIDField()
+    order_number = serializers.CharField()
+    customer = serializers.IntegerField()
+    customer_name = serializers.CharField()
+    shop = serializers.IntegerField()
+    shop_name = serializers.CharField()
+    status = serializers.CharField()
+    payment_status = serializers.CharField()
+    payment_method = serializers.CharField()
+    subtotal = serializers.DecimalField(max_digits=10, decimal_places=2)
+    delivery_fee = serializers.DecimalField(max_digits=10, decimal_places=2)
+    discount_amount = serializers.DecimalField(max_digits=10, decimal_places=2)
+    total_amount = serializers.DecimalField(max_digits=10, decimal_places=2)
+    items_count = serializers.IntegerField()
+    status_changed_at = serializers.DateTimeField(allow_null=True)
+    estimated_delivery_time = serializers.DateTimeField(allow_null=True)
+    created_at = serializers.DateTimeField()
+    archived = serializers.BooleanField()
+
+class ArchivedOrderItemSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ArchivedOrderItem
+        fields = '__all__'
+
+class ArchivedOrderTrackingSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ArchivedOrderTracking
+        fields = '__all__'
+
+class ArchivedOrderSerializer(serializers.ModelSerializer):
+    items = ArchivedOrderItemSerializer(many=True, read_only=True)
+    customer_name = serializers.CharField(source='customer.username', read_only=True)
+    shop_name = serializers.CharField(source='shop.name', read_only=True)
+    archived = serializers.BooleanField(default=True, read_only=True)
+    
+    class Meta:
+        model = ArchivedOrder
+        fields = '__all__'
 
 class CouponSerializer(serializers.ModelSerializer):
     class Meta:
@@ -51,6 +193,41 @@ class CheckoutSerializer(serializers.Serializer):
     delivery_address = serializers.CharField()
     delivery_phone = serializers.CharField()
     delivery_instructions = serializers.CharField(required=False, allow_blank=True)
+    delivery_latitude = serializers.FloatField(required=False, min_value=-90, max_value=90)
+    delivery_longitude = serializers.FloatField(required=False, min_value=-180, max_value=180)
     payment_method = serializers.ChoiceField(choices=Order.PAYMENT_METHOD_CHOICES)
     coupon_code = serializers.CharField(required=False, allow_blank=True)
-    special_instructions = serializers.CharField(required=False, allow_blank=True)
\ No newline at end of file
+    special_instructions = serializers.CharField(required=False, allow_blank=True)
+    cart_token = serializers.CharField(required=False, allow_blank=True)
+    
+    def validate(self, attrs):
+        if ('delivery_latitude' in attrs) != ('delivery_longitude' in attrs):
+            raise serializers.ValidationError('delivery_latitude and delivery_longitude must be sent together')
+        return attrs
+
+class DeliveryQuoteShopSerializer(serializers.Serializer):
+    shop_id = serializers.IntegerField()
+    shop_name = serializers.CharField()
+    subtotal = serializers.DecimalField(max_digits=10, decimal_places=2)
+    distance_km = serializers.FloatField(allow_null=True)
+    delivery_fee = serializers.DecimalField(max_digits=10, decimal_places=2)
+    free_delivery = serializers.BooleanField()
+    deliverable = serializers.BooleanField()
+    errors = serializers.ListField(child=serializers.CharField())
+
+class DeliveryQuoteSerializer(serializers.Serializer):
+    cart_version = serializers.CharField()
+    latitude = serializers.FloatField(allow_null=True)
+    longitude = serializers.FloatField(allow_null=True)
+    shops = DeliveryQuoteShopSerializer(many=True)
+    subtotal = serializers.DecimalField(max_digits=10, decimal_places=2)
+    delivery_fee = serializers.DecimalField(max_digits=10, decimal_places=2)
+    total = serializers.DecimalField(max_digits=10, decimal_places=2)
+    deliverable = serializers.BooleanField()
+
+class DeliverySerializer(serializers.ModelSerializer):
+    agent_name = serializers.CharField(source='delivery_agent.user.get_full_name', read_only=True)
+    
+    class Meta:
+        model = Delivery
+        fields = ('id', 'order', 'delivery_agent', 'agent_name', 'status', 'pickup_time', 'delivery_time', 'created_at')
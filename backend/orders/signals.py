@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from .coupons import coupon_cache
+from .leaderboard import forget_orders
+from .models import Coupon, Order
+
+
+@receiver(post_save, sender=Coupon)
+@receiver(post_delete, sender=Coupon)
+def invalidate_coupon(sender, instance, **kwargs):
+    coupon_cache.invalidate(instance.code)
+
+
+@receiver(m2m_changed, sender=Coupon.applicable_shops.through)
+def invalidate_coupon_shops(sender, instance, **kwargs):
+    if isinstance(instance, Coupon):
+        coupon_cache.invalidate(instance.code)
+    else:
+        # Changed from the shop side; the affected codes are not known here
+        coupon_cache.invalidate()
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def remove_customer_orders(sender, instance, **kwargs):
+    # Deleting a user cascades to their orders. Deleting a shop or product
+    # needs nothing here: its rollup rows cascade along with the orders.
+    forget_orders(Order.objects.filter(customer=instance))
@@ -0,0 +1,76 @@
+from django.db import transaction
+from django.utils import timezone
+from monitoring import metrics
+from .models import Order, OrderTracking
+
+# Allowed moves of the order state machine. Anything else is rejected
+# before touching the database.
+TRANSITIONS = {
+    'pending': {'confirmed', 'cancelled'},
+    'confirmed': {'preparing', 'cancelled'},
+    'preparing': {'ready_for_pickup', 'cancelled'},
+    'ready_for_pickup': {'out_for_delivery', 'cancelled'},
+    'out_for_delivery': {'delivered'},
+    'delivered': {'refunded'},
+    'cancelled': {'refunded'},
+    'refunded': set(),
+}
+
+
+class InvalidTransition(Exception):
+    pass
+
+
+def check_transition(current, new_status):
+    if new_status not in TRANSITIONS:
+        raise InvalidTransition('Invalid status')
+    if new_status not in TRANSITIONS[current]:
+        raise InvalidTransition(f'Cannot change order status from {current} to {new_status}')
+
+
+def initial_state(actor, now=None):
+    """Projection fields for a newly placed order"""
+    now = now or timezone.now()
+    return {
+        'status': 'pending',
+        'status_timestamps': {'pending': now.isoformat()},
+        'status_changed_at': now,
+        'status_changed_by': actor,
+    }
+
+
+def transition(order, new_status, actor=None, message='', force=False):
+    """
+    Move the order to new_status. This appends one OrderTracking event and
+    updates the projection on Order in the same transaction. The UPDATE is
+    conditional on the status we read, so two concurrent changes cannot
+    both apply. force skips the state machine for admin corrections.
+    """
+    if not force:
+        check_transition(order.status, new_status)
+    elif new_status not in TRANSITIONS:
+        raise InvalidTransition('Invalid status')
+
+    now = timezone.now()
+    changes = {
+        'status': new_status,
+        'status_timestamps': dict(order.status_timestamps or {}, **{new_status: now.isoformat()}),
+        'status_changed_at': now,
+        'status_changed_by': actor,
+        'updated_at': now,
+    }
+    if new_status == 'confirmed':
+        changes['confirmed_at'] = now
+    elif new_status == 'delivered':
+        changes['actual_delivery_time'] = now
+
+    previous = order.status
+    with transaction.atomic():
+        if not Order.objects.filter(pk=order.pk, status=previous).update(**changes):
+            raise InvalidTransition('Order status was changed by someone else; reload and try again')
+        OrderTracking.objects.create(order=order, status=new_status, message=message, created_by=actor)
+
+    for field, value in changes.items():
+        setattr(order, field, value)
+    metrics.order_status_transitions_total.inc(from_status=previous, to_status=new_status)
+    return order
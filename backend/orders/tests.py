@@ -1,3 +1,97 @@
+from datetime import time
+from decimal import Decimal
 from django.test import TestCase
+from accounts.models import User
+from shops.models import Category, Product, Shop
+from .cart_batch import CartBatchError, apply_cart_operations
+from .models import CartItem, Order, OrderTracking
+from .state import InvalidTransition, transition
 
-# Create your tests here.
+
+def make_shop():
+    owner = User.objects.create_user(username='keeper', password='pass12345', user_type='shopkeeper')
+    return Shop.objects.create(owner=owner, name='Corner Store', description='d', address='a', phone='1',
+                               opening_time=time(9), closing_time=time(21))
+
+
+class OrderStateTests(TestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(username='customer', password='pass12345', user_type='customer')
+        self.order = Order.objects.create(
+            customer=self.customer, shop=make_shop(), order_number='ORD1', subtotal=Decimal('10.00'),
+            total_amount=Decimal('10.00'), delivery_address='x', delivery_phone='1', payment_method='cash_on_delivery')
+
+    def test_transition_updates_projection_and_logs_event(self):
+        transition(self.order, 'confirmed', actor=self.customer, message='ok')
+        order = Order.objects.get(pk=self.order.pk)
+        self.assertEqual(order.status, 'confirmed')
+        self.assertIsNotNone(order.confirmed_at)
+        self.assertIn('confirmed', order.status_timestamps)
+        self.assertEqual(list(OrderTracking.objects.filter(order=order).values_list('status', flat=True)), ['confirmed'])
+
+    def test_disallowed_move_is_rejected(self):
+        with self.assertRaises(InvalidTransition):
+            transition(self.order, 'delivered')
+        with self.assertRaises(InvalidTransition):
+            transition(self.order, 'shipped', force=True)
+        self.assertEqual(Order.objects.get(pk=self.order.pk).status, 'pending')
+        self.assertFalse(OrderTracking.objects.exists())
+
+    def test_force_skips_the_state_machine(self):
+        transition(self.order, 'delivered', force=True)
+        self.assertEqual(Order.objects.get(pk=self.order.pk).status, 'delivered')
+
+    def test_stale_order_loses_the_conditional_update(self):
+        stale = Order.objects.get(pk=self.order.pk)
+        transition(self.order, 'confirmed')
+        # stale still reads 'pending', where cancelling is allowed
+        with self.assertRaises(InvalidTransition):
+            transition(stale, 'cancelled')
+        self.assertEqual(Order.objects.get(pk=self.order.pk).status, 'confirmed')
+        self.assertEqual(stale.status, 'pending')
+        self.assertEqual(OrderTracking.objects.count(), 1)
+
+
+class CartBatchTests(TestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(username='customer', password='pass12345', user_type='customer')
+        shop = make_shop()
+        category = Category.objects.create(name='Groceries')
+        self.products = [Product.objects.create(shop=shop, category=category, name=f'P{i}', description='x',
+                                                price=Decimal('10.00'), stock_quantity=50, sku=f'SKU{i}')
+                         for i in range(3)]
+
+    def quantities(self):
+        return dict(CartItem.objects.filter(cart__customer=self.customer).values_list('product_id', 'quantity'))
+
+    def test_operations_are_replayed_in_order(self):
+        p0, p1, p2 = (p.id for p in self.products)
+        diff = apply_cart_operations(self.customer, [
+            {'op': 'add', 'product_id': p0}, {'op': 'add', 'product_id': p0, 'quantity': 2},
+            {'op': 'set', 'product_id': p1, 'quantity': 4}, {'op': 'add', 'product_id': p2},
+            {'op': 'remove', 'product_id': p2},
+        ])
+        self.assertEqual(self.quantities(), {p0: 3, p1: 4})
+        self.assertEqual(sorted(line['product_id'] for line in diff['added']), [p0, p1])
+        self.assertEqual((diff['lines'], diff['total_items'], diff['total_amount']), (2, 7, Decimal('70.00')))
+
+    def test_diff_against_existing_lines(self):
+        p0, p1, p2 = (p.id for p in self.products)
+        apply_cart_operations(self.customer, [{'op': 'set', 'product_id': p0, 'quantity': 1},
+                                              {'op': 'set', 'product_id': p1, 'quantity': 1}])
+        diff = apply_cart_operations(self.customer, [{'op': 'add', 'product_id': p0, 'quantity': 2},
+                                                     {'op': 'set', 'product_id': p1, 'quantity': 0},
+                                                     {'op': 'set', 'product_id': p2, 'quantity': 5}])
+        self.assertEqual(self.quantities(), {p0: 3, p2: 5})
+        self.assertEqual([line['product_id'] for line in diff['updated']], [p0])
+        self.assertEqual([line['product_id'] for line in diff['added']], [p2])
+        self.assertEqual(diff['removed'], [p1])
+
+    def test_unavailable_product_rolls_back_the_batch(self):
+        p0, p1, _ = self.products
+        p1.status = 'out_of_stock'
+        p1.save()
+        with self.assertRaises(CartBatchError):
+            apply_cart_operations(self.customer, [{'op': 'add', 'product_id': p0.id},
+                                                  {'op': 'add', 'product_id': p1.id}])
+        self.assertEqual(self.quantities(), {})
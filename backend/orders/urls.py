@@ -13,6 +13,12 @@ urlpatterns = [
     path('cart/update/', views.update_cart_item, name='update_cart_item'),
     path('cart/remove/', views.remove_from_cart, name='remove_from_cart'),
     path('cart/clear/', views.clear_cart, name='clear_cart'),
+    path('cart/batch/', views.batch_update_cart, name='batch_update_cart'),
+    path('cart/guest/', views.guest_cart, name='guest_cart'),
+    path('cart/delivery-quote/', views.delivery_quote, name='delivery_quote'),
     path('checkout/', views.checkout, name='checkout'),
+    path('dispatch/location/', views.update_agent_location, name='update_agent_location'),
+    path('dispatch/assign/', views.dispatch_ready_orders, name='dispatch_ready_orders'),
+    path('dispatch/route/', views.agent_route, name='agent_route'),
     path('orders/<uuid:order_id>/track/', views.track_order, name='track_order'),
 ]
\ No newline at end of file
@@ -1,14 +1,28 @@
 from rest_framework import viewsets, status, generics, permissions
 from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from django.db import transaction
-from django.utils import timezone
-from .models import Cart, CartItem, Order, OrderItem, OrderTracking, Coupon
+from .models import Cart, CartItem, Order, OrderTracking, Coupon, DeliveryAgent, ArchivedOrder
+from .archive import filter_date_range, needs_archive, order_history, parse_date_range
 from shops.models import Product
+from monitoring import metrics
+from django.conf import settings
+from .coupons import CouponError
+from .delivery import DeliveryQuoteError, build_quote, geocode, get_cart_quote, parse_coordinates
+from .checkout import delivery_coordinates, place_orders, reorder_lines
+from .cart_batch import CartBatchError, apply_cart_operations
+from .guest_cart import GuestCartError, apply_updates, cart_contents, load, merge_guest_cart, new_token, save
+from .dispatch import agent_index, assign_nearest_agent, assign_ready_orders
+from .routing import plan_agent_route, replan_routes
+from .state import InvalidTransition, transition
 from .serializers import (
     CartSerializer, CartItemSerializer, OrderSerializer, 
-    CouponSerializer, CheckoutSerializer, OrderTrackingSerializer
+    CouponSerializer, CheckoutSerializer, OrderTrackingSerializer,
+    DeliveryQuoteSerializer, DeliverySerializer, OrderListSerializer,
+    GuestCartSerializer, GuestCartUpdateSerializer, CartBatchSerializer,
+    OrderHistorySerializer, ArchivedOrderSerializer, ArchivedOrderTrackingSerializer,
+    parse_expand, prefetch_order_details
 )
 
 class CartView(generics.RetrieveAPIView):
@@ -90,100 +104,209 @@ def clear_cart(request):
     except Cart.DoesNotExist:
         return Response({'message': 'Cart is already empty'}, status=status.HTTP_200_OK)
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def batch_update_cart(request):
+    """Apply several add/set/remove operations at once and return what changed"""
+    serializer = CartBatchSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        diff = apply_cart_operations(request.user, serializer.validated_data['operations'])
+    except CartBatchError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(diff, status=status.HTTP_200_OK)
+
+@api_view(['GET', 'POST', 'DELETE'])
+@permission_classes([AllowAny])
+def guest_cart(request):
+    """
+    Cart kept in the cache under a signed token until login or checkout.
+    POST sets the quantity of several products at once (0 removes) and
+    issues a token on the first call.
+    """
+    if request.method == 'POST':
+        serializer = GuestCartUpdateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        token = serializer.validated_data.get('cart_token') or new_token()
+    else:
+        token = request.query_params.get('cart_token') or request.data.get('cart_token')
+        if not token:
+            return Response(GuestCartSerializer(dict(cart_contents({}), cart_token=None)).data)
+
+    try:
+        items = load(token)
+        if request.method == 'POST':
+            items = apply_updates(items, serializer.validated_data['items'])
+            save(token, items)
+        elif request.method == 'DELETE':
+            items = {}
+            save(token, items)
+    except GuestCartError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(GuestCartSerializer(dict(cart_contents(items), cart_token=token)).data)
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def checkout(request):
     serializer = CheckoutSerializer(data=request.data)
     if not serializer.is_valid():
+        metrics.checkout_total.inc(outcome='invalid')
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     try:
+        if serializer.validated_data.get('cart_token'):
+            merge_guest_cart(request.user, serializer.validated_data['cart_token'])
         cart = Cart.objects.get(customer=request.user)
         if not cart.items.exists():
+            metrics.checkout_total.inc(outcome='empty_cart')
             return Response({'error': 'Cart is empty'}, status=status.HTTP_400_BAD_REQUEST)
         
-        with transaction.atomic():
-            # Group cart items by shop
-            shops_orders = {}
-            for item in cart.items.all():
-                shop_id = item.product.shop.id
-                if shop_id not in shops_orders:
-                    shops_orders[shop_id] = {
-                        'shop': item.product.shop,
-                        'items': []
-                    }
-                shops_orders[shop_id]['items'].append(item)
-            
-            created_orders = []
+        with metrics.checkout_duration_seconds.time(), transaction.atomic():
+            cart_items = list(cart.items.select_related('product__shop'))
+            metrics.cart_size_items.observe(len(cart_items))
             
-            # Create separate orders for each shop
-            for shop_data in shops_orders.values():
-                shop = shop_data['shop']
-                items = shop_data['items']
-                
-                # Calculate totals
-                subtotal = sum(item.subtotal for item in items)
-                delivery_fee = shop.delivery_fee
-                total_amount = subtotal + delivery_fee
-                
-                # Create order
-                order = Order.objects.create(
-                    customer=request.user,
-                    shop=shop,
-                    subtotal=subtotal,
-                    delivery_fee=delivery_fee,
-                    total_amount=total_amount,
-                    delivery_address=serializer.validated_data['delivery_address'],
-                    delivery_phone=serializer.validated_data['delivery_phone'],
-                    delivery_instructions=serializer.validated_data.get('delivery_instructions', ''),
-                    payment_method=serializer.validated_data['payment_method'],
-                    special_instructions=serializer.validated_data.get('special_instructions', ''),
-                )
-                
-                # Create order items
-                for cart_item in items:
-                    OrderItem.objects.create(
-                        order=order,
-                        product=cart_item.product,
-                        quantity=cart_item.quantity,
-                        unit_price=cart_item.product.final_price,
-                        subtotal=cart_item.subtotal
-                    )
-                
-                # Create initial tracking
-                OrderTracking.objects.create(
-                    order=order,
-                    status='pending',
-                    message='Order placed successfully',
-                    created_by=request.user
-                )
-                
-                created_orders.append(order)
+            # Price delivery per shop from the customer's location (shared with the cart page quote)
+            data = serializer.validated_data
+            quote = get_cart_quote(cart, delivery_coordinates(data), items=cart_items)
+            if not quote['deliverable']:
+                metrics.checkout_total.inc(outcome='undeliverable')
+                return Response({
+                    'error': 'Your cart cannot be delivered to this address',
+                    'quote': DeliveryQuoteSerializer(quote).data
+                }, status=status.HTTP_400_BAD_REQUEST)
+            created_orders = place_orders(request.user, cart_items, data, quote)
             
             # Clear cart
             cart.items.all().delete()
             
+            metrics.checkout_total.inc(outcome='success')
+            metrics.orders_created_total.inc(len(created_orders))
+            created = OrderListSerializer.setup_queryset(Order.objects.filter(id__in=[o.id for o in created_orders]))
             return Response({
                 'message': f'{len(created_orders)} order(s) created successfully',
-                'orders': OrderSerializer(created_orders, many=True).data
+                'orders': OrderListSerializer(created, many=True).data
             }, status=status.HTTP_201_CREATED)
             
+    except CouponError as e:
+        metrics.checkout_total.inc(outcome='coupon_rejected')
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except GuestCartError as e:
+        metrics.checkout_total.inc(outcome='invalid')
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     except Cart.DoesNotExist:
+        metrics.checkout_total.inc(outcome='no_cart')
         return Response({'error': 'Cart not found'}, status=status.HTTP_404_NOT_FOUND)
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def delivery_quote(request):
+    """Quote delivery for the whole cart to a location (lat/lng or address)"""
+    try:
+        coordinates = parse_coordinates(request.GET.get('lat'), request.GET.get('lng'))
+    except DeliveryQuoteError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    if coordinates is None:
+        coordinates = geocode(request.GET.get('address'))
+    
+    cart, created = Cart.objects.get_or_create(customer=request.user)
+    quote = get_cart_quote(cart, coordinates)
+    return Response(DeliveryQuoteSerializer(quote).data)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def update_agent_location(request):
+    """Position ping from a delivery agent; buffered in memory and written in batches"""
+    agent_id = agent_index.agent_for_user(request.user)
+    if agent_id is None:
+        return Response({'error': 'Delivery agent access required'}, status=status.HTTP_403_FORBIDDEN)
+    try:
+        coordinates = parse_coordinates(request.data.get('latitude'), request.data.get('longitude'))
+    except DeliveryQuoteError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    if coordinates is None:
+        return Response({'error': 'latitude and longitude are required'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    agent_index.update(agent_id, *coordinates)
+    return Response(status=status.HTTP_202_ACCEPTED)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def dispatch_ready_orders(request):
+    """Assign every waiting ready_for_pickup order in one batch"""
+    if request.user.user_type != 'admin':
+        return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
+    
+    deliveries = assign_ready_orders()
+    replan_routes(deliveries)
+    return Response({
+        'assigned': len(deliveries),
+        'deliveries': DeliverySerializer(deliveries, many=True).data
+    })
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def agent_route(request):
+    """Planned stop order and ETAs for an agent's current trip (admins pass ?agent_id=)"""
+    if request.user.user_type == 'admin' and request.GET.get('agent_id'):
+        agent = DeliveryAgent.objects.filter(id=request.GET['agent_id']).first()
+    else:
+        agent = DeliveryAgent.objects.filter(user=request.user).first()
+    if agent is None:
+        return Response({'error': 'Delivery agent not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    return Response(plan_agent_route(agent))
+
 class OrderViewSet(viewsets.ModelViewSet):
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
     
-    def get_queryset(self):
+    def scope(self, model):
+        """Orders (or archived orders) the requesting user may see"""
         user = self.request.user
         if user.user_type == 'customer':
-            return Order.objects.filter(customer=user).order_by('-created_at')
+            return model.objects.filter(customer=user)
         elif user.user_type == 'shopkeeper':
-            return Order.objects.filter(shop__owner=user).order_by('-created_at')
+            return model.objects.filter(shop__owner=user)
         elif user.user_type == 'admin':
-            return Order.objects.all().order_by('-created_at')
-        return Order.objects.none()
+            return model.objects.all()
+        return model.objects.none()
+    
+    def get_queryset(self):
+        queryset = self.scope(Order).order_by('-created_at')
+        
+        if self.action == 'list':
+            start, end = parse_date_range(self.request.query_params)
+            queryset = filter_date_range(queryset, start, end)
+            return OrderListSerializer.setup_queryset(queryset, parse_expand(self.request))
+        if self.action == 'retrieve':
+            expand = parse_expand(self.request) | {'items'}
+            return prefetch_order_details(queryset.select_related('customer', 'shop'), expand)
+        return queryset
+    
+    def list(self, request, *args, **kwargs):
+        try:
+            start, end = parse_date_range(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if not needs_archive(start):
+            return super().list(request, *args, **kwargs)
+        
+        # The range reaches past the archive horizon: read both tables
+        rows = order_history(self.scope(Order), self.scope(ArchivedOrder), start, end)
+        page = self.paginate_queryset(rows)
+        return self.get_paginated_response(OrderHistorySerializer(page, many=True).data)
+    
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return OrderListSerializer
+        return OrderSerializer
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['expand'] = parse_expand(self.request)
+        return context
     
     @action(detail=True, methods=['post'])
     def update_status(self, request, pk=None):
@@ -191,29 +314,21 @@ class OrderViewSet(viewsets.ModelViewSet):
         new_status = request.data.get('status')
         message = request.data.get('message', '')
         
-        if new_status not in dict(Order.ORDER_STATUS_CHOICES):
-            return Response({'error': 'Invalid status'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            transition(order, new_status, actor=request.user, message=message)
+        except InvalidTransition as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
-        order.status = new_status
-        if new_status == 'confirmed':
-            order.confirmed_at = timezone.now()
-        elif new_status == 'delivered':
-            order.actual_delivery_time = timezone.now()
-        
-        order.save()
-        
-        # Create tracking entry
-        OrderTracking.objects.create(
-            order=order,
-            status=new_status,
-            message=message,
-            created_by=request.user
-        )
-        
-        return Response({
+        response = {
             'message': 'Order status updated',
             'order': OrderSerializer(order).data
-        }, status=status.HTTP_200_OK)
+        }
+        if new_status == 'ready_for_pickup' and settings.DISPATCH_MODE == 'immediate':
+            delivery = assign_nearest_agent(order)
+            if delivery:
+                replan_routes([delivery])
+            response['delivery'] = DeliverySerializer(delivery).data if delivery else None
+        return Response(response, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'])
     def cancel(self, request, pk=None):
@@ -227,24 +342,78 @@ class OrderViewSet(viewsets.ModelViewSet):
         if order.status not in ['pending', 'confirmed']:
             return Response({'error': 'Cannot cancel order in current status'}, status=status.HTTP_400_BAD_REQUEST)
         
-        order.status = 'cancelled'
-        order.save()
-        
-        # Create tracking entry
-        OrderTracking.objects.create(
-            order=order,
-            status='cancelled',
-            message='Order cancelled by customer',
-            created_by=request.user
-        )
+        try:
+            transition(order, 'cancelled', actor=request.user, message='Order cancelled by customer')
+        except InvalidTransition as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
         return Response({'message': 'Order cancelled successfully'}, status=status.HTTP_200_OK)
+    
+    @action(detail=True, methods=['post'])
+    def reorder(self, request, pk=None):
+        """
+        Buy an earlier order again. Its items go into the cart in one batch,
+        or with checkout=true and checkout details a new order is placed
+        straight away at today's prices.
+        """
+        order = self.get_object()
+        if request.user != order.customer:
+            return Response({'error': 'Only the customer who placed this order can reorder it'}, status=status.HTTP_403_FORBIDDEN)
+        
+        items, unavailable, price_changes = reorder_lines(order)
+        if not items:
+            return Response({
+                'error': 'None of the products in this order are available',
+                'unavailable': unavailable
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if request.data.get('checkout') not in (True, 'true', '1'):
+            operations = [{'op': 'add', 'product_id': item.product.id, 'quantity': item.quantity} for item in items]
+            try:
+                diff = apply_cart_operations(request.user, operations)
+            except CartBatchError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({
+                'message': f'{len(items)} item(s) added to cart',
+                'cart': diff,
+                'unavailable': unavailable,
+                'price_changes': price_changes
+            }, status=status.HTTP_200_OK)
+        
+        serializer = CheckoutSerializer(data=request.data)
+        if not serializer.is_valid():
+            metrics.checkout_total.inc(outcome='invalid')
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+        try:
+            with metrics.checkout_duration_seconds.time(), transaction.atomic():
+                quote = build_quote(items, delivery_coordinates(data))
+                if not quote['deliverable']:
+                    metrics.checkout_total.inc(outcome='undeliverable')
+                    return Response({
+                        'error': 'This order cannot be delivered to this address',
+                        'quote': DeliveryQuoteSerializer(quote).data
+                    }, status=status.HTTP_400_BAD_REQUEST)
+                created_orders = place_orders(request.user, items, data, quote)
+        except CouponError as e:
+            metrics.checkout_total.inc(outcome='coupon_rejected')
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        metrics.checkout_total.inc(outcome='success')
+        metrics.orders_created_total.inc(len(created_orders))
+        created = OrderListSerializer.setup_queryset(Order.objects.filter(id__in=[o.id for o in created_orders]))
+        return Response({
+            'message': f'{len(created_orders)} order(s) created successfully',
+            'orders': OrderListSerializer(created, many=True).data,
+            'unavailable': unavailable,
+            'price_changes': price_changes
+        }, status=status.HTTP_201_CREATED)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def track_order(request, order_id):
     try:
-        order = Order.objects.get(order_id=order_id)
+        order = prefetch_order_details(Order.objects.select_related('customer', 'shop__owner'), {'items'}).get(order_id=order_id)
         
         # Check permissions
         if (request.user != order.customer and 
@@ -252,14 +421,31 @@ def track_order(request, order_id):
             request.user.user_type != 'admin'):
             return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
         
-        tracking = OrderTracking.objects.filter(order=order)
+        # Full history is read only here; lists use the projection on Order
+        tracking = OrderTracking.objects.filter(order=order).select_related('created_by')
         return Response({
             'order': OrderSerializer(order).data,
             'tracking': OrderTrackingSerializer(tracking, many=True).data
         }, status=status.HTTP_200_OK)
         
     except Order.DoesNotExist:
+        return track_archived_order(request, order_id)
+
+def track_archived_order(request, order_id):
+    """Lookups that miss the hot table fall through to the archive"""
+    order = (ArchivedOrder.objects.select_related('customer', 'shop__owner')
+             .prefetch_related('items', 'tracking').filter(order_id=order_id).first())
+    if order is None:
         return Response({'error': 'Order not found'}, status=status.HTTP_404_NOT_FOUND)
+    if (request.user != order.customer and 
+        request.user != order.shop.owner and 
+        request.user.user_type != 'admin'):
+        return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+    
+    return Response({
+        'order': ArchivedOrderSerializer(order).data,
+        'tracking': ArchivedOrderTrackingSerializer(order.tracking.all(), many=True).data
+    }, status=status.HTTP_200_OK)
 
 class CouponViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Coupon.objects.filter(is_active=True)
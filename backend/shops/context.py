@@ -0,0 +1,95 @@
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from rest_framework import status
+from rest_framework.response import Response
+from .models import Shop
+
+CONTEXT_TTL = getattr(settings, 'SHOPKEEPER_CONTEXT_TTL', 300)
+
+
+def context_key(user_id):
+    return f'shopkeeper_context:{user_id}'
+
+
+def invalidate_shopkeeper_context(*user_ids):
+    # After commit, so a concurrent request cannot cache the old values again
+    keys = [context_key(user_id) for user_id in user_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+class ShopkeeperContext:
+    """
+    The shop a shopkeeper owns and their verification status. The ids are
+    cached across requests; the Shop row itself is only loaded when a view
+    asks for it.
+    """
+
+    def __init__(self, shop_id, verification_status):
+        self.shop_id = shop_id
+        self.verification_status = verification_status
+        self._shop = None
+
+    @property
+    def shop(self):
+        if self._shop is None and self.shop_id is not None:
+            self._shop = Shop.objects.select_related('owner').get(pk=self.shop_id)
+        return self._shop
+
+
+def load_context(user):
+    """
+    Shop id and verification status for a user. A user built from token
+    claims already carries the shop id (current, since shop changes make
+    the claims auth reload the user), so only the profile is read.
+    """
+    from accounts.models import ShopkeeperProfile, User
+    if hasattr(user, 'token_shop_id'):
+        verification = (ShopkeeperProfile.objects.filter(user_id=user.pk)
+                        .values_list('verification_status', flat=True).first())
+        return {'shop_id': user.token_shop_id, 'verification_status': verification}
+    row = (User.objects.filter(pk=user.pk)
+           .annotate(shop_id=Subquery(Shop.objects.filter(owner=OuterRef('pk')).order_by('id').values('id')[:1]))
+           .values('shop_id', 'shopkeeper_profile__verification_status').first()) or {}
+    return {'shop_id': row.get('shop_id'), 'verification_status': row.get('shopkeeper_profile__verification_status')}
+
+
+def shopkeeper_context(request):
+    """Context for the request's user, resolved once per request and cached between requests"""
+    context = getattr(request, '_shopkeeper_context', None)
+    if context is None:
+        key = context_key(request.user.pk)
+        values = cache.get(key)
+        if values is None:
+            values = load_context(request.user)
+            cache.set(key, values, CONTEXT_TTL)
+        context = ShopkeeperContext(values['shop_id'], values['verification_status'])
+        request._shopkeeper_context = context
+    return context
+
+
+def shopkeeper_required(forbidden='Only shopkeepers can access this', unapproved=None):
+    """
+    Let only shopkeepers with a shop through (403/404 otherwise) and set
+    request.shopkeeper. When an unapproved message is given the shopkeeper
+    must also have been verified.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.user.user_type != 'shopkeeper':
+                return Response({'error': forbidden}, status=status.HTTP_403_FORBIDDEN)
+            context = shopkeeper_context(request)
+            if context.shop_id is None:
+                return Response({'error': 'No shop found'}, status=status.HTTP_404_NOT_FOUND)
+            if unapproved is not None:
+                if context.verification_status is None:
+                    return Response({'error': 'Shopkeeper profile not found'}, status=status.HTTP_404_NOT_FOUND)
+                if context.verification_status != 'approved':
+                    return Response({'error': unapproved}, status=status.HTTP_403_FORBIDDEN)
+            request.shopkeeper = context
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,29 @@
+from math import radians, cos, sin, asin, sqrt
+
+EARTH_RADIUS_KM = 6371
+
+
+def haversine(lon1, lat1, lon2, lat2):
+    """Calculate the great circle distance in km between two points on earth"""
+    lon1, lat1, lon2, lat2 = map(radians, [float(lon1), float(lat1), float(lon2), float(lat2)])
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
+    c = 2 * asin(sqrt(a))
+    return c * EARTH_RADIUS_KM
+
+
+def distance_matrix(points):
+    """Great-circle distances in km between every pair of (latitude, longitude) points"""
+    coords = [(radians(float(lat)), radians(float(lng))) for lat, lng in points]
+    cos_lat = [cos(lat) for lat, _ in coords]
+    size = len(coords)
+    matrix = [[0.0] * size for _ in range(size)]
+    for i in range(size):
+        lat1, lng1 = coords[i]
+        row = matrix[i]
+        for j in range(i + 1, size):
+            lat2, lng2 = coords[j]
+            a = sin((lat2 - lat1) / 2) ** 2 + cos_lat[i] * cos_lat[j] * sin((lng2 - lng1) / 2) ** 2
+            row[j] = matrix[j][i] = 2 * EARTH_RADIUS_KM * asin(sqrt(a))
+    return matrix
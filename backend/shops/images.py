@@ -0,0 +1,170 @@
+import hashlib
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+VARIANT_WIDTHS = tuple(getattr(settings, 'IMAGE_VARIANT_WIDTHS', (160, 320, 640, 1280)))
+VARIANT_FORMATS = {'webp': ('WEBP', {'quality': 80, 'method': 4}),
+                   'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True})}
+VARIANT_DIR = getattr(settings, 'IMAGE_VARIANT_DIR', 'variants')
+WORKERS = getattr(settings, 'IMAGE_WORKERS', 2)
+
+# Variant names are already derived from the original's hash, so they are
+# written to plain MEDIA_ROOT storage rather than the blob store
+variant_storage = FileSystemStorage()
+
+# Image fields that get variants, per model; results go to each model's
+# image_variants JSON field keyed by field name
+IMAGE_FIELDS = {
+    'shops.Category': ('image',),
+    'shops.Shop': ('logo', 'banner_image'),
+    'shops.Product': ('image',),
+    'shops.ProductImage': ('image',),
+    'accounts.User': ('profile_picture',),
+}
+
+
+def image_models():
+    return [(apps.get_model(label), fields) for label, fields in IMAGE_FIELDS.items()]
+
+
+def render_variants(name):
+    """
+    Resize one stored image to every configured width (never upscaling) in
+    each format, under names derived from the original's content hash, so
+    identical uploads share files and a changed file never reuses a cached
+    URL. Safe to run in a worker process. Returns the entry stored in
+    image_variants.
+    """
+    with default_storage.open(name, 'rb') as source:
+        data = source.read()
+    digest = hashlib.sha256(data).hexdigest()
+
+    with Image.open(io.BytesIO(data)) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+        width, height = image.size
+        widths = [w for w in VARIANT_WIDTHS if w < width] + [min(width, max(VARIANT_WIDTHS))]
+
+        variants = {}
+        for target in sorted(set(widths)):
+            resized = None
+            paths = {}
+            for ext, (fmt, options) in VARIANT_FORMATS.items():
+                path = f'{VARIANT_DIR}/{digest[:2]}/{digest[2:16]}_{target}.{ext}'
+                if variant_storage.exists(path):
+                    # Reused: refresh the mtime gc_media's grace period goes by
+                    os.utime(variant_storage.path(path))
+                else:
+                    if resized is None:
+                        resized = image.resize((target, max(1, round(height * target / width))), Image.LANCZOS)
+                    output = resized.convert('RGB') if fmt == 'JPEG' else resized
+                    buffer = io.BytesIO()
+                    output.save(buffer, fmt, **options)
+                    variant_storage.save(path, ContentFile(buffer.getvalue()))
+                paths[ext] = path
+            variants[str(target)] = paths
+    return {'source': name, 'hash': digest, 'width': width, 'height': height, 'variants': variants}
+
+
+def stale_fields(instance, fields):
+    """Image fields whose recorded variants do not match the current file"""
+    recorded = instance.image_variants or {}
+    stale = []
+    for field in fields:
+        name = getattr(instance, field).name or ''
+        entry = recorded.get(field)
+        if (entry or {}).get('source', '') != name:
+            stale.append(field)
+    return stale
+
+
+def process_instance(model, pk, fields):
+    """Render variants for some fields of one row and store them without firing post_save"""
+    instance = model.objects.filter(pk=pk).only(*fields, 'image_variants').first()
+    if instance is None:
+        return
+    results = {}
+    for field in fields:
+        name = getattr(instance, field).name
+        if not name:
+            results[field] = None
+            continue
+        try:
+            results[field] = render_variants(name)
+        except Exception:
+            logger.exception('Could not build variants for %s %s.%s', model.__name__, pk, field)
+    store_variants(model, pk, results)
+
+
+def store_variants(model, pk, results):
+    """
+    Record rendered entries ({field: entry, or None for an emptied field}).
+    A result is dropped when its field no longer holds the file it was made
+    from, so a slow render cannot overwrite the entry for a newer upload.
+    """
+    with transaction.atomic():
+        row = model.objects.select_for_update().filter(pk=pk).only('image_variants', *results).first()
+        if row is None:
+            return
+        variants = dict(row.image_variants or {})
+        for field, entry in results.items():
+            current = getattr(row, field).name or ''
+            if (entry['source'] if entry else '') != current:
+                continue
+            if entry is None:
+                variants.pop(field, None)
+            else:
+                variants[field] = entry
+        if variants != (row.image_variants or {}):
+            model.objects.filter(pk=pk).update(image_variants=variants)
+
+
+class ImageWorker:
+    """Small thread pool that renders variants off the request path"""
+
+    def __init__(self, workers=WORKERS):
+        self.workers = workers
+        self.executor = None
+        self.lock = threading.Lock()
+
+    def submit(self, model, pk, fields):
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='images')
+        return self.executor.submit(self._run, model, pk, fields)
+
+    def _run(self, model, pk, fields):
+        close_old_connections()
+        try:
+            process_instance(model, pk, fields)
+        finally:
+            close_old_connections()
+
+
+image_worker = ImageWorker()
+
+
+def variant_urls(instance, field, request=None):
+    """{width: {format: url}} for a field, or None before its variants exist"""
+    entry = (instance.image_variants or {}).get(field)
+    if not entry or entry.get('source') != getattr(instance, field).name:
+        return None
+    urls = {}
+    for width, paths in entry['variants'].items():
+        urls[width] = {}
+        for ext, path in paths.items():
+            url = variant_storage.url(path)
+            urls[width][ext] = request.build_absolute_uri(url) if request is not None else url
+    return urls
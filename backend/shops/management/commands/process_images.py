@@ -0,0 +1,76 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import django
+from django.core.management.base import BaseCommand
+from shops.images import image_models, render_variants, stale_fields, store_variants
+
+PAGE_SIZE = 500
+# Renders queued per worker; rows are read from the database as the queue drains
+QUEUE_PER_WORKER = 4
+
+
+def render(name):
+    return render_variants(name) if name else None
+
+
+def pending_jobs(rebuild_all):
+    """(model, pk, field, file name) for every image needing variants, read a page of rows at a time"""
+    for model, fields in image_models():
+        last_pk = None
+        while True:
+            rows = model.objects.only(*fields, 'image_variants').order_by('pk')
+            if last_pk is not None:
+                rows = rows.filter(pk__gt=last_pk)
+            rows = list(rows[:PAGE_SIZE])
+            if not rows:
+                break
+            for row in rows:
+                for field in (fields if rebuild_all else stale_fields(row, fields)):
+                    yield model, row.pk, field, getattr(row, field).name
+            last_pk = rows[-1].pk
+
+
+class Command(BaseCommand):
+    help = 'Build resized image variants for existing uploads, spreading the work over a process pool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--all', action='store_true', help='rebuild variants that are already up to date')
+        parser.add_argument('--dry-run', action='store_true', help='only count the images that need variants')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            count = sum(1 for _ in pending_jobs(options['all']))
+            self.stdout.write(f'{count} image(s) need variants')
+            return
+
+        started = time.perf_counter()
+        workers = max(1, options['workers'])
+        in_flight = {}
+        done, failed = 0, 0
+
+        def collect(futures):
+            nonlocal done, failed
+            for future in futures:
+                model, pk, field = in_flight.pop(future)
+                try:
+                    entry = future.result()
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f'{model.__name__} {pk} {field}: {e}')
+                    continue
+                store_variants(model, pk, {field: entry})
+                done += 1
+
+        # Workers only read and write media; results are stored from this
+        # process. Forked workers inherit its database connection but never
+        # use it, and exit without closing it.
+        with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+            for model, pk, field, name in pending_jobs(options['all']):
+                if len(in_flight) >= workers * QUEUE_PER_WORKER:
+                    finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(finished)
+                in_flight[pool.submit(render, name)] = (model, pk, field)
+            collect(wait(in_flight)[0])
+        self.stdout.write(f'Processed {done} image(s), {failed} failed, in {time.perf_counter() - started:.1f}s')
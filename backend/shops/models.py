@@ -6,6 +6,7 @@ class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True)
     image = models.ImageField(upload_to='categories/', blank=True, null=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)  # filled by shops.images
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
@@ -42,6 +43,7 @@ class Shop(models.Model):
     # Images
     logo = models.ImageField(upload_to='shop_logos/', blank=True, null=True)
     banner_image = models.ImageField(upload_to='shop_banners/', blank=True, null=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)  # filled by shops.images
     
     # Status and ratings
     status = models.CharField(max_length=20, choices=SHOP_STATUS_CHOICES, default='active')
@@ -101,6 +103,7 @@ class Product(models.Model):
     
     # Images
     image = models.ImageField(upload_to='products/', blank=True, null=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)  # filled by shops.images
     
     # Status and ratings
     status = models.CharField(max_length=20, choices=PRODUCT_STATUS_CHOICES, default='available')
@@ -135,6 +138,7 @@ class Product(models.Model):
 class ProductImage(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='products/gallery/')
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)  # filled by shops.images
     alt_text = models.CharField(max_length=200, blank=True)
     is_primary = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -1,18 +1,35 @@
 from rest_framework import serializers
+from .images import IMAGE_FIELDS, variant_urls
 from .models import Category, Shop, Product, ProductImage, Review, Wishlist
 
+class ImageVariantsField(serializers.Field):
+    """Resized variant URLs per image field: {field: {width: {format: url}}}"""
+    
+    def __init__(self, **kwargs):
+        super().__init__(source='*', read_only=True, **kwargs)
+    
+    def to_representation(self, instance):
+        request = self.context.get('request')
+        return {field: variant_urls(instance, field, request)
+                for field in IMAGE_FIELDS[instance._meta.label]}
+
 class CategorySerializer(serializers.ModelSerializer):
+    image_variants = ImageVariantsField()
+    
     class Meta:
         model = Category
         fields = '__all__'
 
 class ProductImageSerializer(serializers.ModelSerializer):
+    image_variants = ImageVariantsField()
+    
     class Meta:
         model = ProductImage
         fields = '__all__'
 
 class ProductSerializer(serializers.ModelSerializer):
     images = ProductImageSerializer(many=True, read_only=True)
+    image_variants = ImageVariantsField()
     final_price = serializers.ReadOnlyField()
     is_on_sale = serializers.ReadOnlyField()
     is_low_stock = serializers.ReadOnlyField()
@@ -27,6 +44,7 @@ class ShopSerializer(serializers.ModelSerializer):
     products = ProductSerializer(many=True, read_only=True)
     categories = CategorySerializer(many=True, read_only=True)
     owner_name = serializers.CharField(source='owner.username', read_only=True)
+    image_variants = ImageVariantsField()
     
     class Meta:
         model = Shop
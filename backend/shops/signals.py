@@ -0,0 +1,32 @@
+from functools import partial
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .context import invalidate_shopkeeper_context
+from .images import image_models, image_worker, stale_fields
+
+
+def queue_image_variants(sender, instance, raw=False, update_fields=None, fields=(), **kwargs):
+    """Render variants after commit for image fields that changed in this save"""
+    if raw:
+        return
+    if update_fields is not None:
+        fields = [field for field in fields if field in update_fields]
+    stale = stale_fields(instance, fields)
+    if stale:
+        transaction.on_commit(partial(image_worker.submit, sender, instance.pk, stale))
+
+
+for model, fields in image_models():
+    post_save.connect(partial(queue_image_variants, fields=fields), sender=model, weak=False,
+                      dispatch_uid=f'image_variants_{model._meta.label_lower}')
+
+
+@receiver([post_save, post_delete], sender='shops.Shop')
+def shop_context_changed(sender, instance, **kwargs):
+    invalidate_shopkeeper_context(instance.owner_id)
+
+
+@receiver([post_save, post_delete], sender='accounts.ShopkeeperProfile')
+def profile_context_changed(sender, instance, **kwargs):
+    invalidate_shopkeeper_context(instance.user_id)
@@ -3,23 +3,15 @@ from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.db.models import Q, Avg
-from math import radians, cos, sin, asin, sqrt
+from monitoring import metrics
+from .context import shopkeeper_required
+from .geo import haversine
 from .models import Category, Shop, Product, Review, Wishlist
 from .serializers import (
     CategorySerializer, ShopSerializer, ProductSerializer, 
     ReviewSerializer, WishlistSerializer
 )
 
-def haversine(lon1, lat1, lon2, lat2):
-    """Calculate the great circle distance in km between two points on earth"""
-    lon1, lat1, lon2, lat2 = map(radians, [float(lon1), float(lat1), float(lon2), float(lat2)])
-    dlon = lon2 - lon1
-    dlat = lat2 - lat1
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    c = 2 * asin(sqrt(a))
-    r = 6371  # Radius of earth in kilometers
-    return c * r
-
 class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Category.objects.filter(is_active=True)
     serializer_class = CategorySerializer
@@ -116,16 +108,10 @@ class ReviewViewSet(viewsets.ModelViewSet):
 # Shopkeeper endpoints
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@shopkeeper_required()
 def my_shop(request):
     """Get the current shopkeeper's shop"""
-    if request.user.user_type != 'shopkeeper':
-        return Response({'error': 'Only shopkeepers can access this'}, status=status.HTTP_403_FORBIDDEN)
-    
-    shop = Shop.objects.filter(owner=request.user).first()
-    if not shop:
-        return Response({'error': 'No shop found'}, status=status.HTTP_404_NOT_FOUND)
-    
-    serializer = ShopSerializer(shop)
+    serializer = ShopSerializer(request.shopkeeper.shop)
     return Response(serializer.data)
 
 @api_view(['POST'])
@@ -147,16 +133,10 @@ def create_shop(request):
 
 @api_view(['PUT', 'PATCH'])
 @permission_classes([IsAuthenticated])
+@shopkeeper_required('Only shopkeepers can update shops')
 def update_shop(request):
     """Update the shopkeeper's shop"""
-    if request.user.user_type != 'shopkeeper':
-        return Response({'error': 'Only shopkeepers can update shops'}, status=status.HTTP_403_FORBIDDEN)
-    
-    shop = Shop.objects.filter(owner=request.user).first()
-    if not shop:
-        return Response({'error': 'No shop found'}, status=status.HTTP_404_NOT_FOUND)
-    
-    serializer = ShopSerializer(shop, data=request.data, partial=True)
+    serializer = ShopSerializer(request.shopkeeper.shop, data=request.data, partial=True)
     if serializer.is_valid():
         serializer.save()
         return Response(serializer.data)
@@ -164,40 +144,21 @@ def update_shop(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@shopkeeper_required()
 def my_products(request):
     """Get all products for the shopkeeper's shop"""
-    if request.user.user_type != 'shopkeeper':
-        return Response({'error': 'Only shopkeepers can access this'}, status=status.HTTP_403_FORBIDDEN)
-    
-    shop = Shop.objects.filter(owner=request.user).first()
-    if not shop:
-        return Response({'error': 'No shop found'}, status=status.HTTP_404_NOT_FOUND)
-    
-    products = Product.objects.filter(shop=shop)
+    products = Product.objects.filter(shop_id=request.shopkeeper.shop_id)
     serializer = ProductSerializer(products, many=True)
     return Response(serializer.data)
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@shopkeeper_required('Only shopkeepers can add products',
+                     unapproved='Your shop must be approved before adding products')
 def add_product(request):
     """Add a product to the shopkeeper's shop"""
-    if request.user.user_type != 'shopkeeper':
-        return Response({'error': 'Only shopkeepers can add products'}, status=status.HTTP_403_FORBIDDEN)
-    
-    shop = Shop.objects.filter(owner=request.user).first()
-    if not shop:
-        return Response({'error': 'No shop found'}, status=status.HTTP_404_NOT_FOUND)
-    
-    # Check verification status
-    try:
-        profile = request.user.shopkeeper_profile
-        if profile.verification_status != 'approved':
-            return Response({'error': 'Your shop must be approved before adding products'}, status=status.HTTP_403_FORBIDDEN)
-    except:
-        return Response({'error': 'Shopkeeper profile not found'}, status=status.HTTP_404_NOT_FOUND)
-    
     data = request.data.copy()
-    data['shop'] = shop.id
+    data['shop'] = request.shopkeeper.shop_id
     
     # Generate SKU if not provided
     if not data.get('sku'):
@@ -206,7 +167,7 @@ def add_product(request):
     
     serializer = ProductSerializer(data=data)
     if serializer.is_valid():
-        serializer.save(shop=shop)
+        serializer.save()
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -244,45 +205,37 @@ def delete_product(request, product_id):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@shopkeeper_required()
 def shopkeeper_orders(request):
     """Get orders for the shopkeeper's shop"""
     from orders.models import Order
-    from orders.serializers import OrderSerializer
-    
-    if request.user.user_type != 'shopkeeper':
-        return Response({'error': 'Only shopkeepers can access this'}, status=status.HTTP_403_FORBIDDEN)
-    
-    shop = Shop.objects.filter(owner=request.user).first()
-    if not shop:
-        return Response({'error': 'No shop found'}, status=status.HTTP_404_NOT_FOUND)
+    from orders.serializers import OrderListSerializer, parse_expand
     
-    orders = Order.objects.filter(shop=shop).order_by('-created_at')
-    serializer = OrderSerializer(orders, many=True)
+    expand = parse_expand(request)
+    orders = OrderListSerializer.setup_queryset(Order.objects.filter(shop_id=request.shopkeeper.shop_id).order_by('-created_at'), expand)
+    serializer = OrderListSerializer(orders, many=True, context={'expand': expand})
     return Response(serializer.data)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@shopkeeper_required()
 def shopkeeper_stats(request):
     """Get statistics for the shopkeeper's shop"""
     from orders.models import Order
     from django.db.models import Sum, Count
     
-    if request.user.user_type != 'shopkeeper':
-        return Response({'error': 'Only shopkeepers can access this'}, status=status.HTTP_403_FORBIDDEN)
+    shop_id = request.shopkeeper.shop_id
     
-    shop = Shop.objects.filter(owner=request.user).first()
-    if not shop:
-        return Response({'error': 'No shop found'}, status=status.HTTP_404_NOT_FOUND)
-    
-    orders = Order.objects.filter(shop=shop)
+    orders = Order.objects.filter(shop_id=shop_id)
+    rating = Shop.objects.filter(pk=shop_id).values('average_rating', 'total_reviews').get()
     
     stats = {
         'total_orders': orders.count(),
         'pending_orders': orders.filter(status='pending').count(),
         'total_revenue': float(orders.filter(status='delivered').aggregate(Sum('total_amount'))['total_amount__sum'] or 0),
-        'total_products': Product.objects.filter(shop=shop).count(),
-        'average_rating': float(shop.average_rating),
-        'total_reviews': shop.total_reviews,
+        'total_products': Product.objects.filter(shop_id=shop_id).count(),
+        'average_rating': float(rating['average_rating']),
+        'total_reviews': rating['total_reviews'],
     }
     
     return Response(stats)
@@ -294,16 +247,19 @@ def search_products(request):
     if not query:
         return Response({'results': []})
     
-    products = Product.objects.filter(
-        Q(name__icontains=query) |
-        Q(description__icontains=query) |
-        Q(tags__icontains=query) |
-        Q(shop__name__icontains=query),
-        status='available'
-    ).distinct()
-    
-    serializer = ProductSerializer(products, many=True)
-    return Response({'results': serializer.data})
+    with metrics.search_duration_seconds.time():
+        products = Product.objects.filter(
+            Q(name__icontains=query) |
+            Q(description__icontains=query) |
+            Q(tags__icontains=query) |
+            Q(shop__name__icontains=query),
+            status='available'
+        ).distinct()
+        
+        serializer = ProductSerializer(products, many=True)
+        results = serializer.data
+    metrics.search_results.observe(len(results))
+    return Response({'results': results})
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
@@ -329,20 +285,22 @@ def nearby_shops(request):
     except ValueError:
         return Response({'error': 'Invalid coordinates'}, status=status.HTTP_400_BAD_REQUEST)
     
-    shops = Shop.objects.filter(status='active')
-    nearby = []
-    
-    for shop in shops:
-        if shop.latitude and shop.longitude:
-            distance = haversine(lng, lat, float(shop.longitude), float(shop.latitude))
-            if distance <= radius:
-                shop_data = ShopSerializer(shop).data
-                shop_data['distance'] = round(distance, 2)
-                nearby.append(shop_data)
-    
-    # Sort by distance
-    nearby.sort(key=lambda x: x['distance'])
+    with metrics.nearby_shops_duration_seconds.time():
+        shops = Shop.objects.filter(status='active')
+        nearby = []
+        
+        for shop in shops:
+            if shop.latitude and shop.longitude:
+                distance = haversine(lng, lat, float(shop.longitude), float(shop.latitude))
+                if distance <= radius:
+                    shop_data = ShopSerializer(shop).data
+                    shop_data['distance'] = round(distance, 2)
+                    nearby.append(shop_data)
+        
+        # Sort by distance
+        nearby.sort(key=lambda x: x['distance'])
     
+    metrics.nearby_shops_results.observe(len(nearby))
     return Response(nearby)
 
 class WishlistView(generics.ListAPIView):
@@ -383,14 +341,10 @@ def remove_from_wishlist(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@shopkeeper_required()
 def shopkeeper_reviews(request):
     """Get reviews for the shopkeeper's shop and products"""
-    if request.user.user_type != 'shopkeeper':
-        return Response({'error': 'Only shopkeepers can access this'}, status=status.HTTP_403_FORBIDDEN)
-    
-    shop = Shop.objects.filter(owner=request.user).first()
-    if not shop:
-        return Response({'error': 'No shop found'}, status=status.HTTP_404_NOT_FOUND)
+    shop = request.shopkeeper.shop_id
     
     # Get reviews for the shop and its products
     shop_reviews = Review.objects.filter(shop=shop)
@@ -403,6 +357,7 @@ def shopkeeper_reviews(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@shopkeeper_required()
 def shopkeeper_analytics(request):
     """Get analytics data for the shopkeeper's shop"""
     from orders.models import Order, OrderItem
@@ -410,12 +365,7 @@ def shopkeeper_analytics(request):
     from django.db.models.functions import TruncDate, TruncMonth
     from datetime import datetime, timedelta
     
-    if request.user.user_type != 'shopkeeper':
-        return Response({'error': 'Only shopkeepers can access this'}, status=status.HTTP_403_FORBIDDEN)
-    
-    shop = Shop.objects.filter(owner=request.user).first()
-    if not shop:
-        return Response({'error': 'No shop found'}, status=status.HTTP_404_NOT_FOUND)
+    shop = request.shopkeeper.shop_id
     
     # Get date range (last 30 days)
     end_date = datetime.now()
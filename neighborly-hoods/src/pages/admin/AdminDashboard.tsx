@@ -66,13 +66,9 @@ const AdminDashboard = () => {
 
   const fetchDashboardData = async () => {
     try {
-      const [statsData, ordersData, usersData, pendingData, shopsData, chartData] = await Promise.all([
-        adminService.getDashboardStats(), adminService.getRecentOrders(), adminService.getRecentUsers(),
-        adminService.getPendingShopkeepers(), adminService.getTopShops(), adminService.getRevenueChart()
-      ]);
-      console.log('Stats data received:', statsData);
-      setStats(statsData); setRecentOrders(ordersData); setRecentUsers(usersData);
-      setPendingShopkeepers(pendingData); setTopShops(shopsData); setRevenueData(chartData);
+      const data = await adminService.getDashboard();
+      setStats(data.stats); setRecentOrders(data.recent_orders); setRecentUsers(data.recent_users);
+      setPendingShopkeepers(data.pending_shopkeepers); setTopShops(data.top_shops); setRevenueData(data.revenue_chart);
     } catch (error) { 
       console.error('Failed to fetch dashboard data:', error);
       toast({ title: "Error", description: "Failed to load dashboard data", variant: "destructive" });
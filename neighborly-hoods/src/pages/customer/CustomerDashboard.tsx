@@ -202,7 +202,7 @@ const CustomerDashboard = () => {
                           </div>
                           <div>
                             <p className="font-medium">Order #{order.id}</p>
-                            <p className="text-sm text-muted-foreground">{order.items?.length || 0} items • ₹{order.total_amount}</p>
+                            <p className="text-sm text-muted-foreground">{order.items_count ?? order.items?.length ?? 0} items • ₹{order.total_amount}</p>
                           </div>
                         </div>
                         <div className="text-right">
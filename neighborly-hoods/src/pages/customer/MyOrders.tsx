@@ -149,7 +149,7 @@ const MyOrders = () => {
                         <Badge className={getStatusColor(order.status)}>{order.status.replace('_', ' ')}</Badge>
                       </div>
                       <p className="text-sm text-muted-foreground">{order.shop_name || 'Shop'}</p>
-                      <p className="text-sm text-muted-foreground">{order.items?.length || 0} items • ₹{order.total_amount}</p>
+                      <p className="text-sm text-muted-foreground">{order.items_count ?? order.items?.length ?? 0} items • ₹{order.total_amount}</p>
                       <p className="text-xs text-muted-foreground mt-1">
                         {new Date(order.created_at).toLocaleDateString('en-IN', { day: 'numeric', month: 'short', year: 'numeric', hour: '2-digit', minute: '2-digit' })}
                       </p>
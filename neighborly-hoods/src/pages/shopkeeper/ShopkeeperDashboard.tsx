@@ -575,7 +575,7 @@ const ShopkeeperDashboard = () => {
                         <div key={order.id} className="flex items-center justify-between p-4 rounded-lg border hover:bg-accent/50">
                           <div>
                             <p className="font-medium">Order #{order.id}</p>
-                            <p className="text-sm text-muted-foreground">{order.customer_name} • {order.items?.length || 0} items</p>
+                            <p className="text-sm text-muted-foreground">{order.customer_name} • {order.items_count ?? order.items?.length ?? 0} items</p>
                             <p className="text-xs text-muted-foreground">{new Date(order.created_at).toLocaleString()}</p>
                           </div>
                           <div className="text-right flex items-center gap-4">
@@ -75,6 +75,8 @@ export interface RevenueData {
   orders: number;
 }
 
+export type RankingWindow = 'today' | '7d' | '30d' | 'all';
+
 export interface TopShop {
   id: number;
   name: string;
@@ -107,6 +109,25 @@ export interface AdminUser {
   created_at: string;
 }
 
+export interface AdminDashboardData {
+  stats: DashboardStats;
+  recent_orders: RecentOrder[];
+  recent_users: RecentUser[];
+  pending_shopkeepers: PendingShopkeeper[];
+  revenue_chart: RevenueData[];
+  top_shops: TopShop[];
+  top_products: TopProduct[];
+}
+
+export interface UserDirectoryParams {
+  type?: string;
+  is_active?: boolean;
+  is_verified?: boolean;
+  q?: string;
+  limit?: number;
+  cursor?: string;
+}
+
 export interface AdminShop {
   id: number;
   name: string;
@@ -136,6 +157,12 @@ export interface AdminOrder {
 }
 
 const adminService = {
+  // Every dashboard widget in one request
+  async getDashboard(): Promise<AdminDashboardData> {
+    const response = await api.get<AdminDashboardData>('/auth/admin/dashboard/');
+    return response.data;
+  },
+
   async getDashboardStats(): Promise<DashboardStats> {
     const response = await api.get<DashboardStats>('/auth/admin/stats/');
     return response.data;
@@ -161,13 +188,13 @@ const adminService = {
     return response.data;
   },
 
-  async getTopShops(): Promise<TopShop[]> {
-    const response = await api.get<TopShop[]>('/auth/admin/top-shops/');
+  async getTopShops(window: RankingWindow = 'all'): Promise<TopShop[]> {
+    const response = await api.get<TopShop[]>('/auth/admin/top-shops/', { params: { window } });
     return response.data;
   },
 
-  async getTopProducts(): Promise<TopProduct[]> {
-    const response = await api.get<TopProduct[]>('/auth/admin/top-products/');
+  async getTopProducts(window: RankingWindow = 'all'): Promise<TopProduct[]> {
+    const response = await api.get<TopProduct[]>('/auth/admin/top-products/', { params: { window } });
     return response.data;
   },
 
@@ -178,6 +205,11 @@ const adminService = {
     return response.data;
   },
 
+  async searchUsers(params: UserDirectoryParams = {}): Promise<{ users: AdminUser[]; nextCursor: string | null }> {
+    const response = await api.get<AdminUser[]>('/auth/admin/users/', { params });
+    return { users: response.data, nextCursor: response.headers['x-next-cursor'] ?? null };
+  },
+
   async getUser(id: number): Promise<AdminUser> {
     const response = await api.get<AdminUser>(`/auth/admin/users/${id}/`);
     return response.data;
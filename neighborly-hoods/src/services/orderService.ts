@@ -65,8 +65,12 @@ export interface Order {
   created_at: string;
   updated_at: string;
   confirmed_at: string | null;
-  items: OrderItem[];
-  tracking: OrderTracking[];
+  status_timestamps?: Record<string, string>;
+  status_changed_at?: string | null;
+  items_count?: number;
+  // Lists include these only with ?expand=items,tracking
+  items?: OrderItem[];
+  tracking?: OrderTracking[];
 }
 
 export interface Coupon {
@@ -95,6 +99,27 @@ export interface CheckoutData {
   special_instructions?: string;
 }
 
+export interface CartOperation {
+  op: 'add' | 'set' | 'remove';
+  product_id: number;
+  quantity?: number;
+}
+
+export interface CartLineChange {
+  product_id: number;
+  cart_item_id: number;
+  quantity: number;
+}
+
+export interface CartDiff {
+  added: CartLineChange[];
+  updated: CartLineChange[];
+  removed: number[];
+  lines: number;
+  total_items: number;
+  total_amount: number;
+}
+
 const orderService = {
   // Cart
   async getCart(): Promise<Cart> {
@@ -125,6 +150,11 @@ const orderService = {
     return response.data;
   },
 
+  async batchUpdateCart(operations: CartOperation[]): Promise<CartDiff> {
+    const response = await api.post<CartDiff>('/orders/cart/batch/', { operations });
+    return response.data;
+  },
+
   async clearCart(): Promise<{ message: string }> {
     const response = await api.delete<{ message: string }>('/orders/cart/clear/');
     return response.data;
@@ -166,6 +196,16 @@ const orderService = {
     return response.data;
   },
 
+  async reorder(orderId: number): Promise<{
+    message: string;
+    cart: CartDiff;
+    unavailable: { product_id: number; product_name: string }[];
+    price_changes: { product_id: number; product_name: string; old_price: number; new_price: number }[];
+  }> {
+    const response = await api.post(`/orders/orders/${orderId}/reorder/`);
+    return response.data;
+  },
+
   // Coupons
   async getCoupons(): Promise<Coupon[]> {
     const response = await api.get<Coupon[]>('/orders/coupons/');